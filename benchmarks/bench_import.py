@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+"""
+Measures how long it takes to import the ownable singleton driver and build a first puzzle.
+
+The import is timed in fresh interpreters, once loading the shipped .clsp.hex files and once
+compiling the puzzles from their sources (dev mode).
+
+    python -m benchmarks.bench_import --runs 10
+"""
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+import click
+
+from ownable_singleton.drivers.puzzle_loader import DEV_MODE_ENV
+
+REPO_ROOT = Path(__file__).parent.parent
+
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import ownable_singleton.drivers.ownable_singleton_driver as driver
+imported = time.perf_counter()
+driver.OWNABLE_SINGLETON_V2.program
+loaded = time.perf_counter()
+print(imported - start, loaded - start)
+"""
+
+
+def time_import(dev_mode: bool):
+    env = dict(os.environ)
+    env[DEV_MODE_ENV] = "1" if dev_mode else "0"
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=REPO_ROOT,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    import_time, first_use_time = output.split()
+    return float(import_time), float(first_use_time)
+
+
+@click.command()
+@click.option("--runs", type=int, default=10, show_default=True)
+def main(runs: int):
+    for label, dev_mode in [("shipped hex", False), ("dev mode", True)]:
+        timings = [time_import(dev_mode) for _ in range(runs)]
+        import_median = statistics.median(t[0] for t in timings)
+        first_use_median = statistics.median(t[1] for t in timings)
+        click.echo(
+            f"{label:>12}: import {import_median * 1000:8.1f} ms, "
+            f"import and first puzzle {first_use_median * 1000:8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
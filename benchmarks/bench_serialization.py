@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+"""
+Compares the encodings of spend bundle submissions: the JSON the gallery API has always
+accepted, and the streamable binary format, each with and without gzip compression.
+
+Batches of unsigned mint spend bundles are aggregated for increasing batch sizes, like the
+chunks submitted by `create-collection`. For every encoding, the time to encode a batch and
+the size of the request body are measured. The results are written as JSON.
+
+    python -m benchmarks.bench_serialization --batch-sizes 1,10,100,500 --output bench_serialization.json
+"""
+import gzip
+import json
+import time
+from typing import Callable, Dict, List
+
+import click
+from blspy import AugSchemeMPL, G2Element
+
+from chia.types.blockchain_format.coin import Coin
+from chia.types.spend_bundle import SpendBundle
+from ownable_singleton.drivers.ownable_singleton_driver import (
+    SINGLETON_AMOUNT,
+    Owner,
+    Royalty,
+    create_unsigned_ownable_singleton,
+    genesis_puzzle_for_index,
+)
+
+
+def json_body(spend_bundle: SpendBundle) -> bytes:
+    return json.dumps(
+        spend_bundle.to_json_dict(include_legacy_keys=False, exclude_modern_keys=False)
+    ).encode("utf-8")
+
+
+def binary_body(spend_bundle: SpendBundle) -> bytes:
+    return bytes(spend_bundle)
+
+
+ENCODINGS: Dict[str, Callable[[SpendBundle], bytes]] = {
+    "json": json_body,
+    "json+gzip": lambda spend_bundle: gzip.compress(
+        json_body(spend_bundle), compresslevel=6
+    ),
+    "binary": binary_body,
+    "binary+gzip": lambda spend_bundle: gzip.compress(
+        binary_body(spend_bundle), compresslevel=6
+    ),
+}
+
+
+def mint_spend_bundles(count: int) -> List[SpendBundle]:
+    creator_sk = AugSchemeMPL.key_gen(bytes([1] * 32))
+    creator = Owner(creator_sk.get_g1(), bytes([2] * 32))
+    royalty = Royalty(creator.puzzle_hash, 10)
+
+    spend_bundles = []
+    for index in range(count):
+        genesis_puzzle = genesis_puzzle_for_index(creator.public_key, index)
+        genesis_coin = Coin(
+            index.to_bytes(32, "big"), genesis_puzzle.get_tree_hash(), SINGLETON_AMOUNT
+        )
+        coin_spends, _ = create_unsigned_ownable_singleton(
+            genesis_coin,
+            genesis_puzzle,
+            creator,
+            f"https://example.com/{index}.png",
+            f"NFT #{index}",
+            2,
+            royalty,
+        )
+        spend_bundles.append(SpendBundle(coin_spends, G2Element()))
+    return spend_bundles
+
+
+def measure(
+    encode: Callable[[SpendBundle], bytes], spend_bundle: SpendBundle, repeat: int
+) -> Dict:
+    encode_times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = encode(spend_bundle)
+        encode_times.append(time.perf_counter() - start)
+    return {"encode_time": min(encode_times), "body_size": len(body)}
+
+
+@click.command()
+@click.option(
+    "--batch-sizes",
+    default="1,10,100,500",
+    show_default=True,
+    help="Comma separated batch sizes",
+)
+@click.option(
+    "--repeat",
+    type=click.IntRange(min=1),
+    default=5,
+    show_default=True,
+    help="The number of times each batch is encoded, the fastest run is reported",
+)
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False, writable=True),
+    default="bench_serialization.json",
+    show_default=True,
+    help="The file the results are written to as JSON",
+)
+def main(batch_sizes: str, repeat: int, output: str):
+    sizes = [int(size) for size in batch_sizes.split(",")]
+    spend_bundles = mint_spend_bundles(max(sizes))
+
+    results = []
+    for batch_size in sizes:
+        batch = SpendBundle.aggregate(spend_bundles[:batch_size])
+        for encoding, encode in ENCODINGS.items():
+            result = {
+                "encoding": encoding,
+                "batch_size": batch_size,
+                **measure(encode, batch, repeat),
+            }
+            click.echo(
+                f"{encoding:>11} x{batch_size:<5} {result['encode_time'] * 1000:10.2f} ms "
+                f"{result['body_size']:12d} bytes"
+            )
+            results.append(result)
+
+    with open(output, "wt") as fh:
+        json.dump({"created": time.time(), "results": results}, fh, indent=2)
+    click.echo(f"The results have been written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+"""
+Measures minting, buy offer and transfer throughput of the ownable singleton driver on the
+cdv simulator, for v1 and v2 puzzles with and without royalty.
+
+Each operation is run for increasing batch sizes, and all spends of a batch are pushed as one
+aggregated spend bundle. The results are written as JSON, so runs can be compared over time.
+
+    python -m benchmarks.bench_throughput --batch-sizes 1,10,50 --output bench_throughput.json
+"""
+import asyncio
+import json
+import time
+from typing import Dict, List
+
+import click
+from cdv.test import CoinWrapper
+from cdv.test import setup as setup_test
+
+from chia.types.blockchain_format.coin import Coin
+from chia.types.spend_bundle import SpendBundle
+from chia.wallet.puzzles import singleton_top_layer
+from ownable_singleton.drivers.ownable_singleton_driver import (
+    SINGLETON_AMOUNT,
+    Royalty,
+    singleton_puzzle_hash,
+)
+from ownable_singleton.dry_run import dry_run_spend_bundle
+from ownable_singleton.tests.test_ownable_singleton import (
+    accept_buy_offer,
+    create_buy_offer_for_user,
+    create_singleton_spend_bundle,
+    wallet_to_owner,
+)
+
+CONFIGURATIONS = [
+    # version, royalty percentage
+    (1, 0),
+    (2, 0),
+    (2, 10),
+]
+PAYMENT_AMOUNT = 10000
+
+
+def measurement(
+    operation: str,
+    version: int,
+    royalty_percentage: int,
+    batch_size: int,
+    wall_time: float,
+    spend_bundle: SpendBundle,
+) -> Dict:
+    spends = len(spend_bundle.coin_spends)
+    return {
+        "operation": operation,
+        "version": version,
+        "royalty_percentage": royalty_percentage,
+        "batch_size": batch_size,
+        "wall_time": wall_time,
+        "spends": spends,
+        "spends_per_second": spends / wall_time if wall_time > 0 else None,
+        "clvm_cost_per_spend": dry_run_spend_bundle(spend_bundle).clvm_cost / spends,
+        "bundle_size": len(bytes(spend_bundle)),
+    }
+
+
+def usable_coins(wallet, amount: int, count: int) -> List[CoinWrapper]:
+    coins = [
+        CoinWrapper.from_coin(coin, wallet.puzzle)
+        for coin in wallet.usable_coins.values()
+        if coin.amount >= amount
+    ]
+    assert len(coins) >= count, f"{wallet.name} only has {len(coins)} usable coins"
+    return coins[:count]
+
+
+async def run_configuration(
+    version: int, royalty_percentage: int, batch_size: int
+) -> List[Dict]:
+    network, alice, bob = await setup_test()
+    try:
+        # Every block rewards the farmer with two coins
+        for _ in range(batch_size // 2 + 2):
+            await network.farm_block(farmer=alice)
+            await network.farm_block(farmer=bob)
+
+        royalty = (
+            Royalty(alice.puzzle_hash, royalty_percentage)
+            if royalty_percentage
+            else None
+        )
+        results = []
+
+        # Minting
+        start = time.perf_counter()
+        mint_bundles = []
+        launches = []
+        for contribution_coin in usable_coins(alice, SINGLETON_AMOUNT, batch_size):
+            (
+                combined_spend,
+                genesis_coin,
+                launcher_coinsol,
+            ) = await create_singleton_spend_bundle(
+                contribution_coin, alice, version, royalty
+            )
+            mint_bundles.append(combined_spend)
+            launches.append((genesis_coin, launcher_coinsol))
+        mint_bundle = SpendBundle.aggregate(mint_bundles)
+        mint_result = await network.push_tx(mint_bundle)
+        assert "error" not in mint_result, mint_result
+        results.append(
+            measurement(
+                "mint",
+                version,
+                royalty_percentage,
+                batch_size,
+                time.perf_counter() - start,
+                mint_bundle,
+            )
+        )
+
+        alice_owner = wallet_to_owner(alice)
+        additions: Dict[bytes, Coin] = {
+            coin.puzzle_hash: coin for coin in mint_result["additions"]
+        }
+        singletons = []
+        for genesis_coin, launcher_coinsol in launches:
+            launcher_id = singleton_top_layer.generate_launcher_coin(
+                genesis_coin, SINGLETON_AMOUNT
+            ).name()
+            singleton_coin = additions[
+                singleton_puzzle_hash(launcher_id, version, alice_owner, royalty)
+            ]
+            singletons.append((launcher_id, launcher_coinsol, singleton_coin))
+
+        # Buy offers
+        start = time.perf_counter()
+        buy_offers = []
+        for (launcher_id, launcher_coinsol, singleton_coin), payment_coin in zip(
+            singletons, usable_coins(bob, PAYMENT_AMOUNT, batch_size)
+        ):
+            buy_offer = await create_buy_offer_for_user(
+                alice,
+                bob,
+                launcher_coinsol,
+                launcher_id,
+                PAYMENT_AMOUNT,
+                payment_coin,
+                singleton_coin,
+                version,
+                royalty,
+            )
+            buy_offers.append((singleton_coin, buy_offer))
+        results.append(
+            measurement(
+                "buy_offer",
+                version,
+                royalty_percentage,
+                batch_size,
+                time.perf_counter() - start,
+                SpendBundle.aggregate([buy_offer for _, buy_offer in buy_offers]),
+            )
+        )
+
+        # Transfers by accepting the buy offers
+        start = time.perf_counter()
+        transfer_bundle = SpendBundle.aggregate(
+            [
+                await accept_buy_offer(singleton_coin, buy_offer, alice, PAYMENT_AMOUNT)
+                for singleton_coin, buy_offer in buy_offers
+            ]
+        )
+        transfer_result = await network.push_tx(transfer_bundle)
+        assert "error" not in transfer_result, transfer_result
+        results.append(
+            measurement(
+                "transfer",
+                version,
+                royalty_percentage,
+                batch_size,
+                time.perf_counter() - start,
+                transfer_bundle,
+            )
+        )
+
+        return results
+    finally:
+        await network.close()
+
+
+async def run_benchmarks(batch_sizes: List[int]) -> List[Dict]:
+    results = []
+    for version, royalty_percentage in CONFIGURATIONS:
+        for batch_size in batch_sizes:
+            for result in await run_configuration(
+                version, royalty_percentage, batch_size
+            ):
+                click.echo(
+                    f"v{version} royalty {royalty_percentage:>2}% {result['operation']:>9} "
+                    f"x{batch_size:<5} {result['wall_time']:8.3f} s "
+                    f"{result['spends_per_second']:8.1f} spends/s "
+                    f"{result['clvm_cost_per_spend']:12.0f} cost/spend "
+                    f"{result['bundle_size']:9d} bytes"
+                )
+                results.append(result)
+    return results
+
+
+@click.command()
+@click.option(
+    "--batch-sizes",
+    default="1,10,50",
+    show_default=True,
+    help="Comma separated batch sizes",
+)
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False, writable=True),
+    default="bench_throughput.json",
+    show_default=True,
+    help="The file the results are written to as JSON",
+)
+def main(batch_sizes: str, output: str):
+    sizes = [int(size) for size in batch_sizes.split(",")]
+    results = asyncio.get_event_loop().run_until_complete(run_benchmarks(sizes))
+    with open(output, "wt") as fh:
+        json.dump({"created": time.time(), "results": results}, fh, indent=2)
+    click.echo(f"The results have been written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,135 @@
 #!/usr/bin/env python
 import asyncio
-from typing import Optional, Tuple
+import signal
+from pathlib import Path
+from itertools import islice
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
 
-import aiohttp
 import click
-import requests
 from blspy import PrivateKey, AugSchemeMPL, G2Element
 from click import FLOAT, INT
 from clvm.casts import int_to_bytes
 
 from chia.cmds.units import units
-from chia.cmds.wallet_funcs import get_wallet
-from chia.rpc.wallet_rpc_client import WalletRpcClient
 from chia.types.blockchain_format.coin import Coin
 from chia.types.blockchain_format.program import Program
 from chia.types.blockchain_format.sized_bytes import bytes32
 from chia.types.spend_bundle import SpendBundle
-from chia.util.config import load_config
 from chia.util.default_root import DEFAULT_ROOT_PATH
-from chia.util.ints import uint16, uint32
-from chia.wallet.derive_keys import (
-    master_sk_to_singleton_owner_sk,
-    master_sk_to_wallet_sk,
-)
+from chia.util.keychain import Keychain
 from chia.wallet.puzzles import p2_delegated_puzzle_or_hidden_puzzle
 from chia.wallet.puzzles.singleton_top_layer import SINGLETON_LAUNCHER_HASH
 from chia.wallet.transaction_record import TransactionRecord
+from ownable_singleton.collection import (
+    collection_chunk_indices,
+    genesis_additions,
+    unsigned_collection_chunk,
+)
 from ownable_singleton.drivers.ownable_singleton_driver import (
+    OWNABLE_SINGLETON_V1,
+    OWNABLE_SINGLETON_V2,
+    P2_SINGLETON_OR_CANCEL,
     SINGLETON_AMOUNT,
+    create_offer_cancel,
+    create_transfer,
     create_unsigned_ownable_singleton,
     pay_to_singleton_puzzle,
+    pay_to_singleton_puzzle_hash,
+    transfer_signing_messages,
     Owner,
     Royalty,
 )
+from ownable_singleton.dry_run import DryRunResult, dry_run_spend_bundle
+from ownable_singleton.gallery_client import (
+    GalleryClient,
+    GalleryClientError,
+    GalleryResponse,
+)
+from ownable_singleton.index import (
+    DEFAULT_INDEX_PATH,
+    SingletonIndexError,
+    SingletonRecord,
+    open_singleton_index,
+)
+from ownable_singleton.journal import (
+    CONFIRMED,
+    CONFLICTED,
+    OFFER_SUBMISSION,
+    PENDING,
+    SINGLETON_SUBMISSION,
+    TRANSACTION_SUBMISSION,
+    Submission,
+    SubmissionJournal,
+    SubmissionPoller,
+    open_submission_journal,
+)
+from ownable_singleton.keys import SINGLETON_OWNER_KEY, WALLET_KEY, KeyTable
+from ownable_singleton.manifest import ManifestEntry, ManifestError, read_manifest
+from ownable_singleton.media_hash import (
+    MediaHashError,
+    hash_files,
+    hash_uris,
+    open_media_hash_cache,
+)
+from ownable_singleton.quote import quote_payout, quote_payouts
+from ownable_singleton.reservations import (
+    CoinReservationError,
+    CoinReservations,
+    new_holder,
+    open_coin_reservations,
+)
+from ownable_singleton.rpc_server import (
+    DEFAULT_RPC_HOST,
+    DEFAULT_RPC_PORT,
+    INVALID_PARAMS,
+    OPERATION_FAILED,
+    JsonRpcError,
+    JsonRpcServer,
+    RpcMethod,
+    write_auth_token,
+)
+from ownable_singleton.signing_file import (
+    SigningFileError,
+    SigningRequest,
+    UnsignedFileWriter,
+    assemble_spend_bundles,
+    decode_record,
+    iter_unsigned_records,
+    sign_records,
+    write_signatures_file,
+)
+from ownable_singleton.tracing import (
+    TRACE_ENV,
+    Tracer,
+    disable_tracing,
+    enable_tracing,
+    span,
+    traced,
+)
+from ownable_singleton.verify import verify_spend_bundles
+from ownable_singleton.watch import (
+    OfferWatcher,
+    WatchRule,
+    WatchRulesError,
+    read_watch_rules,
+)
+from ownable_singleton.wallet_session import (
+    WalletSession,
+    WalletSessionError,
+    get_full_node_client,
+    open_wallet_session,
+    start_wallet_session,
+)
 
 AGG_SIG_ME_ADDITIONAL_DATA_TESTNET10 = bytes.fromhex(
     "ae83525ba8d1dd3f09b277de18ca3e43fc0af20d20c4b3e92ef2a48bd291ccb2"
@@ -41,146 +138,526 @@ AGG_SIG_ME_ADDITIONAL_DATA_TESTNET10 = bytes.fromhex(
 SINGLETON_GALLERY_API = "https://testnet.mintgarden.io/api"
 SINGLETON_GALLERY_FRONTEND = "https://testnet.mintgarden.io"
 
+DEFAULT_RPC_TOKEN_PATH = DEFAULT_ROOT_PATH / "nft_companion" / "rpc_token"
+
 
-# Loading the client requires the standard chia root directory configuration that all of the chia commands rely on
-async def get_client() -> Optional[WalletRpcClient]:
-    config = load_config(DEFAULT_ROOT_PATH, "config.yaml")
-    self_hostname = config["self_hostname"]
-    wallet_rpc_port = config["wallet"]["rpc_port"]
+T = TypeVar("T")
 
+
+def run_command(command: Awaitable[T]) -> T:
+    try:
+        return asyncio.get_event_loop().run_until_complete(command)
+    except (
+        WalletSessionError,
+        GalleryClientError,
+        SingletonIndexError,
+        CoinReservationError,
+        MediaHashError,
+    ) as e:
+        raise click.ClickException(str(e))
+
+
+def run_in_session(
+    fingerprint: Optional[int], operation: Callable[[WalletSession], Awaitable[T]]
+) -> T:
+    async def run() -> T:
+        async with open_wallet_session(fingerprint) as session:
+            return await operation(session)
+
+    return run_command(run())
+
+
+def call_gallery(request: Callable[[GalleryClient], Awaitable[T]]) -> T:
+    async def run() -> T:
+        async with GalleryClient(SINGLETON_GALLERY_API) as gallery:
+            return await request(gallery)
+
+    return run_command(run())
+
+
+@traced("wallet.select_coins")
+async def reserve_wallet_coins(
+    session: WalletSession, reservations: CoinReservations, holder: str, amount: int
+) -> Optional[List[Coin]]:
+    """
+    Reserves unspent coins of the scanned wallet keys for `amount`, so concurrent jobs pass
+    different coins to the wallet. Returns None to let the wallet select the coins itself if
+    the full node is not running or the unreserved coins of these keys are not enough.
+    """
     try:
-        wallet_client = await WalletRpcClient.create(
-            self_hostname, uint16(wallet_rpc_port), DEFAULT_ROOT_PATH, config
+        full_node_client = await get_full_node_client()
+    except WalletSessionError:
+        return None
+    try:
+        coin_records = await full_node_client.get_coin_records_by_puzzle_hashes(
+            [
+                key.puzzle_hash
+                for key in session.key_table.by_puzzle_hash.values()
+                if key.kind == WALLET_KEY
+            ],
+            include_spent_coins=False,
         )
-        return wallet_client
-    except Exception as e:
-        if isinstance(e, aiohttp.ClientConnectorError):
-            print(f"Connection error. Check if wallet is running at {wallet_rpc_port}")
-        else:
-            print(f"Exception from 'wallets' {e}")
+    finally:
+        full_node_client.close()
+        await full_node_client.await_closed()
+    try:
+        return await reservations.reserve(
+            [coin_record.coin for coin_record in coin_records], amount, holder
+        )
+    except CoinReservationError:
         return None
 
 
-def master_sk_to_wallet_puzhash(master_sk: PrivateKey) -> bytes32:
-    wallet_sk = master_sk_to_wallet_sk(master_sk, uint32(0))
-    wallet_puzzle = p2_delegated_puzzle_or_hidden_puzzle.puzzle_for_pk(
-        wallet_sk.get_g1()
-    )
-    return wallet_puzzle.get_tree_hash()
+@traced("wallet.create_transaction")
+async def create_reserved_transaction(
+    session: WalletSession, holder: str, additions: List[Dict], fee: int
+) -> TransactionRecord:
+    """
+    Creates a signed wallet transaction from coins that no other job has reserved, and keeps
+    the coins it spends reserved for `holder`.
+    """
+    async with open_coin_reservations() as reservations:
+        coins = await reserve_wallet_coins(
+            session,
+            reservations,
+            holder,
+            sum(addition["amount"] for addition in additions) + fee,
+        )
+        signed_tx = await session.wallet_client.create_signed_transaction(
+            additions, coins=coins, fee=fee
+        )
+        # Coins the wallet selected itself may already belong to another job
+        await reservations.reserve_exactly(
+            [coin.name() for coin in signed_tx.removals], holder
+        )
+    return signed_tx
 
 
-async def get_singleton_wallet(fingerprint: int) -> Tuple[PrivateKey, int]:
-    try:
-        wallet_client: WalletRpcClient = await get_client()
-        wallet_client_f, fingerprint = await get_wallet(wallet_client, fingerprint)
+async def release_reservations(holder: str):
+    # Coins of submitted spend bundles have been handed over by `record_submission` before
+    async with open_coin_reservations() as reservations:
+        await reservations.release([holder])
 
-        private_key = await wallet_client.get_private_key(fingerprint)
-        master_sk = PrivateKey.from_bytes(bytes.fromhex(private_key["sk"]))
-        singleton_sk = master_sk_to_singleton_owner_sk(master_sk, uint32(0))
 
-        return singleton_sk, fingerprint
-    finally:
-        wallet_client.close()
-        await wallet_client.await_closed()
+async def hand_over_reservations(holder: str, new_holder: str):
+    async with open_coin_reservations() as reservations:
+        await reservations.hand_over(holder, new_holder)
+
+
+def command_holder() -> str:
+    """
+    The holder of the coins reserved by the running command, released when it ends.
+    """
+    holder = new_holder()
+    click.get_current_context().call_on_close(
+        lambda: run_command(release_reservations(holder))
+    )
+    return holder
 
 
 async def create_genesis_coin(
-    fingerprint, amt, fee
+    session: WalletSession, holder: str, amt, fee
 ) -> [TransactionRecord, PrivateKey, bytes32]:
-    try:
-        wallet_client: WalletRpcClient = await get_client()
-        wallet_client_f, fingerprint = await get_wallet(wallet_client, fingerprint)
+    signed_tx = await create_reserved_transaction(
+        session,
+        holder,
+        [{"puzzle_hash": session.singleton_puzzle_hash, "amount": amt}],
+        fee,
+    )
+    return signed_tx, session.singleton_sk, session.wallet_puzzle_hash
+
+
+async def create_genesis_coins(
+    session: WalletSession, holders: List[str], chunk_indices: List[range], fee: int
+) -> [List[TransactionRecord], PrivateKey, bytes32]:
+    # One transaction per chunk, each reserving its coins for its own holder. The chunks
+    # are submitted independently, so no two transactions may spend the same coin.
+    signed_txs: List[TransactionRecord] = []
+    for chunk_index, (holder, indices) in enumerate(zip(holders, chunk_indices)):
+        try:
+            signed_txs.append(
+                await create_reserved_transaction(
+                    session,
+                    holder,
+                    genesis_additions(session.singleton_public_key, indices),
+                    fee,
+                )
+            )
+        except CoinReservationError as e:
+            raise CoinReservationError(
+                f"Failed to create the genesis transaction of bundle {chunk_index + 1} of "
+                f"{len(chunk_indices)}, every bundle needs its own wallet coins: {e}"
+            )
+    return signed_txs, session.singleton_sk, session.wallet_puzzle_hash
+
+
+async def create_p2_singleton_coin(
+    session: WalletSession, holder: str, launcher_id: str, amt: int, fee: int
+) -> [TransactionRecord, Program, PrivateKey, bytes32]:
+    # Cancelling the offer returns the payment to the wallet puzzle hash
+    p2_singleton_puzzle = pay_to_singleton_puzzle(
+        bytes.fromhex(launcher_id), session.wallet_puzzle_hash
+    )
+    signed_tx = await create_reserved_transaction(
+        session,
+        holder,
+        [
+            {
+                "puzzle_hash": pay_to_singleton_puzzle_hash(
+                    bytes.fromhex(launcher_id), session.wallet_puzzle_hash
+                ),
+                "amount": amt,
+            }
+        ],
+        fee,
+    )
 
-        private_key = await wallet_client.get_private_key(fingerprint)
-        master_sk = PrivateKey.from_bytes(bytes.fromhex(private_key["sk"]))
-        singleton_sk = master_sk_to_singleton_owner_sk(master_sk, uint32(0))
+    return (
+        signed_tx,
+        p2_singleton_puzzle,
+        session.singleton_sk,
+        session.wallet_puzzle_hash,
+    )
 
-        singleton_wallet_puzhash = p2_delegated_puzzle_or_hidden_puzzle.puzzle_for_pk(
-            singleton_sk.get_g1()
-        ).get_tree_hash()
 
-        signed_tx = await wallet_client.create_signed_transaction(
-            [{"puzzle_hash": singleton_wallet_puzhash, "amount": amt}], fee=fee
+@traced("wallet.create_transaction")
+async def send_p2_singleton_coins(
+    session: WalletSession, holder: str, launcher_ids: List[str], amt: int, fee: int
+) -> TransactionRecord:
+    additions = [
+        {
+            "puzzle_hash": pay_to_singleton_puzzle_hash(
+                bytes.fromhex(launcher_id), session.wallet_puzzle_hash
+            ),
+            "amount": amt,
+        }
+        for launcher_id in launcher_ids
+    ]
+    async with open_coin_reservations() as reservations:
+        coins = await reserve_wallet_coins(
+            session, reservations, holder, amt * len(additions) + fee
         )
-        return signed_tx, singleton_sk, master_sk_to_wallet_puzhash(master_sk)
-    finally:
-        wallet_client.close()
-        await wallet_client.await_closed()
+        try:
+            payment_tx = await session.wallet_client.send_transaction_multi(
+                "1", additions, coins=coins, fee=fee
+            )
+        except BaseException:
+            await reservations.release([holder])
+            raise
+        try:
+            await reservations.reserve_exactly(
+                [coin.name() for coin in payment_tx.removals], holder
+            )
+        except CoinReservationError:
+            # The wallet has already pushed the transaction, the other job will conflict
+            pass
+        await reservations.hand_over(holder, payment_tx.spend_bundle.name().hex())
+    return payment_tx
+
+
+def create_singleton_spend_bundle(
+    signed_tx: TransactionRecord,
+    owner_sk: PrivateKey,
+    wallet_puzzle_hash: bytes32,
+    name: str,
+    uri: str,
+    royalty_percentage: int,
+) -> SpendBundle:
+    genesis_coin: Coin = next(
+        coin for coin in signed_tx.additions if coin.amount == SINGLETON_AMOUNT
+    )
+    genesis_puzzle = p2_delegated_puzzle_or_hidden_puzzle.puzzle_for_pk(
+        owner_sk.get_g1()
+    )
+    creator = Owner(owner_sk.get_g1(), wallet_puzzle_hash)
+    royalty = (
+        Royalty(creator.puzzle_hash, royalty_percentage)
+        if royalty_percentage > 0
+        else None
+    )
 
+    coin_spends, delegated_puzzle = create_unsigned_ownable_singleton(
+        genesis_coin, genesis_puzzle, creator, uri, name, version=2, royalty=royalty
+    )
 
-async def create_p2_singleton_coin(
-    fingerprint: Optional[int], launcher_id: str, amt: int, fee: int
-) -> [TransactionRecord, Program, PrivateKey, bytes32]:
-    try:
-        wallet_client: WalletRpcClient = await get_client()
-        wallet_client_f, fingerprint = await get_wallet(wallet_client, fingerprint)
+    with span("sign"):
+        synthetic_secret_key: PrivateKey = (
+            p2_delegated_puzzle_or_hidden_puzzle.calculate_synthetic_secret_key(
+                owner_sk,
+                p2_delegated_puzzle_or_hidden_puzzle.DEFAULT_HIDDEN_PUZZLE_HASH,
+            )
+        )
+        signature = AugSchemeMPL.sign(
+            synthetic_secret_key,
+            (
+                delegated_puzzle.get_tree_hash()
+                + genesis_coin.name()
+                + AGG_SIG_ME_ADDITIONAL_DATA_TESTNET10
+            ),
+        )
+
+    return SpendBundle.aggregate(
+        [signed_tx.spend_bundle, SpendBundle(coin_spends, signature)]
+    )
+
+
+def launcher_id_of(spend_bundle: SpendBundle) -> bytes32:
+    return next(
+        coin_spend.coin.name()
+        for coin_spend in spend_bundle.coin_spends
+        if coin_spend.coin.puzzle_hash == SINGLETON_LAUNCHER_HASH
+    )
 
-        private_key = await wallet_client.get_private_key(fingerprint)
-        master_sk = PrivateKey.from_bytes(bytes.fromhex(private_key["sk"]))
-        singleton_sk = master_sk_to_singleton_owner_sk(master_sk, uint32(0))
 
-        dummy_p2_singleton_puzzle = pay_to_singleton_puzzle(launcher_id, (b"0" * 32))
+async def create_offer_payment(
+    session: WalletSession,
+    holder: str,
+    launcher_id: str,
+    singleton_id: str,
+    price_in_mojo: int,
+    fee: int,
+) -> Tuple[TransactionRecord, SpendBundle, Coin, Program]:
+    signed_tx: TransactionRecord
+    p2_singleton_puzzle: Program
+    (signed_tx, p2_singleton_puzzle, _, _) = await create_p2_singleton_coin(
+        session, holder, launcher_id, price_in_mojo, fee
+    )
+    p2_singleton_puzzle_hash = p2_singleton_puzzle.get_tree_hash()
+    p2_singleton_coin: Coin = next(
+        coin
+        for coin in signed_tx.additions
+        if coin.puzzle_hash == p2_singleton_puzzle_hash
+    )
 
-        signed_tx = await wallet_client.create_signed_transaction(
-            [{"puzzle_hash": dummy_p2_singleton_puzzle.get_tree_hash(), "amount": amt}],
-            fee=fee,
+    singleton_signature = sign_new_owner(session, singleton_id)
+    payment_spend_bundle = SpendBundle.aggregate(
+        [signed_tx.spend_bundle, SpendBundle([], singleton_signature)]
+    )
+    return signed_tx, payment_spend_bundle, p2_singleton_coin, p2_singleton_puzzle
+
+
+async def record_submission(
+    kind: str, spend_bundle: SpendBundle, label: str, holder: Optional[str] = None
+):
+    # Submitted bundles are tracked by the `pending` command, which releases their coins
+    async with open_submission_journal() as journal:
+        await journal.record(kind, spend_bundle, label)
+    if holder is not None:
+        await hand_over_reservations(holder, spend_bundle.name().hex())
+
+
+async def submit_collection_chunks(
+    gallery: GalleryClient,
+    chunks: Iterable[Tuple[SpendBundle, str]],
+    chunk_count: int,
+    source: str,
+) -> bool:
+    """
+    Submits the chunks of a collection together with the holder of their reserved coins.
+    Each chunk creates the genesis coins it spends, so a rejected chunk does not keep the
+    others from being confirmed.
+    """
+    submitted = 0
+    for chunk_index, (chunk, holder) in enumerate(chunks, start=1):
+        response = await gallery.submit_singleton(chunk)
+        if response.status_code != 200:
+            click.secho(
+                f"Failed to submit bundle {chunk_index} of {chunk_count}:",
+                err=True,
+                fg="red",
+            )
+            click.secho(response.text, err=True, fg="red")
+            continue
+        await record_submission(
+            SINGLETON_SUBMISSION,
+            chunk,
+            f"Bundle {chunk_index} of {chunk_count} of {source}",
+            holder,
         )
-        spent_coin = signed_tx.removals[0]
+        submitted += 1
+    click.secho(
+        f"{submitted} of {chunk_count} bundles have been submitted successfully!",
+        fg="green" if submitted == chunk_count else "yellow",
+    )
+    return submitted == chunk_count
+
+
+@traced("sign")
+def sign_new_owner(session: WalletSession, singleton_id: str) -> G2Element:
+    return AugSchemeMPL.sign(
+        session.singleton_sk,
+        session.wallet_puzzle_hash
+        + bytes.fromhex(singleton_id)
+        + AGG_SIG_ME_ADDITIONAL_DATA_TESTNET10,
+    )
+
+
+@traced("serialize.offer")
+def offer_submission(
+    session: WalletSession,
+    payment_spend_bundle: SpendBundle,
+    p2_singleton_coin: Coin,
+    p2_singleton_puzzle: Program,
+    price: int,
+) -> Dict:
+    return {
+        "payment_spend_bundle": payment_spend_bundle.to_json_dict(
+            include_legacy_keys=False, exclude_modern_keys=False
+        ),
+        "p2_singleton_coin": p2_singleton_coin.to_json_dict(),
+        "p2_singleton_puzzle": bytes(p2_singleton_puzzle).hex(),
+        "new_owner_pubkey": bytes(session.singleton_public_key).hex(),
+        "new_owner_puzhash": session.wallet_puzzle_hash.hex(),
+        "price": price,
+    }
+
+
+async def get_singleton_sk(session: WalletSession) -> PrivateKey:
+    return session.singleton_sk
+
 
-        p2_singleton_puzzle = pay_to_singleton_puzzle(
-            bytes.fromhex(launcher_id), spent_coin.puzzle_hash
+@traced("sign")
+def sign_offer(secret_key: PrivateKey, price: int, singleton_id: str) -> G2Element:
+    return AugSchemeMPL.sign(
+        secret_key,
+        int_to_bytes(price)
+        + bytes.fromhex(singleton_id)
+        + AGG_SIG_ME_ADDITIONAL_DATA_TESTNET10,
+    )
+
+
+async def sign_and_accept_offer(
+    gallery: GalleryClient,
+    launcher_id: str,
+    offer_id: str,
+    offer: Dict,
+    secret_key: PrivateKey,
+) -> GalleryResponse:
+    price_signature: G2Element = sign_offer(
+        secret_key, offer["price"], offer["singleton_id"]
+    )
+    return await gallery.accept_offer(
+        launcher_id, offer_id, bytes(price_signature).hex()
+    )
+
+
+def report_dry_run(spend_bundle: SpendBundle, show_spends: bool = True) -> bool:
+    with span("dry_run", spends=len(spend_bundle.coin_spends)):
+        result: DryRunResult = dry_run_spend_bundle(spend_bundle)
+    if show_spends:
+        for spend_result in result.spend_results:
+            click.echo(
+                f"Spend of coin {spend_result.coin_spend.coin.name()}: "
+                f"CLVM cost {spend_result.clvm_cost}, cost {spend_result.cost}"
+            )
+            for condition in spend_result.conditions:
+                click.echo(
+                    f"    {condition.opcode.name} {' '.join(bytes(var).hex() for var in condition.vars)}"
+                )
+    click.echo(
+        f"The spend bundle costs {result.cost} of at most {result.max_cost} (CLVM cost {result.clvm_cost})."
+    )
+
+    for spend_result in result.errors:
+        click.secho(
+            f"The spend of coin {spend_result.coin_spend.coin.name()} fails: {spend_result.error.name}",
+            err=True,
+            fg="red",
         )
-        signed_tx = await wallet_client.create_signed_transaction(
-            [{"puzzle_hash": p2_singleton_puzzle.get_tree_hash(), "amount": amt}],
-            fee=fee,
-            coins=signed_tx.removals,
+    if result.exceeds_max_cost:
+        click.secho(
+            "The spend bundle exceeds the maximum cost of a transaction.",
+            err=True,
+            fg="red",
         )
+    return result.valid
 
-        return (
-            signed_tx,
-            p2_singleton_puzzle,
-            singleton_sk,
-            master_sk_to_wallet_puzhash(master_sk),
+
+# The number of spend bundles whose signatures are verified together
+VERIFY_BATCH_SIZE = 64
+
+
+def batches(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    items = iter(items)
+    while True:
+        batch = list(islice(items, size))
+        if len(batch) == 0:
+            return
+        yield batch
+
+
+def report_signatures(spend_bundles: List[SpendBundle]) -> bool:
+    with span("verify", spend_bundles=len(spend_bundles)):
+        results = verify_spend_bundles(
+            spend_bundles, AGG_SIG_ME_ADDITIONAL_DATA_TESTNET10
         )
-    finally:
-        wallet_client.close()
-        await wallet_client.await_closed()
+    for spend_bundle, valid in zip(spend_bundles, results):
+        if not valid:
+            click.secho(
+                f"The signature of spend bundle {spend_bundle.name()} is invalid.",
+                err=True,
+                fg="red",
+            )
+    return all(results)
 
 
-async def sign_offer(
-    fingerprint: Optional[int], price: int, singleton_id: str
-) -> [TransactionRecord, Program, PrivateKey]:
-    try:
-        wallet_client: WalletRpcClient = await get_client()
-        wallet_client_f, fingerprint = await get_wallet(wallet_client, fingerprint)
+dry_run_option = click.option(
+    "--dry-run",
+    is_flag=True,
+    default=False,
+    help="Only run the transaction locally and report its cost, without submitting it",
+)
+index_option = click.option(
+    "--index",
+    "index_path",
+    type=click.Path(dir_okay=False),
+    default=str(DEFAULT_INDEX_PATH),
+    show_default=True,
+    help="The SQLite file of the local singleton index",
+)
 
-        private_key = await wallet_client.get_private_key(fingerprint)
-        master_sk = PrivateKey.from_bytes(bytes.fromhex(private_key["sk"]))
-        singleton_sk = master_sk_to_singleton_owner_sk(master_sk, uint32(0))
 
-        return AugSchemeMPL.sign(
-            singleton_sk,
-            int_to_bytes(price)
-            + bytes.fromhex(singleton_id)
-            + AGG_SIG_ME_ADDITIONAL_DATA_TESTNET10,
+def report_trace(tracer: Tracer, show_summary: bool):
+    if show_summary:
+        click.echo(
+            f"{'Phase':<32} {'Count':>6} {'Total (ms)':>12} {'Max (ms)':>12}", err=True
         )
-    finally:
-        wallet_client.close()
-        await wallet_client.await_closed()
+        for name, count, total, maximum in tracer.summary():
+            click.echo(
+                f"{name:<32} {count:>6} {total * 1000:>12.2f} {maximum * 1000:>12.2f}",
+                err=True,
+            )
+    disable_tracing()
 
 
 @click.group()
-def cli():
-    pass
+@click.option(
+    "--trace",
+    "trace_path",
+    type=click.Path(dir_okay=False, writable=True),
+    envvar=TRACE_ENV,
+    help="Append the timed phases of the command to this file as JSON lines",
+)
+@click.option(
+    "--trace-summary",
+    is_flag=True,
+    default=False,
+    help="Print the time spent in each phase of the command",
+)
+@click.pass_context
+def cli(ctx: click.Context, trace_path: Optional[str], trace_summary: bool):
+    if trace_path is None and not trace_summary:
+        return
+    tracer = enable_tracing(trace_path)
+    # The command span is closed first, so it is part of the summary
+    ctx.call_on_close(lambda: report_trace(tracer, trace_summary))
+    ctx.with_resource(span("command", command=ctx.invoked_subcommand))
 
 
 @cli.command()
 @click.option("--fingerprint", type=int, help="The fingerprint of the key to use")
 def profile(fingerprint: int):
-    singleton_sk: PrivateKey
-    singleton_sk, _ = asyncio.get_event_loop().run_until_complete(
-        get_singleton_wallet(fingerprint)
-    )
+    singleton_sk: PrivateKey = run_in_session(fingerprint, get_singleton_sk)
 
     click.echo(
         f"Your singleton profile is {SINGLETON_GALLERY_FRONTEND}/profile/{bytes(singleton_sk.get_g1()).hex()}"
@@ -191,21 +668,20 @@ def profile(fingerprint: int):
 @click.option("--name", prompt=True, help="Your profile name")
 @click.option("--fingerprint", type=int, help="The fingerprint of the key to use")
 def update_profile(name: str, fingerprint: int):
-    singleton_sk: PrivateKey
-    singleton_sk, _ = asyncio.get_event_loop().run_until_complete(
-        get_singleton_wallet(fingerprint)
-    )
+    singleton_sk: PrivateKey = run_in_session(fingerprint, get_singleton_sk)
 
     public_key = singleton_sk.get_g1()
-    signature = AugSchemeMPL.sign(
-        singleton_sk,
-        bytes(public_key) + bytes(name, "utf-8"),
-    )
+    with span("sign"):
+        signature = AugSchemeMPL.sign(
+            singleton_sk,
+            bytes(public_key) + bytes(name, "utf-8"),
+        )
 
     if click.confirm(f"Do you want to set your profile name to {name}?"):
-        response = requests.patch(
-            f"{SINGLETON_GALLERY_API}/profile/{public_key}",
-            json={"signature": bytes(signature).hex(), "name": name},
+        response: GalleryResponse = call_gallery(
+            lambda gallery: gallery.update_profile(
+                bytes(public_key).hex(), name, bytes(signature).hex()
+            )
         )
         if response.status_code != 200:
             click.secho("Failed to update profile:", err=True, fg="red")
@@ -239,175 +715,608 @@ def update_profile(name: str, fingerprint: int):
     show_default=True,
     help="The XCH fee to use for this transaction",
 )
-def create(name: str, uri: str, fingerprint: int, royalty_percentage: int, fee: int):
+@dry_run_option
+def create(
+    name: str,
+    uri: str,
+    fingerprint: int,
+    royalty_percentage: int,
+    fee: int,
+    dry_run: bool,
+):
     if royalty_percentage > 99 or royalty_percentage < 0:
         click.secho(
             f"Royalty percentage has to be between 1 and 99.", err=True, fg="red"
         )
         return
 
+    holder = command_holder()
     signed_tx: TransactionRecord
     owner_sk: PrivateKey
     wallet_puzzle_hash: bytes32
-    (
-        signed_tx,
-        owner_sk,
-        wallet_puzzle_hash,
-    ) = asyncio.get_event_loop().run_until_complete(
-        create_genesis_coin(fingerprint, SINGLETON_AMOUNT, fee)
-    )
-    genesis_coin: Coin = next(
-        coin for coin in signed_tx.additions if coin.amount == SINGLETON_AMOUNT
-    )
-    genesis_puzzle = p2_delegated_puzzle_or_hidden_puzzle.puzzle_for_pk(
-        owner_sk.get_g1()
-    )
-    creator = Owner(owner_sk.get_g1(), wallet_puzzle_hash)
-    royalty = (
-        Royalty(creator.puzzle_hash, royalty_percentage)
-        if royalty_percentage > 0
-        else None
-    )
-
-    coin_spends, delegated_puzzle = create_unsigned_ownable_singleton(
-        genesis_coin, genesis_puzzle, creator, uri, name, version=2, royalty=royalty
-    )
-
-    synthetic_secret_key: PrivateKey = (
-        p2_delegated_puzzle_or_hidden_puzzle.calculate_synthetic_secret_key(
-            owner_sk,
-            p2_delegated_puzzle_or_hidden_puzzle.DEFAULT_HIDDEN_PUZZLE_HASH,
-        )
+    signed_tx, owner_sk, wallet_puzzle_hash = run_in_session(
+        fingerprint,
+        lambda session: create_genesis_coin(session, holder, SINGLETON_AMOUNT, fee),
     )
-    signature = AugSchemeMPL.sign(
-        synthetic_secret_key,
-        (
-            delegated_puzzle.get_tree_hash()
-            + genesis_coin.name()
-            + AGG_SIG_ME_ADDITIONAL_DATA_TESTNET10
-        ),
+    combined_spend_bundle: SpendBundle = create_singleton_spend_bundle(
+        signed_tx, owner_sk, wallet_puzzle_hash, name, uri, royalty_percentage
     )
 
-    combined_spend_bundle: SpendBundle = SpendBundle.aggregate(
-        [signed_tx.spend_bundle, SpendBundle(coin_spends, signature)]
-    )
+    if not report_dry_run(combined_spend_bundle):
+        return
+    if not report_signatures([combined_spend_bundle]) or dry_run:
+        return
 
     if click.confirm("The transaction seems valid. Do you want to submit it?"):
-        response = requests.post(
-            f"{SINGLETON_GALLERY_API}/singletons/submit",
-            json=combined_spend_bundle.to_json_dict(
-                include_legacy_keys=False, exclude_modern_keys=False
-            ),
+        response: GalleryResponse = call_gallery(
+            lambda gallery: gallery.submit_singleton(combined_spend_bundle)
         )
         if response.status_code != 200:
             click.secho("Failed to submit NFT:", err=True, fg="red")
             click.secho(response.text, err=True, fg="red")
         else:
-            launcher_coin_record = next(
-                coin
-                for coin in combined_spend_bundle.coin_spends
-                if coin.coin.puzzle_hash == SINGLETON_LAUNCHER_HASH
+            run_command(
+                record_submission(
+                    SINGLETON_SUBMISSION,
+                    combined_spend_bundle,
+                    launcher_id_of(combined_spend_bundle).hex(),
+                    holder,
+                )
             )
             click.secho("Your NFT has been submitted successfully!", fg="green")
             click.echo(
                 "Please wait a few minutes until the NFT has been added to the blockchain."
             )
             click.echo(
-                f"You can inspect your NFT using the following link: {SINGLETON_GALLERY_FRONTEND}/singletons/{launcher_coin_record.coin.name()}?pending=1"
+                f"You can inspect your NFT using the following link: {SINGLETON_GALLERY_FRONTEND}/singletons/{launcher_id_of(combined_spend_bundle)}?pending=1"
+            )
+
+
+async def hash_manifest_media(entries: List[ManifestEntry], download_concurrency: int):
+    # Entries with a local file are hashed from it, the others are downloaded
+    remote_uris = [entry.uri for entry in entries if entry.file is None]
+    for uri in remote_uris:
+        if not uri.startswith(("http://", "https://")):
+            raise MediaHashError(
+                f"Cannot download {uri}, add its local copy to the file column of the manifest"
             )
+    async with open_media_hash_cache() as cache:
+        file_hashes, uri_hashes = await asyncio.gather(
+            hash_files([entry.file for entry in entries if entry.file], cache),
+            hash_uris(remote_uris, download_concurrency),
+        )
+    for entry in entries:
+        entry.content_hash = (
+            file_hashes[entry.file] if entry.file is not None else uri_hashes[entry.uri]
+        )
+
+
+def export_unsigned_collection(
+    path: str, chunks: Iterable[Tuple[SpendBundle, List[SigningRequest], str]]
+) -> int:
+    with open(path, "wb") as output:
+        writer = UnsignedFileWriter(output)
+        for spend_bundle, requests, holder in chunks:
+            writer.write(spend_bundle, requests)
+            # The coins stay reserved under the name of the unsigned bundle until
+            # `submit-file`
+            run_command(hand_over_reservations(holder, spend_bundle.name().hex()))
+    return writer.count
 
 
 @cli.command()
-@click.option("--launcher-id", prompt=True, help="The ID of the NFT")
 @click.option(
-    "--price",
-    type=float,
-    prompt=True,
-    help="The price (in XCH) you want to offer for this NFT singleton",
+    "--manifest",
+    type=click.Path(exists=True, dir_okay=False),
+    required=True,
+    help="A CSV or JSONL file with the name, uri and royalty of each NFT",
 )
 @click.option("--fingerprint", type=int, help="The fingerprint of the key to use")
 @click.option(
     "--fee",
+    type=click.IntRange(min=0),
     required=True,
     default=0,
     show_default=True,
-    help="The XCH fee to use for this transaction",
+    help="The fee in mojos to use for the genesis transaction of each bundle",
 )
-def offer(launcher_id: str, price: float, fingerprint: Optional[int], fee: int):
-    response = requests.get(f"{SINGLETON_GALLERY_API}/singletons/{launcher_id}")
-    if response.status_code != 200:
+@click.option(
+    "--chunk-size",
+    type=click.IntRange(min=1),
+    default=50,
+    show_default=True,
+    help="The maximum number of NFTs per submitted spend bundle",
+)
+@click.option(
+    "--export",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Write the unsigned spends to this file for `sign-file`, instead of signing and submitting them",
+)
+@click.option(
+    "--hash-media",
+    is_flag=True,
+    default=False,
+    help="Add the sha256 of each media file to its NFT, hashing the local file or downloading the uri",
+)
+@click.option(
+    "--download-concurrency",
+    type=click.IntRange(min=1),
+    default=8,
+    show_default=True,
+    help="The maximum number of concurrent downloads when hashing media",
+)
+@dry_run_option
+def create_collection(
+    manifest: str,
+    fingerprint: int,
+    fee: int,
+    chunk_size: int,
+    export: Optional[str],
+    hash_media: bool,
+    download_concurrency: int,
+    dry_run: bool,
+):
+    try:
+        entries: List[ManifestEntry] = list(read_manifest(Path(manifest)))
+    except ManifestError as e:
+        click.secho(f"Invalid manifest: {e}", err=True, fg="red")
+        return
+    if len(entries) == 0:
+        click.secho("The manifest does not contain any NFTs.", err=True, fg="yellow")
+        return
+    if hash_media:
+        run_command(hash_manifest_media(entries, download_concurrency))
+        click.echo(f"The media of {len(entries)} NFTs has been hashed.")
+
+    chunk_indices: List[range] = collection_chunk_indices(len(entries), chunk_size)
+    holders: List[str] = [command_holder() for _ in chunk_indices]
+    genesis_txs: List[TransactionRecord]
+    owner_sk: PrivateKey
+    wallet_puzzle_hash: bytes32
+    genesis_txs, owner_sk, wallet_puzzle_hash = run_in_session(
+        fingerprint,
+        lambda session: create_genesis_coins(session, holders, chunk_indices, fee),
+    )
+    creator = Owner(owner_sk.get_g1(), wallet_puzzle_hash)
+
+    def unsigned_chunks() -> Iterator[Tuple[SpendBundle, List[SigningRequest], str]]:
+        for indices, genesis_tx, holder in zip(chunk_indices, genesis_txs, holders):
+            spend_bundle, requests = unsigned_collection_chunk(
+                entries[indices.start : indices.stop],
+                indices,
+                genesis_tx.spend_bundle,
+                creator,
+                AGG_SIG_ME_ADDITIONAL_DATA_TESTNET10,
+            )
+            yield spend_bundle, requests, holder
+
+    if export is not None:
+        count = export_unsigned_collection(export, unsigned_chunks())
         click.secho(
-            f"Could not find an NFT with ID '{launcher_id}'", err=True, fg="red"
+            f"The unsigned spends of {len(entries)} NFTs in {count} bundles have been "
+            f"written to {export}.",
+            fg="green",
+        )
+        click.echo(
+            "Sign them with `sign-file` on the computer that holds your key, and submit them "
+            "with `submit-file` within a day, while the coins of the genesis transactions stay "
+            "reserved."
         )
         return
-    singleton = response.json()
-    name = singleton["name"]
-    owner = singleton["owner"]
 
-    price_in_mojo = int(price * units["chia"])
+    chunks: List[Tuple[SpendBundle, str]] = []
+    for spend_bundle, requests, holder in unsigned_chunks():
+        with span("sign"):
+            signature = AugSchemeMPL.aggregate(
+                [spend_bundle.aggregated_signature]
+                + [
+                    AugSchemeMPL.sign(
+                        p2_delegated_puzzle_or_hidden_puzzle.calculate_synthetic_secret_key(
+                            owner_sk, request.hidden_puzzle_hash
+                        ),
+                        request.message,
+                    )
+                    for request in requests
+                ]
+            )
+        chunks.append((SpendBundle(spend_bundle.coin_spends, signature), holder))
 
-    try:
-        signed_tx: TransactionRecord
-        p2_singleton_puzzle: Program
-        owner_sk: PrivateKey
-        wallet_puzzle_hash: bytes32
-        (
-            signed_tx,
-            p2_singleton_puzzle,
-            owner_sk,
-            wallet_puzzle_hash,
-        ) = asyncio.get_event_loop().run_until_complete(
-            create_p2_singleton_coin(fingerprint, launcher_id, price_in_mojo, fee)
-        )
-        p2_singleton_coin: Coin = next(
-            coin
-            for coin in signed_tx.additions
-            if coin.puzzle_hash == p2_singleton_puzzle.get_tree_hash()
-        )
-    except TypeError:
+    if not report_signatures([chunk for chunk, _ in chunks]):
+        return
+    for chunk_index, (chunk, _) in enumerate(chunks):
+        click.echo(f"Bundle {chunk_index + 1} of {len(chunks)}:")
+        if not report_dry_run(chunk, show_spends=False):
+            return
+    if dry_run:
         return
 
-    new_owner_pubkey = owner_sk.get_g1()
-    if owner == bytes(new_owner_pubkey).hex():
-        click.secho(
-            "This is your singleton, you can't create an offer for it.", fg="yellow"
-        )
+    if not click.confirm(
+        f"The transactions for {len(entries)} NFTs in {len(chunks)} bundles seem valid. Do you want to submit them?"
+    ):
         return
 
-    singleton_signature = AugSchemeMPL.sign(
-        owner_sk,
-        wallet_puzzle_hash
-        + bytes.fromhex(singleton["singleton_id"])
-        + AGG_SIG_ME_ADDITIONAL_DATA_TESTNET10,
+    if not call_gallery(
+        lambda gallery: submit_collection_chunks(gallery, chunks, len(chunks), manifest)
+    ):
+        return
+
+    click.echo(
+        "Please wait a few minutes until the NFTs have been added to the blockchain."
     )
-    payment_spend_bundle = SpendBundle.aggregate(
-        [signed_tx.spend_bundle, SpendBundle([], singleton_signature)]
+    launcher_ids: List[bytes32] = [
+        coin_spend.coin.name()
+        for chunk, _ in chunks
+        for coin_spend in chunk.coin_spends
+        if coin_spend.coin.puzzle_hash == SINGLETON_LAUNCHER_HASH
+    ]
+    for entry, launcher_id in zip(entries, launcher_ids):
+        click.echo(
+            f"{entry.name}: {SINGLETON_GALLERY_FRONTEND}/singletons/{launcher_id}?pending=1"
+        )
+
+
+def keychain_private_key(fingerprint: Optional[int]) -> PrivateKey:
+    # Offline signing reads the key from the local keychain, no wallet has to be running
+    keychain = Keychain()
+    key = (
+        keychain.get_private_key_by_fingerprint(fingerprint)
+        if fingerprint is not None
+        else keychain.get_first_private_key()
     )
+    if key is None:
+        raise click.ClickException("The key has not been found in the keychain")
+    return key[0]
 
-    if click.confirm(
-        f"You are offering {price} XCH for '{name}'. Do you want to submit it?"
-    ):
-        response = requests.post(
-            f"{SINGLETON_GALLERY_API}/singletons/{launcher_id}/offers/submit",
-            json={
-                "payment_spend_bundle": payment_spend_bundle.to_json_dict(
-                    include_legacy_keys=False, exclude_modern_keys=False
+
+unsigned_file_option = click.option(
+    "--unsigned",
+    "unsigned_path",
+    type=click.Path(exists=True, dir_okay=False),
+    required=True,
+    help="The unsigned file written by `create-collection --export`",
+)
+
+
+@cli.command()
+@unsigned_file_option
+@click.option(
+    "--output",
+    "output_path",
+    type=click.Path(dir_okay=False, writable=True),
+    required=True,
+    help="The file the signatures are written to",
+)
+@click.option("--fingerprint", type=int, help="The fingerprint of the key to use")
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    help="The number of signing processes  [default: the number of CPUs]",
+)
+def sign_file(
+    unsigned_path: str,
+    output_path: str,
+    fingerprint: Optional[int],
+    workers: Optional[int],
+):
+    master_sk = keychain_private_key(fingerprint)
+    # The signatures only replace the output file once all records have been signed
+    partial_path = Path(f"{output_path}.partial")
+    try:
+        with open(partial_path, "wb") as output, span("sign"):
+            count = write_signatures_file(
+                output,
+                sign_records(
+                    master_sk,
+                    iter_unsigned_records(unsigned_path),
+                    AGG_SIG_ME_ADDITIONAL_DATA_TESTNET10,
+                    workers,
                 ),
-                "p2_singleton_coin": p2_singleton_coin.to_json_dict(),
-                "p2_singleton_puzzle": bytes(p2_singleton_puzzle).hex(),
-                "new_owner_pubkey": bytes(new_owner_pubkey).hex(),
-                "new_owner_puzhash": wallet_puzzle_hash.hex(),
-                "price": price_in_mojo,
-            },
+            )
+    except SigningFileError as e:
+        partial_path.unlink()
+        raise click.ClickException(str(e))
+    partial_path.replace(output_path)
+    click.secho(
+        f"{count} records have been signed, the signatures have been written to {output_path}.",
+        fg="green",
+    )
+
+
+@cli.command()
+@unsigned_file_option
+@click.option(
+    "--signatures",
+    "signatures_path",
+    type=click.Path(exists=True, dir_okay=False),
+    required=True,
+    help="The signatures written by `sign-file`",
+)
+@dry_run_option
+def submit_file(unsigned_path: str, signatures_path: str, dry_run: bool):
+    def chunks() -> Iterator[SpendBundle]:
+        # The files are streamed twice, to check and to submit the bundles, so the records
+        # never have to fit into memory together. Each record is one bundle of the collection.
+        return assemble_spend_bundles(unsigned_path, signatures_path)
+
+    chunk_count = 0
+    try:
+        for batch in batches(chunks(), VERIFY_BATCH_SIZE):
+            if not report_signatures(batch):
+                return
+            for chunk in batch:
+                chunk_count += 1
+                click.echo(f"Bundle {chunk_count}:")
+                if not report_dry_run(chunk, show_spends=False):
+                    return
+    except SigningFileError as e:
+        click.secho(str(e), err=True, fg="red")
+        return
+    if chunk_count == 0:
+        click.secho("The file does not contain any spends.", err=True, fg="yellow")
+        return
+    if dry_run:
+        return
+
+    if not click.confirm(
+        f"The transactions in {chunk_count} bundles seem valid. Do you want to submit them?"
+    ):
+        return
+
+    # The coins of each genesis transaction are reserved under the name of its unsigned bundle
+    holders = (
+        decode_record(record)[0].name().hex()
+        for record in iter_unsigned_records(unsigned_path)
+    )
+    if call_gallery(
+        lambda gallery: submit_collection_chunks(
+            gallery, zip(chunks(), holders), chunk_count, unsigned_path
         )
-        if response.status_code != 200:
-            click.secho("Failed to submit offer:", err=True, fg="red")
-            click.secho(response.text, err=True, fg="red")
-        else:
-            click.secho("Your offer has been submitted successfully!", fg="green")
-            click.echo(
-                f"You can inspect it using the following link: {SINGLETON_GALLERY_FRONTEND}/singletons/{launcher_id}"
+    ):
+        click.echo(
+            "Please wait a few minutes until the NFTs have been added to the blockchain."
+        )
+
+
+@cli.command()
+@click.option("--launcher-id", prompt=True, help="The ID of the NFT")
+@click.option(
+    "--price",
+    type=float,
+    prompt=True,
+    help="The price (in XCH) you want to offer for this NFT singleton",
+)
+@click.option("--fingerprint", type=int, help="The fingerprint of the key to use")
+@click.option(
+    "--fee",
+    required=True,
+    default=0,
+    show_default=True,
+    help="The XCH fee to use for this transaction",
+)
+@dry_run_option
+def offer(
+    launcher_id: str, price: float, fingerprint: Optional[int], fee: int, dry_run: bool
+):
+    holder = command_holder()
+
+    async def run():
+        async with GalleryClient(
+            SINGLETON_GALLERY_API
+        ) as gallery, start_wallet_session(fingerprint) as pending_session:
+            response = await gallery.get_singleton(launcher_id)
+            if response.status_code != 200:
+                click.secho(
+                    f"Could not find an NFT with ID '{launcher_id}'", err=True, fg="red"
+                )
+                return
+            singleton = response.json()
+            name = singleton["name"]
+            owner = singleton["owner"]
+
+            price_in_mojo = int(price * units["chia"])
+
+            session: WalletSession = await pending_session
+            if session.singleton_owner_key(owner) is not None:
+                click.secho(
+                    "This is your singleton, you can't create an offer for it.",
+                    fg="yellow",
+                )
+                return
+
+            (
+                signed_tx,
+                payment_spend_bundle,
+                p2_singleton_coin,
+                p2_singleton_puzzle,
+            ) = await create_offer_payment(
+                session,
+                holder,
+                launcher_id,
+                singleton["singleton_id"],
+                price_in_mojo,
+                fee,
+            )
+            # The singleton signature belongs to the singleton spend, which is only added
+            # when the offer is accepted. Only the payment transaction can be verified here.
+            if not report_dry_run(payment_spend_bundle):
+                return
+            if not report_signatures([signed_tx.spend_bundle]) or dry_run:
+                return
+
+            if click.confirm(
+                f"You are offering {price} XCH for '{name}'. Do you want to submit it?"
+            ):
+                response = await gallery.submit_offer(
+                    launcher_id,
+                    offer_submission(
+                        session,
+                        payment_spend_bundle,
+                        p2_singleton_coin,
+                        p2_singleton_puzzle,
+                        price_in_mojo,
+                    ),
+                )
+                if response.status_code != 200:
+                    click.secho("Failed to submit offer:", err=True, fg="red")
+                    click.secho(response.text, err=True, fg="red")
+                else:
+                    await record_submission(
+                        OFFER_SUBMISSION, signed_tx.spend_bundle, launcher_id, holder
+                    )
+                    click.secho(
+                        "Your offer has been submitted successfully!", fg="green"
+                    )
+                    click.echo(
+                        f"You can inspect it using the following link: {SINGLETON_GALLERY_FRONTEND}/singletons/{launcher_id}"
+                    )
+
+    run_command(run())
+
+
+@cli.command()
+@click.option(
+    "--launcher-ids",
+    "launcher_ids_file",
+    type=click.File("rt"),
+    required=True,
+    help="A file with the ID of one NFT per line",
+)
+@click.option(
+    "--price",
+    type=float,
+    prompt=True,
+    help="The price (in XCH) you want to offer for each NFT singleton",
+)
+@click.option("--fingerprint", type=int, help="The fingerprint of the key to use")
+@click.option(
+    "--fee",
+    type=click.IntRange(min=0),
+    required=True,
+    default=0,
+    show_default=True,
+    help="The fee in mojos to use for the payment transaction",
+)
+def offer_many(launcher_ids_file, price: float, fingerprint: Optional[int], fee: int):
+    launcher_ids: List[str] = list(
+        dict.fromkeys(line.strip() for line in launcher_ids_file if line.strip())
+    )
+    if len(launcher_ids) == 0:
+        click.secho("No NFT IDs have been given.", err=True, fg="yellow")
+        return
+    price_in_mojo = int(price * units["chia"])
+
+    async def run():
+        async with GalleryClient(
+            SINGLETON_GALLERY_API
+        ) as gallery, start_wallet_session(fingerprint) as pending_session:
+            responses = await asyncio.gather(
+                *(gallery.get_singleton(launcher_id) for launcher_id in launcher_ids)
+            )
+            session: WalletSession = await pending_session
+
+            singletons: Dict[str, Dict] = {}
+            for launcher_id, response in zip(launcher_ids, responses):
+                if response.status_code != 200:
+                    click.secho(
+                        f"Could not find an NFT with ID '{launcher_id}', skipping it.",
+                        err=True,
+                        fg="yellow",
+                    )
+                elif session.singleton_owner_key(response.json()["owner"]) is not None:
+                    click.secho(
+                        f"'{response.json()['name']}' is your singleton, skipping it.",
+                        err=True,
+                        fg="yellow",
+                    )
+                else:
+                    singletons[launcher_id] = response.json()
+            if len(singletons) == 0:
+                return
+
+            if not click.confirm(
+                f"You are offering {price} XCH each for {len(singletons)} NFTs. "
+                f"The payments are locked in offer coins until the offers are accepted or cancelled. "
+                f"Do you want to submit them?"
+            ):
+                return
+
+            # The payments for all offers are created by one wallet transaction, which has to be
+            # on chain before the first offer is accepted. Each offer only carries its signature.
+            payment_tx: TransactionRecord = await send_p2_singleton_coins(
+                session, new_holder(), list(singletons.keys()), price_in_mojo, fee
+            )
+            await record_submission(
+                OFFER_SUBMISSION,
+                payment_tx.spend_bundle,
+                f"Payments of {len(singletons)} offers",
+            )
+            p2_singleton_coins: Dict[bytes32, Coin] = {
+                coin.puzzle_hash: coin for coin in payment_tx.additions
+            }
+
+            async def submit(launcher_id: str, singleton: Dict) -> bool:
+                p2_singleton_puzzle = pay_to_singleton_puzzle(
+                    bytes.fromhex(launcher_id), session.wallet_puzzle_hash
+                )
+                p2_singleton_coin = p2_singleton_coins[
+                    pay_to_singleton_puzzle_hash(
+                        bytes.fromhex(launcher_id), session.wallet_puzzle_hash
+                    )
+                ]
+                payment_spend_bundle = SpendBundle(
+                    [], sign_new_owner(session, singleton["singleton_id"])
+                )
+                try:
+                    response = await gallery.submit_offer(
+                        launcher_id,
+                        offer_submission(
+                            session,
+                            payment_spend_bundle,
+                            p2_singleton_coin,
+                            p2_singleton_puzzle,
+                            price_in_mojo,
+                        ),
+                    )
+                    error = None if response.status_code == 200 else response.text
+                except GalleryClientError as e:
+                    error = str(e)
+                if error is not None:
+                    click.secho(
+                        f"Failed to submit offer for '{singleton['name']}', "
+                        f"its payment is locked in coin {p2_singleton_coin.name().hex()}:",
+                        err=True,
+                        fg="red",
+                    )
+                    click.secho(error, err=True, fg="red")
+                    return False
+                return True
+
+            results = await asyncio.gather(
+                *(
+                    submit(launcher_id, singleton)
+                    for launcher_id, singleton in singletons.items()
+                )
+            )
+            click.secho(
+                f"{sum(results)} of {len(results)} offers have been submitted successfully!",
+                fg="green" if all(results) else "yellow",
             )
+            if not all(results):
+                failed = [
+                    launcher_id
+                    for launcher_id, submitted in zip(singletons.keys(), results)
+                    if not submitted
+                ]
+                click.secho(
+                    "Once the payments are confirmed, use `reclaim-offers` with these NFT IDs "
+                    "to get back the payments of the offers that were not submitted:",
+                    err=True,
+                    fg="yellow",
+                )
+                for launcher_id in failed:
+                    click.echo(launcher_id, err=True)
+
+    run_command(run())
 
 
 @cli.command()
@@ -415,55 +1324,203 @@ def offer(launcher_id: str, price: float, fingerprint: Optional[int], fee: int):
 @click.option("--offer-id", prompt=True, help="The ID of the offer you want to accept")
 @click.option("--fingerprint", type=int, help="The fingerprint of the key to use")
 def accept_offer(launcher_id: str, offer_id: str, fingerprint: Optional[int]):
-    singleton_response = requests.get(
-        f"{SINGLETON_GALLERY_API}/singletons/{launcher_id}"
-    )
-    if singleton_response.status_code != 200:
-        click.secho(
-            f"Could not find an NFT with ID '{launcher_id}'", err=True, fg="red"
-        )
-        return
-    name = singleton_response.json()["name"]
-    royalty_percentage = singleton_response.json()["royalty_percentage"]
+    async def run():
+        async with GalleryClient(
+            SINGLETON_GALLERY_API
+        ) as gallery, start_wallet_session(fingerprint) as pending_session:
+            singleton_response, offer_response = await asyncio.gather(
+                gallery.get_singleton(launcher_id),
+                gallery.get_offer(launcher_id, offer_id),
+            )
+            if singleton_response.status_code != 200:
+                click.secho(
+                    f"Could not find an NFT with ID '{launcher_id}'", err=True, fg="red"
+                )
+                return
+            name = singleton_response.json()["name"]
+            royalty_percentage = singleton_response.json()["royalty_percentage"]
+
+            if offer_response.status_code != 200:
+                click.secho(
+                    f"Could not find an offer with ID '{offer_id}' for NFT '{name}'.",
+                    err=True,
+                    fg="yellow",
+                )
+                return
+            offer = offer_response.json()
+            price = offer["price"]
+            price_in_chia = price / units["chia"]
+
+            session: WalletSession = await pending_session
+            owner_key = session.singleton_owner_key(singleton_response.json()["owner"])
+            if owner_key is None:
+                click.secho(f"'{name}' is not your singleton.", err=True, fg="red")
+                return
+
+            seller_amount, creator_amount = quote_payout(price, royalty_percentage)
+            royalty_text = (
+                f" A share of {royalty_percentage}% of that price is sent to its creator,"
+                f" so you receive {seller_amount / units['chia']} XCH"
+                f" and the creator {creator_amount / units['chia']} XCH."
+                if royalty_percentage > 0
+                else ""
+            )
+            if click.confirm(
+                f"You are accepting {price_in_chia} XCH for '{name}'.{royalty_text} Do you want to submit it?"
+            ):
+                response = await sign_and_accept_offer(
+                    gallery, launcher_id, offer_id, offer, owner_key.secret_key
+                )
+                if response.status_code != 200:
+                    click.secho("Failed to accept offer:", err=True, fg="red")
+                    click.secho(response.text, err=True, fg="red")
+                else:
+                    click.secho("You accepted the offer!", fg="green")
+                    click.echo(f"The payment is being sent to your wallet address.")
+
+    run_command(run())
 
-    offer_response = requests.get(
-        f"{SINGLETON_GALLERY_API}/singletons/{launcher_id}/offers/{offer_id}"
-    )
-    if offer_response.status_code != 200:
-        click.secho(
-            f"Could not find an offer with ID '{offer_id}' for NFT '{name}'.",
-            err=True,
-            fg="yellow",
-        )
+
+@cli.command()
+@click.option(
+    "--offers",
+    "offers_file",
+    type=click.File("rt"),
+    required=True,
+    help="A file with one 'launcher_id,offer_id' pair per line",
+)
+@click.option(
+    "--concurrency",
+    type=click.IntRange(min=1),
+    default=8,
+    show_default=True,
+    help="The maximum number of concurrent requests",
+)
+@click.option("--fingerprint", type=int, help="The fingerprint of the key to use")
+def accept_offers(offers_file, concurrency: int, fingerprint: Optional[int]):
+    pairs: List[Tuple[str, str]] = []
+    for line_number, line in enumerate(offers_file, start=1):
+        if not line.strip():
+            continue
+        parts = [part.strip() for part in line.split(",")]
+        if len(parts) != 2 or not all(parts):
+            raise click.ClickException(
+                f"Line {line_number}: expected 'launcher_id,offer_id'"
+            )
+        pairs.append((parts[0], parts[1]))
+    pairs = list(dict.fromkeys(pairs))
+    if len(pairs) == 0:
+        click.secho("No offers have been given.", err=True, fg="yellow")
         return
-    offer = offer_response.json()
-    price = offer["price"]
-    price_in_chia = price / units["chia"]
 
-    price_signature: G2Element = asyncio.get_event_loop().run_until_complete(
-        sign_offer(fingerprint, price, offer["singleton_id"])
-    )
+    async def run():
+        async with GalleryClient(
+            SINGLETON_GALLERY_API, max_concurrency=concurrency
+        ) as gallery, start_wallet_session(fingerprint) as pending_session:
+            launcher_ids = list(dict.fromkeys(launcher_id for launcher_id, _ in pairs))
+            singleton_responses, offer_responses = await asyncio.gather(
+                asyncio.gather(
+                    *(
+                        gallery.get_singleton(launcher_id)
+                        for launcher_id in launcher_ids
+                    )
+                ),
+                asyncio.gather(
+                    *(
+                        gallery.get_offer(launcher_id, offer_id)
+                        for launcher_id, offer_id in pairs
+                    )
+                ),
+            )
+            session: WalletSession = await pending_session
+
+            singletons: Dict[str, Dict] = {}
+            for launcher_id, response in zip(launcher_ids, singleton_responses):
+                if response.status_code != 200:
+                    click.secho(
+                        f"Could not find an NFT with ID '{launcher_id}', skipping it.",
+                        err=True,
+                        fg="yellow",
+                    )
+                elif session.singleton_owner_key(response.json()["owner"]) is None:
+                    click.secho(
+                        f"'{response.json()['name']}' is not your singleton, skipping it.",
+                        err=True,
+                        fg="yellow",
+                    )
+                else:
+                    singletons[launcher_id] = response.json()
+
+            # Accepting an offer transfers the NFT, so only one offer per NFT can be accepted
+            offers: Dict[str, Tuple[str, Dict]] = {}
+            for (launcher_id, offer_id), response in zip(pairs, offer_responses):
+                if launcher_id not in singletons:
+                    continue
+                if response.status_code != 200:
+                    click.secho(
+                        f"Could not find an offer with ID '{offer_id}' for NFT '{singletons[launcher_id]['name']}', skipping it.",
+                        err=True,
+                        fg="yellow",
+                    )
+                    continue
+                offer = response.json()
+                if launcher_id in offers:
+                    click.secho(
+                        f"Only one offer for '{singletons[launcher_id]['name']}' can be accepted, "
+                        f"choosing the higher one.",
+                        err=True,
+                        fg="yellow",
+                    )
+                    if offers[launcher_id][1]["price"] >= offer["price"]:
+                        continue
+                offers[launcher_id] = (offer_id, offer)
+            if len(offers) == 0:
+                return
+
+            total_price = sum(offer["price"] for _, offer in offers.values())
+            if not click.confirm(
+                f"You are accepting {len(offers)} offers for a total of {total_price / units['chia']} XCH. "
+                f"Do you want to submit them?"
+            ):
+                return
+
+            # The singleton keys have been derived once for the session, so signing is a tight loop
+            price_signatures: Dict[str, G2Element] = {
+                launcher_id: sign_offer(
+                    session.singleton_owner_key(
+                        singletons[launcher_id]["owner"]
+                    ).secret_key,
+                    offer["price"],
+                    offer["singleton_id"],
+                )
+                for launcher_id, (_, offer) in offers.items()
+            }
+
+            async def accept(launcher_id: str) -> bool:
+                offer_id, offer = offers[launcher_id]
+                response = await gallery.accept_offer(
+                    launcher_id, offer_id, bytes(price_signatures[launcher_id]).hex()
+                )
+                if response.status_code != 200:
+                    click.secho(
+                        f"Failed to accept offer {offer_id} for '{singletons[launcher_id]['name']}':",
+                        err=True,
+                        fg="red",
+                    )
+                    click.secho(response.text, err=True, fg="red")
+                    return False
+                return True
+
+            results = await asyncio.gather(
+                *(accept(launcher_id) for launcher_id in offers.keys())
+            )
+            click.secho(
+                f"{sum(results)} of {len(results)} offers have been accepted!",
+                fg="green" if all(results) else "yellow",
+            )
+            click.echo(f"The payments are being sent to your wallet address.")
 
-    royalty_text = (
-        f" A share of {royalty_percentage}% of that price is sent to its creator."
-        if royalty_percentage > 0
-        else ""
-    )
-    if click.confirm(
-        f"You are accepting {price_in_chia} XCH for '{name}'.{royalty_text} Do you want to submit it?"
-    ):
-        response = requests.post(
-            f"{SINGLETON_GALLERY_API}/singletons/{launcher_id}/offers/{offer_id}/accept",
-            json={
-                "price_signature": bytes(price_signature).hex(),
-            },
-        )
-        if response.status_code != 200:
-            click.secho("Failed to accept offer:", err=True, fg="red")
-            click.secho(response.text, err=True, fg="red")
-        else:
-            click.secho("You accepted the offer!", fg="green")
-            click.echo(f"The payment is being sent to your wallet address.")
+    run_command(run())
 
 
 @cli.command()
@@ -471,56 +1528,973 @@ def accept_offer(launcher_id: str, offer_id: str, fingerprint: Optional[int]):
 @click.option("--offer-id", prompt=True, help="The ID of the offer you want to cancel")
 @click.option("--fingerprint", type=int, help="The fingerprint of the key to use")
 def cancel_offer(launcher_id: str, offer_id: str, fingerprint: Optional[int]):
-    singleton_response = requests.get(
-        f"{SINGLETON_GALLERY_API}/singletons/{launcher_id}"
+    async def run():
+        async with GalleryClient(
+            SINGLETON_GALLERY_API
+        ) as gallery, start_wallet_session(fingerprint) as pending_session:
+            singleton_response, offer_response = await asyncio.gather(
+                gallery.get_singleton(launcher_id),
+                gallery.get_offer(launcher_id, offer_id),
+            )
+            if singleton_response.status_code != 200:
+                click.secho(
+                    f"Could not find an NFT with ID '{launcher_id}'", err=True, fg="red"
+                )
+                return
+            name = singleton_response.json()["name"]
+
+            if offer_response.status_code != 200:
+                click.secho(
+                    f"Could not find an offer with ID '{offer_id}' for NFT '{name}'.",
+                    err=True,
+                    fg="yellow",
+                )
+                return
+            offer = offer_response.json()
+            price = offer["price"]
+            price_in_chia = price / units["chia"]
+
+            session: WalletSession = await pending_session
+            new_owner_key = session.singleton_owner_key(offer["new_owner_public_key"])
+            if new_owner_key is None:
+                click.secho(f"This is not your offer.", err=True, fg="red")
+                return
+
+            price_signature: G2Element = sign_offer(
+                new_owner_key.secret_key, price, offer["singleton_id"]
+            )
+
+            if click.confirm(
+                f"Do you want to cancel your offer of {price_in_chia} XCH for '{name}'?"
+            ):
+                response = await gallery.cancel_offer(
+                    launcher_id, offer_id, bytes(price_signature).hex()
+                )
+                if response.status_code != 200:
+                    click.secho("Failed to cancel offer:", err=True, fg="red")
+                    click.secho(response.text, err=True, fg="red")
+                else:
+                    click.secho("You cancelled the offer.", fg="green")
+
+    run_command(run())
+
+
+@cli.command()
+@click.option(
+    "--launcher-ids",
+    "launcher_ids_file",
+    type=click.File("rt"),
+    required=True,
+    help="A file with the ID of one NFT per line",
+)
+@click.option("--fingerprint", type=int, help="The fingerprint of the key to use")
+@dry_run_option
+def reclaim_offers(launcher_ids_file, fingerprint: Optional[int], dry_run: bool):
+    launcher_ids: List[str] = list(
+        dict.fromkeys(line.strip() for line in launcher_ids_file if line.strip())
     )
-    if singleton_response.status_code != 200:
-        click.secho(
-            f"Could not find an NFT with ID '{launcher_id}'", err=True, fg="red"
-        )
+    if len(launcher_ids) == 0:
+        click.secho("No NFT IDs have been given.", err=True, fg="yellow")
         return
-    name = singleton_response.json()["name"]
 
-    offer_response = requests.get(
-        f"{SINGLETON_GALLERY_API}/singletons/{launcher_id}/offers/{offer_id}"
+    async def run():
+        full_node_client = await get_full_node_client()
+        try:
+            async with start_wallet_session(fingerprint) as pending_session:
+                session: WalletSession = await pending_session
+                launcher_ids_by_puzzle_hash: Dict[bytes32, bytes32] = {
+                    pay_to_singleton_puzzle_hash(
+                        bytes32.fromhex(launcher_id), session.wallet_puzzle_hash
+                    ): bytes32.fromhex(launcher_id)
+                    for launcher_id in launcher_ids
+                }
+                coin_records = await full_node_client.get_coin_records_by_puzzle_hashes(
+                    list(launcher_ids_by_puzzle_hash.keys()), include_spent_coins=False
+                )
+                if len(coin_records) == 0:
+                    click.secho(
+                        "There are no unspent offer payments for these NFTs.",
+                        err=True,
+                        fg="yellow",
+                    )
+                    return
+
+                # The cancel path of the offer coins needs no signature
+                spend_bundle = SpendBundle(
+                    [
+                        create_offer_cancel(
+                            record.coin,
+                            launcher_ids_by_puzzle_hash[record.coin.puzzle_hash],
+                            session.wallet_puzzle_hash,
+                        )
+                        for record in coin_records
+                    ],
+                    G2Element(),
+                )
+                amount = sum(record.coin.amount for record in coin_records)
+                if not report_dry_run(spend_bundle, show_spends=False) or dry_run:
+                    return
+
+                if not click.confirm(
+                    f"You are reclaiming {amount / units['chia']} XCH from {len(coin_records)} offer coins. "
+                    f"Offers of these coins that have been submitted become invalid. "
+                    f"Do you want to submit the transaction?"
+                ):
+                    return
+                try:
+                    await full_node_client.push_tx(spend_bundle)
+                except ValueError as e:
+                    click.secho(
+                        f"Failed to reclaim the offer payments: {e}", err=True, fg="red"
+                    )
+                    return
+                await record_submission(
+                    TRANSACTION_SUBMISSION,
+                    spend_bundle,
+                    f"Reclaim of {len(coin_records)} offer payments",
+                )
+                click.secho(
+                    "The offer payments have been reclaimed successfully!", fg="green"
+                )
+        finally:
+            full_node_client.close()
+            await full_node_client.await_closed()
+
+    run_command(run())
+
+
+@cli.command()
+@click.option(
+    "--launcher-ids",
+    "launcher_ids_file",
+    type=click.File("rt"),
+    required=True,
+    help="A file with the ID of one NFT per line",
+)
+@index_option
+def track(launcher_ids_file, index_path: str):
+    launcher_ids: List[str] = list(
+        dict.fromkeys(line.strip() for line in launcher_ids_file if line.strip())
     )
-    if offer_response.status_code != 200:
-        click.secho(
-            f"Could not find an offer with ID '{offer_id}' for NFT '{name}'.",
-            err=True,
-            fg="yellow",
-        )
+
+    async def run():
+        full_node_client = await get_full_node_client()
+        try:
+            async with open_singleton_index(index_path) as index:
+                for launcher_id in launcher_ids:
+                    try:
+                        record = await index.add_launcher(
+                            full_node_client, bytes32.fromhex(launcher_id)
+                        )
+                    except (SingletonIndexError, ValueError) as e:
+                        click.secho(
+                            f"Could not index NFT '{launcher_id}': {e}",
+                            err=True,
+                            fg="yellow",
+                        )
+                        continue
+                    owner = (
+                        bytes(record.owner.public_key).hex()
+                        if record.owner
+                        else "an unknown owner"
+                    )
+                    click.echo(f"'{record.metadata.name}' is owned by {owner}")
+                click.secho(
+                    f"The index contains {await index.count()} NFTs.", fg="green"
+                )
+        finally:
+            full_node_client.close()
+            await full_node_client.await_closed()
+
+    run_command(run())
+
+
+@cli.command()
+@index_option
+@click.option(
+    "--batch-size",
+    type=click.IntRange(min=1),
+    default=500,
+    show_default=True,
+    help="The number of NFTs whose coins are looked up together",
+)
+def sync(index_path: str, batch_size: int):
+    async def run():
+        full_node_client = await get_full_node_client()
+        try:
+            async with open_singleton_index(index_path) as index:
+                spends = await index.sync(full_node_client, batch_size)
+                click.secho(
+                    f"Followed {spends} new spends of {await index.count()} tracked NFTs.",
+                    fg="green",
+                )
+        finally:
+            full_node_client.close()
+            await full_node_client.await_closed()
+
+    run_command(run())
+
+
+@cli.command()
+@click.option(
+    "--rules",
+    "rules_path",
+    type=click.Path(exists=True, dir_okay=False),
+    help="A JSON file with the NFTs of each collection and the minimum price of offers that are accepted automatically",
+)
+@click.option(
+    "--launcher-ids",
+    "launcher_ids_file",
+    type=click.File("rt"),
+    help="A file with the ID of one NFT per line, whose offers are only reported",
+)
+@click.option(
+    "--interval",
+    type=click.FloatRange(min=1),
+    default=60,
+    show_default=True,
+    help="The number of seconds between two polls of the offers of an NFT",
+)
+@click.option(
+    "--concurrency",
+    type=click.IntRange(min=1),
+    default=16,
+    show_default=True,
+    help="The maximum number of concurrent requests",
+)
+@click.option(
+    "--rate",
+    type=click.FloatRange(min=0.1),
+    default=10,
+    show_default=True,
+    help="The maximum number of requests per second",
+)
+@click.option("--fingerprint", type=int, help="The fingerprint of the key to use")
+def watch(
+    rules_path: Optional[str],
+    launcher_ids_file,
+    interval: float,
+    concurrency: int,
+    rate: float,
+    fingerprint: Optional[int],
+):
+    rules: Dict[str, WatchRule] = {}
+    if launcher_ids_file is not None:
+        report_only = WatchRule("")
+        for line in launcher_ids_file:
+            if line.strip():
+                rules[line.strip()] = report_only
+    if rules_path is not None:
+        try:
+            rules.update(read_watch_rules(Path(rules_path)))
+        except WatchRulesError as e:
+            raise click.ClickException(str(e))
+    if len(rules) == 0:
+        click.secho("No NFTs have been given.", err=True, fg="yellow")
         return
-    offer = offer_response.json()
-    price = offer["price"]
-    price_in_chia = price / units["chia"]
 
-    singleton_sk: PrivateKey
-    (singleton_sk, fingerprint) = asyncio.get_event_loop().run_until_complete(
-        get_singleton_wallet(fingerprint)
+    async def run():
+        async with GalleryClient(
+            SINGLETON_GALLERY_API, max_concurrency=concurrency, rate=rate
+        ) as gallery, start_wallet_session(fingerprint) as pending_session:
+            session: WalletSession = await pending_session
+
+            async def on_offers(launcher_id: str, offers: List[Dict], rule: WatchRule):
+                for offer in offers:
+                    click.echo(
+                        f"New offer {offer['id']} of {offer['price'] / units['chia']} XCH for NFT {launcher_id}"
+                    )
+                acceptable = [offer for offer in offers if rule.accepts(offer["price"])]
+                if len(acceptable) == 0:
+                    return False
+                best_offer = max(acceptable, key=lambda offer: offer["price"])
+
+                # Failures are raised, so the watcher tries these offers again
+                singleton_response = await gallery.get_singleton(launcher_id)
+                if singleton_response.status_code != 200:
+                    raise GalleryClientError(
+                        f"Could not find an NFT with ID '{launcher_id}'"
+                    )
+                singleton = singleton_response.json()
+                owner_key = session.singleton_owner_key(singleton["owner"])
+                if owner_key is None:
+                    click.secho(
+                        f"'{singleton['name']}' is not your singleton, no longer watching it.",
+                        err=True,
+                        fg="yellow",
+                    )
+                    return True
+
+                response = await sign_and_accept_offer(
+                    gallery,
+                    launcher_id,
+                    str(best_offer["id"]),
+                    best_offer,
+                    owner_key.secret_key,
+                )
+                if response.status_code != 200:
+                    raise GalleryClientError(
+                        f"Failed to accept offer {best_offer['id']} for '{singleton['name']}': "
+                        f"{response.text}"
+                    )
+                click.secho(
+                    f"You accepted {best_offer['price'] / units['chia']} XCH for '{singleton['name']}' "
+                    f"({rule.collection}).",
+                    fg="green",
+                )
+                return True
+
+            def on_error(launcher_id: str, message: str):
+                click.secho(
+                    f"Failed to handle the offers for NFT {launcher_id}: {message}",
+                    err=True,
+                    fg="red",
+                )
+
+            watcher = OfferWatcher(gallery, rules, on_offers, on_error, concurrency)
+            click.echo(
+                f"Watching the offers for {len(rules)} NFTs, press Ctrl+C to stop."
+            )
+            await watcher.run(interval)
+
+    run_command(run())
+
+
+def custody_owner(session: WalletSession, index: int) -> Tuple[Owner, PrivateKey]:
+    # Like the creator of a new singleton, the owner is paid to the wallet puzzle hash of its index
+    keys = KeyTable.scan(session.master_sk, [index])
+    singleton_key = keys.find_by_index(SINGLETON_OWNER_KEY, index)
+    wallet_key = keys.find_by_index(WALLET_KEY, index)
+    return (
+        Owner(singleton_key.public_key, wallet_key.puzzle_hash),
+        singleton_key.secret_key,
     )
-    if offer["new_owner_public_key"] != bytes(singleton_sk.get_g1()).hex():
-        click.secho(f"This is not your offer.", err=True, fg="red")
-        return
 
-    price_signature: G2Element = asyncio.get_event_loop().run_until_complete(
-        sign_offer(fingerprint, price, offer["singleton_id"])
+
+def transfer_singletons(
+    launcher_ids: List[str],
+    to_index: int,
+    fingerprint: Optional[int],
+    fee: int,
+    index_path: str,
+    dry_run: bool,
+):
+    holder = command_holder()
+
+    async def run():
+        full_node_client = await get_full_node_client()
+        try:
+            async with open_singleton_index(index_path) as index, start_wallet_session(
+                fingerprint
+            ) as pending_session:
+                records: List[SingletonRecord] = await index.refresh(
+                    full_node_client,
+                    [bytes32.fromhex(launcher_id) for launcher_id in launcher_ids],
+                )
+                session: WalletSession = await pending_session
+                new_owner, new_owner_sk = custody_owner(session, to_index)
+
+                spend_bundles: List[SpendBundle] = []
+                for record in records:
+                    if record.owner == new_owner:
+                        click.secho(
+                            f"'{record.metadata.name}' is already owned by index {to_index}, skipping it.",
+                            err=True,
+                            fg="yellow",
+                        )
+                        continue
+                    owner_key = (
+                        session.singleton_owner_key(record.owner.public_key_bytes.hex())
+                        if record.owner is not None
+                        else None
+                    )
+                    if owner_key is None:
+                        click.secho(
+                            f"'{record.metadata.name}' is not your singleton, skipping it.",
+                            err=True,
+                            fg="yellow",
+                        )
+                        continue
+
+                    coin_spend = create_transfer(
+                        record.launcher_id,
+                        record.lineage_proof,
+                        record.coin,
+                        record.owner,
+                        new_owner,
+                        record.version,
+                        record.royalty,
+                    )
+                    secret_keys = {
+                        new_owner: new_owner_sk,
+                        record.owner: owner_key.secret_key,
+                    }
+                    with span("sign"):
+                        signature = AugSchemeMPL.aggregate(
+                            [
+                                AugSchemeMPL.sign(secret_keys[owner], message)
+                                for owner, message in transfer_signing_messages(
+                                    record.coin,
+                                    record.owner,
+                                    new_owner,
+                                    AGG_SIG_ME_ADDITIONAL_DATA_TESTNET10,
+                                )
+                            ]
+                        )
+                    spend_bundles.append(SpendBundle([coin_spend], signature))
+                if len(spend_bundles) == 0:
+                    return
+
+                transfer_count = len(spend_bundles)
+                if not report_signatures(spend_bundles):
+                    return
+                if fee > 0:
+                    # The fee is paid by one wallet transaction for the whole bundle
+                    fee_tx: TransactionRecord = await create_reserved_transaction(
+                        session,
+                        holder,
+                        [{"puzzle_hash": session.wallet_puzzle_hash, "amount": 0}],
+                        fee,
+                    )
+                    spend_bundles.append(fee_tx.spend_bundle)
+                spend_bundle = SpendBundle.aggregate(spend_bundles)
+                if not report_dry_run(spend_bundle, show_spends=False) or dry_run:
+                    return
+
+                if not click.confirm(
+                    f"You are transferring {transfer_count} NFTs to derivation index {to_index}. "
+                    f"Do you want to submit the transaction?"
+                ):
+                    return
+                try:
+                    await full_node_client.push_tx(spend_bundle)
+                except ValueError as e:
+                    click.secho(
+                        f"Failed to submit the transfers: {e}", err=True, fg="red"
+                    )
+                    return
+                await record_submission(
+                    TRANSACTION_SUBMISSION,
+                    spend_bundle,
+                    f"Transfer of {transfer_count} NFTs to index {to_index}",
+                    holder,
+                )
+                click.secho(
+                    "The transfers have been submitted successfully!", fg="green"
+                )
+                click.echo(
+                    "Please wait a few minutes until they have been added to the blockchain."
+                )
+        finally:
+            full_node_client.close()
+            await full_node_client.await_closed()
+
+    run_command(run())
+
+
+to_index_option = click.option(
+    "--to-index",
+    type=click.IntRange(min=0),
+    required=True,
+    help="The derivation index of your key that receives the NFTs",
+)
+
+
+@cli.command()
+@click.option("--launcher-id", prompt=True, help="The ID of the NFT")
+@to_index_option
+@click.option("--fingerprint", type=int, help="The fingerprint of the key to use")
+@click.option(
+    "--fee",
+    type=click.IntRange(min=0),
+    required=True,
+    default=0,
+    show_default=True,
+    help="The fee in mojos to use for this transaction",
+)
+@index_option
+@dry_run_option
+def transfer(
+    launcher_id: str,
+    to_index: int,
+    fingerprint: Optional[int],
+    fee: int,
+    index_path: str,
+    dry_run: bool,
+):
+    transfer_singletons([launcher_id], to_index, fingerprint, fee, index_path, dry_run)
+
+
+@cli.command()
+@click.option(
+    "--launcher-ids",
+    "launcher_ids_file",
+    type=click.File("rt"),
+    required=True,
+    help="A file with the ID of one NFT per line",
+)
+@to_index_option
+@click.option("--fingerprint", type=int, help="The fingerprint of the key to use")
+@click.option(
+    "--fee",
+    type=click.IntRange(min=0),
+    required=True,
+    default=0,
+    show_default=True,
+    help="The fee in mojos to use for the whole transaction",
+)
+@index_option
+@dry_run_option
+def transfer_many(
+    launcher_ids_file,
+    to_index: int,
+    fingerprint: Optional[int],
+    fee: int,
+    index_path: str,
+    dry_run: bool,
+):
+    launcher_ids: List[str] = list(
+        dict.fromkeys(line.strip() for line in launcher_ids_file if line.strip())
     )
+    if len(launcher_ids) == 0:
+        click.secho("No NFT IDs have been given.", err=True, fg="yellow")
+        return
+    transfer_singletons(launcher_ids, to_index, fingerprint, fee, index_path, dry_run)
+
+
+@cli.command()
+@click.option("--price", type=FLOAT, help="The price in XCH")
+@click.option(
+    "--royalty",
+    "royalty_percentage",
+    type=click.IntRange(min=0, max=100),
+    default=0,
+    show_default=True,
+    help="The royalty percentage of the NFT",
+)
+@click.option(
+    "--prices",
+    "prices_file",
+    type=click.File("rt"),
+    help="A CSV file with one 'price,royalty' pair per line, prices in XCH",
+)
+def quote(price: Optional[float], royalty_percentage: int, prices_file):
+    if prices_file is None:
+        if price is None:
+            raise click.UsageError("Either --price or --prices is required.")
+        seller_amount, creator_amount = quote_payout(
+            int(price * units["chia"]), royalty_percentage
+        )
+        click.echo(
+            f"For {price} XCH, the seller receives {seller_amount / units['chia']} XCH "
+            f"and the creator {creator_amount / units['chia']} XCH."
+        )
+        return
+
+    prices: List[int] = []
+    royalty_percentages: List[int] = []
+    for line_number, line in enumerate(prices_file, start=1):
+        if not line.strip():
+            continue
+        parts = [part.strip() for part in line.split(",")]
+        try:
+            prices.append(int(float(parts[0]) * units["chia"]))
+            royalty_percentages.append(int(parts[1]) if len(parts) > 1 else 0)
+        except ValueError:
+            raise click.ClickException(f"Line {line_number}: expected 'price,royalty'")
+    try:
+        seller_amounts, creator_amounts = quote_payouts(prices, royalty_percentages)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    # The payouts are written in mojo, so they can be read back without rounding
+    click.echo("price,royalty,seller,creator")
+    for row in zip(prices, royalty_percentages, seller_amounts, creator_amounts):
+        click.echo(",".join(str(value) for value in row))
+
+
+def check_gallery_response(response: GalleryResponse, message: str):
+    if response.status_code != 200:
+        raise JsonRpcError(OPERATION_FAILED, f"{message}: {response.text}")
+
+
+def check_spend_bundle(
+    spend_bundle: SpendBundle, verified_spend_bundles: List[SpendBundle]
+) -> DryRunResult:
+    with span("dry_run", spends=len(spend_bundle.coin_spends)):
+        result: DryRunResult = dry_run_spend_bundle(spend_bundle)
+    for spend_result in result.errors:
+        raise JsonRpcError(
+            OPERATION_FAILED,
+            f"The spend of coin {spend_result.coin_spend.coin.name()} fails: {spend_result.error.name}",
+        )
+    if result.exceeds_max_cost:
+        raise JsonRpcError(
+            OPERATION_FAILED,
+            "The spend bundle exceeds the maximum cost of a transaction.",
+        )
+    with span("verify", spend_bundles=len(verified_spend_bundles)):
+        valid = verify_spend_bundles(
+            verified_spend_bundles, AGG_SIG_ME_ADDITIONAL_DATA_TESTNET10
+        )
+    if not all(valid):
+        raise JsonRpcError(OPERATION_FAILED, "The signature is invalid.")
+    return result
+
+
+class CompanionService:
+    """
+    The commands of the companion as JSON-RPC methods, without prompts.
 
-    if click.confirm(
-        f"Do you want to cancel your offer of {price_in_chia} XCH for '{name}'?"
+    The wallet session, its derived keys, the gallery connections and the puzzle caches stay
+    warm between calls, so a call only costs the work of the operation itself.
+    """
+
+    def __init__(
+        self,
+        session: WalletSession,
+        gallery: GalleryClient,
+        journal: SubmissionJournal,
     ):
-        response = requests.delete(
-            f"{SINGLETON_GALLERY_API}/singletons/{launcher_id}/offers/{offer_id}",
-            json={
-                "price_signature": bytes(price_signature).hex(),
-            },
+        self.session = session
+        self.gallery = gallery
+        self.journal = journal
+
+    def methods(self) -> Dict[str, RpcMethod]:
+        return {
+            "profile": self.profile,
+            "update_profile": self.update_profile,
+            "create": self.create,
+            "offer": self.offer,
+            "accept_offer": self.accept_offer,
+            "cancel_offer": self.cancel_offer,
+        }
+
+    async def get_singleton(self, launcher_id: str) -> Dict:
+        response = await self.gallery.get_singleton(launcher_id)
+        check_gallery_response(
+            response, f"Could not find an NFT with ID '{launcher_id}'"
         )
-        if response.status_code != 200:
-            click.secho("Failed to cancel offer:", err=True, fg="red")
-            click.secho(response.text, err=True, fg="red")
-        else:
-            click.secho("You cancelled the offer.", fg="green")
+        return response.json()
+
+    async def get_offer(self, launcher_id: str, offer_id: str) -> Tuple[Dict, Dict]:
+        singleton_response, offer_response = await asyncio.gather(
+            self.gallery.get_singleton(launcher_id),
+            self.gallery.get_offer(launcher_id, offer_id),
+        )
+        check_gallery_response(
+            singleton_response, f"Could not find an NFT with ID '{launcher_id}'"
+        )
+        check_gallery_response(
+            offer_response, f"Could not find an offer with ID '{offer_id}'"
+        )
+        return singleton_response.json(), offer_response.json()
+
+    async def record_submission(
+        self, kind: str, spend_bundle: SpendBundle, label: str, holder: str
+    ):
+        await self.journal.record(kind, spend_bundle, label)
+        await hand_over_reservations(holder, spend_bundle.name().hex())
+
+    async def profile(self) -> Dict:
+        public_key = bytes(self.session.singleton_public_key).hex()
+        return {
+            "public_key": public_key,
+            "url": f"{SINGLETON_GALLERY_FRONTEND}/profile/{public_key}",
+        }
+
+    async def update_profile(self, name: str) -> Dict:
+        public_key = self.session.singleton_public_key
+        with span("sign"):
+            signature = AugSchemeMPL.sign(
+                self.session.singleton_sk, bytes(public_key) + bytes(name, "utf-8")
+            )
+        response = await self.gallery.update_profile(
+            bytes(public_key).hex(), name, bytes(signature).hex()
+        )
+        check_gallery_response(response, "Failed to update profile")
+        return await self.profile()
+
+    async def create(
+        self,
+        name: str,
+        uri: str,
+        royalty_percentage: int = 0,
+        fee: int = 0,
+        dry_run: bool = False,
+    ) -> Dict:
+        if not 0 <= royalty_percentage <= 99:
+            raise JsonRpcError(
+                INVALID_PARAMS, "Royalty percentage has to be between 0 and 99."
+            )
+        # Concurrent calls create their transactions from different reserved coins
+        holder = new_holder()
+        try:
+            signed_tx, owner_sk, wallet_puzzle_hash = await create_genesis_coin(
+                self.session, holder, SINGLETON_AMOUNT, fee
+            )
+            spend_bundle = create_singleton_spend_bundle(
+                signed_tx, owner_sk, wallet_puzzle_hash, name, uri, royalty_percentage
+            )
+            result = check_spend_bundle(spend_bundle, [spend_bundle])
+            launcher_id = launcher_id_of(spend_bundle).hex()
+            if dry_run:
+                return {"launcher_id": launcher_id, "cost": result.cost}
+
+            response = await self.gallery.submit_singleton(spend_bundle)
+            check_gallery_response(response, "Failed to submit NFT")
+            await self.record_submission(
+                SINGLETON_SUBMISSION, spend_bundle, launcher_id, holder
+            )
+        finally:
+            await release_reservations(holder)
+        return {
+            "launcher_id": launcher_id,
+            "url": f"{SINGLETON_GALLERY_FRONTEND}/singletons/{launcher_id}?pending=1",
+        }
+
+    async def offer(
+        self, launcher_id: str, price: float, fee: int = 0, dry_run: bool = False
+    ) -> Dict:
+        singleton = await self.get_singleton(launcher_id)
+        if self.session.singleton_owner_key(singleton["owner"]) is not None:
+            raise JsonRpcError(
+                OPERATION_FAILED,
+                "This is your singleton, you can't create an offer for it.",
+            )
+
+        price_in_mojo = int(price * units["chia"])
+        holder = new_holder()
+        try:
+            (
+                signed_tx,
+                payment_spend_bundle,
+                p2_singleton_coin,
+                p2_singleton_puzzle,
+            ) = await create_offer_payment(
+                self.session,
+                holder,
+                launcher_id,
+                singleton["singleton_id"],
+                price_in_mojo,
+                fee,
+            )
+            result = check_spend_bundle(payment_spend_bundle, [signed_tx.spend_bundle])
+            if dry_run:
+                return {"price": price_in_mojo, "cost": result.cost}
+
+            response = await self.gallery.submit_offer(
+                launcher_id,
+                offer_submission(
+                    self.session,
+                    payment_spend_bundle,
+                    p2_singleton_coin,
+                    p2_singleton_puzzle,
+                    price_in_mojo,
+                ),
+            )
+            check_gallery_response(response, "Failed to submit offer")
+            await self.record_submission(
+                OFFER_SUBMISSION, signed_tx.spend_bundle, launcher_id, holder
+            )
+        finally:
+            await release_reservations(holder)
+        return {
+            "price": price_in_mojo,
+            "url": f"{SINGLETON_GALLERY_FRONTEND}/singletons/{launcher_id}",
+        }
+
+    async def accept_offer(self, launcher_id: str, offer_id: str) -> Dict:
+        singleton, offer = await self.get_offer(launcher_id, offer_id)
+        owner_key = self.session.singleton_owner_key(singleton["owner"])
+        if owner_key is None:
+            raise JsonRpcError(
+                OPERATION_FAILED, f"'{singleton['name']}' is not your singleton."
+            )
+
+        response = await sign_and_accept_offer(
+            self.gallery, launcher_id, offer_id, offer, owner_key.secret_key
+        )
+        check_gallery_response(response, "Failed to accept offer")
+        seller_amount, creator_amount = quote_payout(
+            offer["price"], singleton["royalty_percentage"]
+        )
+        return {
+            "price": offer["price"],
+            "seller_amount": seller_amount,
+            "creator_amount": creator_amount,
+        }
+
+    async def cancel_offer(self, launcher_id: str, offer_id: str) -> Dict:
+        _, offer = await self.get_offer(launcher_id, offer_id)
+        new_owner_key = self.session.singleton_owner_key(offer["new_owner_public_key"])
+        if new_owner_key is None:
+            raise JsonRpcError(OPERATION_FAILED, "This is not your offer.")
+
+        price_signature: G2Element = sign_offer(
+            new_owner_key.secret_key, offer["price"], offer["singleton_id"]
+        )
+        response = await self.gallery.cancel_offer(
+            launcher_id, offer_id, bytes(price_signature).hex()
+        )
+        check_gallery_response(response, "Failed to cancel offer")
+        return {"price": offer["price"]}
+
+
+@cli.command()
+@click.option("--fingerprint", type=int, help="The fingerprint of the key to use")
+@click.option(
+    "--host",
+    default=DEFAULT_RPC_HOST,
+    show_default=True,
+    help="The address the JSON-RPC server listens on",
+)
+@click.option(
+    "--port",
+    type=click.IntRange(min=1, max=65535),
+    default=DEFAULT_RPC_PORT,
+    show_default=True,
+    help="The port the JSON-RPC server listens on",
+)
+@click.option(
+    "--token-file",
+    type=click.Path(dir_okay=False, writable=True),
+    default=str(DEFAULT_RPC_TOKEN_PATH),
+    show_default=True,
+    help="The file the bearer token for the requests is written to",
+)
+def serve(fingerprint: Optional[int], host: str, port: int, token_file: str):
+    # A new token on every start, only readable by the user running the server
+    auth_token = write_auth_token(token_file)
+
+    async def run():
+        async with GalleryClient(SINGLETON_GALLERY_API) as gallery, open_wallet_session(
+            fingerprint
+        ) as session, open_submission_journal() as journal:
+            # The keys and puzzles are loaded before the first request arrives
+            session.key_table
+            for puzzle in (
+                OWNABLE_SINGLETON_V1,
+                OWNABLE_SINGLETON_V2,
+                P2_SINGLETON_OR_CANCEL,
+            ):
+                puzzle.program
+
+            server = JsonRpcServer(
+                CompanionService(session, gallery, journal).methods(),
+                operation_errors=(
+                    WalletSessionError,
+                    GalleryClientError,
+                    CoinReservationError,
+                    ValueError,
+                ),
+                on_error=lambda method, e: click.secho(
+                    f"Call of '{method}' failed: {type(e).__name__}: {e}",
+                    err=True,
+                    fg="red",
+                ),
+                auth_token=auth_token,
+            )
+            click.secho(
+                f"Serving JSON-RPC at http://{host}:{port}/ with key {session.fingerprint}.",
+                fg="green",
+            )
+            click.echo(f"Requests need the bearer token in {token_file}.")
+            await server.serve(host, port)
+
+    # Stopping cancels the server, so the sessions are closed on the way out
+    task = asyncio.ensure_future(run())
+    loop = asyncio.get_event_loop()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signal_number, task.cancel)
+    try:
+        run_command(task)
+    except asyncio.CancelledError:
+        click.echo("Stopped serving.")
+
+
+@cli.command()
+@click.option(
+    "--interval",
+    type=click.FloatRange(min=1),
+    default=30,
+    show_default=True,
+    help="The seconds between checks of the pending submissions",
+)
+@click.option(
+    "--max-attempts",
+    type=click.IntRange(min=1),
+    default=10,
+    show_default=True,
+    help="The number of submissions of a spend bundle before it is abandoned",
+)
+@click.option(
+    "--once",
+    is_flag=True,
+    default=False,
+    help="Only check the pending submissions once, without waiting for them",
+)
+def pending(interval: float, max_attempts: int, once: bool):
+    def report(submission: Submission):
+        color = {PENDING: None, CONFIRMED: "green", CONFLICTED: "red"}.get(
+            submission.status, "yellow"
+        )
+        height = (
+            f" at height {submission.confirmed_height}"
+            if submission.confirmed_height is not None
+            else ""
+        )
+        click.secho(
+            f"{submission.name.hex()} ({submission.label}): {submission.status}{height}",
+            fg=color,
+        )
+
+    def report_error(submission: Submission, error: str):
+        click.secho(
+            f"{submission.name.hex()} ({submission.label}) has been rejected: {error}",
+            err=True,
+            fg="yellow",
+        )
+
+    async def run():
+        full_node_client = await get_full_node_client()
+        try:
+            async with GalleryClient(
+                SINGLETON_GALLERY_API
+            ) as gallery, open_submission_journal() as journal, open_coin_reservations() as reservations:
+
+                async def resubmit_singleton(submission: Submission) -> Optional[str]:
+                    response = await gallery.submit_singleton(submission.spend_bundle)
+                    return response.text if response.status_code != 200 else None
+
+                async def resubmit_transaction(submission: Submission) -> Optional[str]:
+                    await full_node_client.push_tx(submission.spend_bundle)
+                    return None
+
+                poller = SubmissionPoller(
+                    journal,
+                    full_node_client,
+                    {
+                        SINGLETON_SUBMISSION: resubmit_singleton,
+                        TRANSACTION_SUBMISSION: resubmit_transaction,
+                    },
+                    max_attempts=max_attempts,
+                    reservations=reservations,
+                )
+                if once:
+                    for submission in await poller.poll_once(report_error):
+                        report(submission)
+                else:
+                    await poller.run(interval, report, report_error)
+
+                remaining = await journal.get_by_status(PENDING)
+                for submission in remaining:
+                    report(submission)
+                click.echo(f"{len(remaining)} submissions are pending.")
+        finally:
+            full_node_client.close()
+            await full_node_client.await_closed()
+
+    run_command(run())
 
 
 if __name__ == "__main__":
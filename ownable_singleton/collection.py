@@ -0,0 +1,121 @@
+from typing import Dict, Iterator, List, Tuple
+
+from blspy import G1Element, G2Element
+
+from chia.types.blockchain_format.coin import Coin
+from chia.types.blockchain_format.sized_bytes import bytes32
+from chia.types.coin_spend import CoinSpend
+from chia.types.spend_bundle import SpendBundle
+from chia.wallet.puzzles import p2_delegated_puzzle_or_hidden_puzzle
+from ownable_singleton.drivers.ownable_singleton_driver import (
+    SINGLETON_AMOUNT,
+    Owner,
+    Royalty,
+    create_unsigned_ownable_singleton,
+    genesis_hidden_puzzle_hash,
+    genesis_puzzle_for_index,
+)
+from ownable_singleton.keys import SINGLETON_OWNER_KEY
+from ownable_singleton.manifest import ManifestEntry
+from ownable_singleton.signing_file import SigningRequest
+
+
+def collection_chunk_indices(count: int, chunk_size: int) -> List[range]:
+    """
+    The genesis indices of the NFTs of each chunk of a collection of `count` NFTs.
+
+    Each chunk gets its own genesis transaction, since a single transaction creating the
+    genesis coins of thousands of NFTs would cost more than a block allows.
+    """
+    return [
+        range(start, min(start + chunk_size, count))
+        for start in range(0, count, chunk_size)
+    ]
+
+
+def genesis_additions(public_key: G1Element, indices: range) -> List[Dict]:
+    """
+    The outputs of the wallet transaction that creates the genesis coins of `indices`.
+    """
+    return [
+        {
+            "puzzle_hash": genesis_puzzle_for_index(public_key, index).get_tree_hash(),
+            "amount": SINGLETON_AMOUNT,
+        }
+        for index in indices
+    ]
+
+
+def collection_singleton_spends(
+    entries: List[ManifestEntry],
+    indices: range,
+    genesis_spend_bundle: SpendBundle,
+    creator: Owner,
+    additional_data: bytes,
+) -> Iterator[Tuple[List[CoinSpend], SigningRequest]]:
+    """
+    Yields the unsigned spends of each NFT of a chunk, together with the request to sign
+    them with the synthetic key of its genesis coin. The genesis coins are created by
+    `genesis_spend_bundle`.
+    """
+    genesis_coins: Dict[bytes32, Coin] = {
+        coin.puzzle_hash: coin
+        for coin in genesis_spend_bundle.additions()
+        if coin.amount == SINGLETON_AMOUNT
+    }
+    for index, entry in zip(indices, entries):
+        genesis_puzzle = genesis_puzzle_for_index(creator.public_key, index)
+        genesis_coin: Coin = genesis_coins[genesis_puzzle.get_tree_hash()]
+        royalty = (
+            Royalty(creator.puzzle_hash, entry.royalty_percentage)
+            if entry.royalty_percentage > 0
+            else None
+        )
+
+        coin_spends, delegated_puzzle = create_unsigned_ownable_singleton(
+            genesis_coin,
+            genesis_puzzle,
+            creator,
+            entry.uri,
+            entry.name,
+            version=2,
+            royalty=royalty,
+            content_hash=entry.content_hash,
+        )
+        hidden_puzzle_hash = genesis_hidden_puzzle_hash(index)
+        yield coin_spends, SigningRequest(
+            p2_delegated_puzzle_or_hidden_puzzle.calculate_synthetic_public_key(
+                creator.public_key, hidden_puzzle_hash
+            ),
+            delegated_puzzle.get_tree_hash() + genesis_coin.name() + additional_data,
+            SINGLETON_OWNER_KEY,
+            0,
+            hidden_puzzle_hash,
+        )
+
+
+def unsigned_collection_chunk(
+    entries: List[ManifestEntry],
+    indices: range,
+    genesis_spend_bundle: SpendBundle,
+    creator: Owner,
+    additional_data: bytes,
+) -> Tuple[SpendBundle, List[SigningRequest]]:
+    """
+    The spend bundle of a chunk of a collection, made of its genesis transaction and the
+    unsigned spends of its NFTs, and the requests to sign them. A chunk only spends coins
+    it creates itself, so the chunks of a collection can be submitted in any order.
+    """
+    coin_spends: List[CoinSpend] = []
+    requests: List[SigningRequest] = []
+    for nft_coin_spends, request in collection_singleton_spends(
+        entries, indices, genesis_spend_bundle, creator, additional_data
+    ):
+        coin_spends.extend(nft_coin_spends)
+        requests.append(request)
+    return (
+        SpendBundle.aggregate(
+            [genesis_spend_bundle, SpendBundle(coin_spends, G2Element())]
+        ),
+        requests,
+    )
@@ -1,15 +1,14 @@
-from pathlib import Path
-from typing import Tuple, List, Optional
+from functools import lru_cache
+from typing import Any, Tuple, List, Optional, Union
 
-import cdv.clibs as std_lib
 from blspy import G1Element
-from cdv.util.load_clvm import load_clvm
-from clvm.casts import int_from_bytes
+from clvm.casts import int_from_bytes, int_to_bytes
 
 from chia.types.blockchain_format.coin import Coin
 from chia.types.blockchain_format.program import Program
 from chia.types.blockchain_format.sized_bytes import bytes32
 from chia.types.coin_spend import CoinSpend
+from chia.util.hash import std_hash
 from chia.util.ints import uint64
 from chia.wallet.lineage_proof import LineageProof
 from chia.wallet.puzzles import (
@@ -21,91 +20,368 @@ from chia.wallet.puzzles.singleton_top_layer import (
     SINGLETON_MOD_HASH,
     SINGLETON_LAUNCHER_HASH,
 )
+from ownable_singleton.drivers.puzzle_loader import PinnedPuzzle
+from ownable_singleton.drivers.tree_hash import (
+    NIL_TREE_HASH,
+    atom_tree_hash,
+    curried_puzzle_hash,
+    list_tree_hash,
+    pair_tree_hash,
+)
+from ownable_singleton.tracing import traced
 
-clibs_path: Path = Path(std_lib.__file__).parent
-
-OWNABLE_SINGLETON_MOD_V1: Program = load_clvm(
-    "ownable_singleton_v1.clsp", "ownable_singleton.clsp", search_paths=[clibs_path]
+# The puzzles are loaded on first use, see `PinnedPuzzle`
+OWNABLE_SINGLETON_V1 = PinnedPuzzle(
+    "ownable_singleton_v1.clsp",
+    "30ff7a09896446a98412ffecf671e64160ccea85845841c96aa48da51101078b",
 )
-OWNABLE_SINGLETON_MOD_V2: Program = load_clvm(
-    "ownable_singleton_v2.clsp", "ownable_singleton.clsp", search_paths=[clibs_path]
+OWNABLE_SINGLETON_V2 = PinnedPuzzle(
+    "ownable_singleton_v2.clsp",
+    "7071c350eac36e6c6c5ab8dc558db695ffbf1d66f65689f64dd48a079c41c4b9",
 )
-P2_SINGLETON_OR_CANCEL_MOD: Program = load_clvm(
-    "p2_singleton_or_cancel.clsp", "ownable_singleton.clsp", search_paths=[clibs_path]
+P2_SINGLETON_OR_CANCEL = PinnedPuzzle(
+    "p2_singleton_or_cancel.clsp",
+    "cb6e46cb687b071a52bc4751c9b9157fed762cbf4a5e21cab601150b0adc54c6",
 )
 SINGLETON_AMOUNT: uint64 = 1023
 
+# The maximum number of curried puzzles kept per cache
+PUZZLE_CACHE_SIZE = 4096
+
+_LAZY_ATTRIBUTES = {
+    "OWNABLE_SINGLETON_MOD_V1": lambda: OWNABLE_SINGLETON_V1.program,
+    "OWNABLE_SINGLETON_MOD_V2": lambda: OWNABLE_SINGLETON_V2.program,
+    "P2_SINGLETON_OR_CANCEL_MOD": lambda: P2_SINGLETON_OR_CANCEL.program,
+    "OWNABLE_SINGLETON_MOD_V1_HASH": lambda: OWNABLE_SINGLETON_V1.tree_hash,
+    "OWNABLE_SINGLETON_MOD_V2_HASH": lambda: OWNABLE_SINGLETON_V2.tree_hash,
+    "P2_SINGLETON_OR_CANCEL_MOD_HASH": lambda: P2_SINGLETON_OR_CANCEL.tree_hash,
+}
+
+
+def __getattr__(name: str) -> Any:
+    # Keeps the module level puzzle constants available without loading them at import
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 class Owner:
-    def __init__(self, public_key: G1Element, puzzle_hash: bytes32):
-        self.public_key = public_key
-        self.puzzle_hash = puzzle_hash
+    """
+    An immutable owner of a singleton.
+
+    The public key is kept as bytes and only parsed when it is needed as a `G1Element`,
+    so millions of owners can be held without their parsed keys.
+    """
+
+    __slots__ = ("public_key_bytes", "puzzle_hash", "_public_key", "_tree_hash")
+
+    # The serialized public key followed by the puzzle hash
+    SERIALIZED_SIZE = 48 + 32
+
+    def __init__(self, public_key: Union[G1Element, bytes], puzzle_hash: bytes32):
+        object.__setattr__(self, "public_key_bytes", bytes(public_key))
+        object.__setattr__(self, "puzzle_hash", bytes32(puzzle_hash))
+        object.__setattr__(
+            self,
+            "_public_key",
+            public_key if isinstance(public_key, G1Element) else None,
+        )
+        object.__setattr__(self, "_tree_hash", None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    @property
+    def public_key(self) -> G1Element:
+        if self._public_key is None:
+            object.__setattr__(
+                self, "_public_key", G1Element.from_bytes(self.public_key_bytes)
+            )
+        return self._public_key
+
+    def tree_hash(self) -> bytes32:
+        """
+        The tree hash of `(public_key puzzle_hash)`, which `inner_puzzle_hash_for_new_owner`
+        computes on chain.
+        """
+        if self._tree_hash is None:
+            object.__setattr__(
+                self,
+                "_tree_hash",
+                list_tree_hash(
+                    [
+                        atom_tree_hash(self.public_key_bytes),
+                        atom_tree_hash(self.puzzle_hash),
+                    ]
+                ),
+            )
+        return self._tree_hash
+
+    def __eq__(self, other) -> bool:
+        return (
+            isinstance(other, Owner)
+            and self.public_key_bytes == other.public_key_bytes
+            and self.puzzle_hash == other.puzzle_hash
+        )
+
+    def __hash__(self) -> int:
+        return hash((self.public_key_bytes, self.puzzle_hash))
+
+    def __repr__(self) -> str:
+        return f"Owner({self.public_key_bytes.hex()}, {self.puzzle_hash.hex()})"
+
+    def __bytes__(self) -> bytes:
+        return self.public_key_bytes + self.puzzle_hash
+
+    def __reduce__(self):
+        return Owner.from_bytes, (bytes(self),)
+
+    @staticmethod
+    def from_bytes(blob: bytes) -> "Owner":
+        if len(blob) != Owner.SERIALIZED_SIZE:
+            raise ValueError(
+                f"An owner has {Owner.SERIALIZED_SIZE} bytes, not {len(blob)}"
+            )
+        return Owner(blob[:48], bytes32(blob[48:]))
 
     @staticmethod
     def from_bytes_list(owner_array: List[bytes32]):
-        return Owner(G1Element.from_bytes(owner_array[0]), owner_array[1])
+        return Owner(G1Element.from_bytes(owner_array[0]), bytes32(owner_array[1]))
 
 
 class Royalty:
+    """
+    An immutable royalty, which pays `percentage` of every sale to `creator_puzhash`.
+    """
+
+    __slots__ = ("creator_puzhash", "percentage", "_tree_hash")
+
+    # The creator puzzle hash followed by the percentage as one byte
+    SERIALIZED_SIZE = 32 + 1
+
     def __init__(self, creator_puzhash: bytes32, percentage: int):
-        self.creator_puzhash = creator_puzhash
-        self.percentage = percentage
+        if not 0 <= percentage <= 255:
+            raise ValueError(f"Invalid royalty percentage: {percentage}")
+        object.__setattr__(self, "creator_puzhash", bytes32(creator_puzhash))
+        object.__setattr__(self, "percentage", percentage)
+        object.__setattr__(self, "_tree_hash", None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def tree_hash(self) -> bytes32:
+        """
+        The tree hash of `(creator_puzhash percentage)`, the curried ROYALTY of version 2.
+        """
+        if self._tree_hash is None:
+            object.__setattr__(
+                self,
+                "_tree_hash",
+                list_tree_hash(
+                    [
+                        atom_tree_hash(self.creator_puzhash),
+                        atom_tree_hash(int_to_bytes(self.percentage)),
+                    ]
+                ),
+            )
+        return self._tree_hash
+
+    def __eq__(self, other) -> bool:
+        return (
+            isinstance(other, Royalty)
+            and self.creator_puzhash == other.creator_puzhash
+            and self.percentage == other.percentage
+        )
+
+    def __hash__(self) -> int:
+        return hash((self.creator_puzhash, self.percentage))
+
+    def __repr__(self) -> str:
+        return f"Royalty({self.creator_puzhash.hex()}, {self.percentage})"
+
+    def __bytes__(self) -> bytes:
+        return self.creator_puzhash + bytes([self.percentage])
+
+    def __reduce__(self):
+        return Royalty.from_bytes, (bytes(self),)
+
+    @staticmethod
+    def from_bytes(blob: bytes) -> "Royalty":
+        if len(blob) != Royalty.SERIALIZED_SIZE:
+            raise ValueError(
+                f"A royalty has {Royalty.SERIALIZED_SIZE} bytes, not {len(blob)}"
+            )
+        return Royalty(bytes32(blob[:32]), blob[32])
 
     @staticmethod
     def from_bytes_list(royalty_list: List[bytes32]):
-        return Royalty(royalty_list[0], int_from_bytes(royalty_list[1]))
+        return Royalty(bytes32(royalty_list[0]), int_from_bytes(royalty_list[1]))
 
 
-def pay_to_singleton_puzzle(launcher_id: bytes32, cancel_puzhash: bytes32) -> Program:
-    return P2_SINGLETON_OR_CANCEL_MOD.curry(
+@lru_cache(maxsize=PUZZLE_CACHE_SIZE)
+@traced("driver.curry.p2_singleton")
+def _pay_to_singleton_puzzle(
+    launcher_id: bytes32, cancel_puzhash: bytes32
+) -> Tuple[Program, bytes32]:
+    puzzle = P2_SINGLETON_OR_CANCEL.program.curry(
         SINGLETON_MOD_HASH, launcher_id, SINGLETON_LAUNCHER_HASH, cancel_puzhash
     )
+    return puzzle, puzzle.get_tree_hash()
 
 
-def create_inner_puzzle(version: int, owner: Owner, royalty: Optional[Royalty] = None):
+def pay_to_singleton_puzzle(launcher_id: bytes32, cancel_puzhash: bytes32) -> Program:
+    return _pay_to_singleton_puzzle(launcher_id, cancel_puzhash)[0]
+
+
+def pay_to_singleton_puzzle_hash(
+    launcher_id: bytes32, cancel_puzhash: bytes32
+) -> bytes32:
+    return _pay_to_singleton_puzzle(launcher_id, cancel_puzhash)[1]
+
+
+def create_offer_cancel(
+    p2_singleton_coin: Coin, launcher_id: bytes32, cancel_puzhash: bytes32
+) -> CoinSpend:
+    """
+    Creates the spend that pays the coin of an offer back to `cancel_puzhash`.
+
+    The cancel path is taken if `my_id` is nil, it needs no signature.
+    """
+    return CoinSpend(
+        p2_singleton_coin,
+        pay_to_singleton_puzzle(launcher_id, cancel_puzhash),
+        Program.to([p2_singleton_coin.amount, 0, 0]),
+    )
+
+
+@lru_cache(maxsize=PUZZLE_CACHE_SIZE)
+@traced("driver.curry.inner")
+def _inner_puzzle(version: int, owner: Owner, royalty: Optional[Royalty]) -> Program:
     if version == 1:
         if royalty is not None:
-            raise f"Version 1 does not support royalties"
+            raise ValueError("Version 1 does not support royalties")
 
-        return OWNABLE_SINGLETON_MOD_V1.curry(
-            owner.public_key,
+        return OWNABLE_SINGLETON_V1.program.curry(
+            owner.public_key_bytes,
             owner.puzzle_hash,
-            OWNABLE_SINGLETON_MOD_V1.get_tree_hash(),
+            OWNABLE_SINGLETON_V1.tree_hash,
         )
     elif version == 2:
-        return OWNABLE_SINGLETON_MOD_V2.curry(
+        return OWNABLE_SINGLETON_V2.program.curry(
             [
-                owner.public_key,
+                owner.public_key_bytes,
                 owner.puzzle_hash,
             ],
             [royalty.creator_puzhash, royalty.percentage] if royalty else [],
-            OWNABLE_SINGLETON_MOD_V2.get_tree_hash(),
+            OWNABLE_SINGLETON_V2.tree_hash,
         )
-    else:
-        raise f"Unsupported version: {version}"
+    raise ValueError(f"Unsupported version: {version}")
+
+
+def create_inner_puzzle(version: int, owner: Owner, royalty: Optional[Royalty] = None):
+    return _inner_puzzle(version, owner, royalty)
+
+
+def inner_puzzle_hash(
+    version: int, owner: Owner, royalty: Optional[Royalty] = None
+) -> bytes32:
+    # Computed from the tree hashes of the curried arguments, without currying the puzzle
+    if version == 1:
+        if royalty is not None:
+            raise ValueError("Version 1 does not support royalties")
+
+        mod_hash = OWNABLE_SINGLETON_V1.tree_hash
+        return curried_puzzle_hash(
+            mod_hash,
+            atom_tree_hash(owner.public_key_bytes),
+            atom_tree_hash(owner.puzzle_hash),
+            atom_tree_hash(mod_hash),
+        )
+    elif version == 2:
+        mod_hash = OWNABLE_SINGLETON_V2.tree_hash
+        return curried_puzzle_hash(
+            mod_hash,
+            owner.tree_hash(),
+            royalty.tree_hash() if royalty else NIL_TREE_HASH,
+            atom_tree_hash(mod_hash),
+        )
+    raise ValueError(f"Unsupported version: {version}")
+
+
+@lru_cache(maxsize=PUZZLE_CACHE_SIZE)
+@traced("driver.curry.singleton")
+def _singleton_puzzle(
+    launcher_id: bytes32, version: int, owner: Owner, royalty: Optional[Royalty]
+) -> Program:
+    return singleton_top_layer.puzzle_for_singleton(
+        launcher_id, _inner_puzzle(version, owner, royalty)
+    )
+
+
+def singleton_puzzle(
+    launcher_id: bytes32, version: int, owner: Owner, royalty: Optional[Royalty] = None
+) -> Program:
+    return _singleton_puzzle(launcher_id, version, owner, royalty)
+
+
+def singleton_puzzle_hash(
+    launcher_id: bytes32, version: int, owner: Owner, royalty: Optional[Royalty] = None
+) -> bytes32:
+    singleton_struct = pair_tree_hash(
+        atom_tree_hash(SINGLETON_MOD_HASH),
+        pair_tree_hash(
+            atom_tree_hash(launcher_id), atom_tree_hash(SINGLETON_LAUNCHER_HASH)
+        ),
+    )
+    return curried_puzzle_hash(
+        SINGLETON_MOD_HASH,
+        singleton_struct,
+        inner_puzzle_hash(version, owner, royalty),
+    )
 
 
 def create_inner_solution(
-    version: int, new_owner: Owner, payment_amount: int, payment_id: bytes32
+    version: int,
+    new_owner: Owner,
+    payment_amount: int = 0,
+    payment_id: Optional[bytes32] = None,
 ) -> Program:
+    # Without a payment, the puzzles take their unpaid change_owner branch
     if version == 1:
         return Program.to(
             [
-                new_owner.public_key,
+                new_owner.public_key_bytes,
                 new_owner.puzzle_hash,
-                payment_amount,
-                payment_id,
+                payment_amount if payment_id is not None else 0,
+                payment_id if payment_id is not None else [],
             ]
         )
     elif version == 2:
         return Program.to(
             [
-                [new_owner.public_key, new_owner.puzzle_hash],
-                [payment_amount, payment_id],
+                [new_owner.public_key_bytes, new_owner.puzzle_hash],
+                [payment_amount, payment_id] if payment_id is not None else [],
             ]
         )
+    raise ValueError(f"Unsupported version: {version}")
+
+
+def genesis_hidden_puzzle_hash(index: int) -> bytes32:
+    # Every genesis coin of a collection needs a distinct puzzle hash, otherwise a
+    # transaction creating several of them would output duplicate coins
+    return std_hash(
+        p2_delegated_puzzle_or_hidden_puzzle.DEFAULT_HIDDEN_PUZZLE_HASH
+        + int_to_bytes(index)
+    )
+
+
+def genesis_puzzle_for_index(public_key: G1Element, index: int) -> Program:
+    return p2_delegated_puzzle_or_hidden_puzzle.puzzle_for_public_key_and_hidden_puzzle_hash(
+        public_key, genesis_hidden_puzzle_hash(index)
+    )
 
 
+@traced("driver.create_singleton")
 def create_unsigned_ownable_singleton(
     genesis_coin: Coin,
     genesis_coin_puzzle: Program,
@@ -114,13 +390,22 @@ def create_unsigned_ownable_singleton(
     name: str,
     version=1,
     royalty: Optional[Royalty] = None,
+    content_hash: Optional[bytes32] = None,
 ) -> Tuple[List[CoinSpend], Program]:
     comment = [
         ("uri", uri),
         ("name", name),
-        ("creator", [creator.public_key, creator.puzzle_hash] if version == 2 else creator.public_key),
+        (
+            "creator",
+            [creator.public_key, creator.puzzle_hash]
+            if version == 2
+            else creator.public_key,
+        ),
         ("version", version),
     ]
+    if content_hash is not None:
+        # The sha256 of the media at the uri
+        comment.append(("hash", content_hash))
 
     inner_puzzle = create_inner_puzzle(version, creator, royalty)
     if royalty:
@@ -151,6 +436,70 @@ def create_unsigned_ownable_singleton(
     return [launcher_coinsol, starting_coinsol], delegated_puzzle
 
 
+class LauncherMetadata:
+    def __init__(
+        self,
+        version: int,
+        uri: str,
+        name: str,
+        creator_public_key: G1Element,
+        creator_puzhash: Optional[bytes32],
+        royalty: Optional[Royalty],
+        content_hash: Optional[bytes32] = None,
+    ):
+        self.version = version
+        self.uri = uri
+        self.name = name
+        self.creator_public_key = creator_public_key
+        # Version 1 launchers only include the public key of the creator
+        self.creator_puzhash = creator_puzhash
+        self.royalty = royalty
+        self.content_hash = content_hash
+
+
+def decode_launcher_solution(launcher_solution: Program) -> LauncherMetadata:
+    """
+    Decodes the comment that `create_unsigned_ownable_singleton` adds to the launcher solution.
+    """
+    comment = {}
+    for pair in launcher_solution.rest().rest().first().as_iter():
+        comment[pair.first().as_atom().decode("utf-8")] = pair.rest()
+
+    version = comment["version"].as_int() if "version" in comment else 1
+    if version == 2:
+        creator_public_key, creator_puzhash = comment["creator"].as_atom_list()
+    else:
+        creator_public_key, creator_puzhash = comment["creator"].as_atom(), None
+
+    return LauncherMetadata(
+        version,
+        comment["uri"].as_atom().decode("utf-8"),
+        comment["name"].as_atom().decode("utf-8"),
+        G1Element.from_bytes(creator_public_key),
+        bytes32(creator_puzhash) if creator_puzhash is not None else None,
+        Royalty.from_bytes_list(comment["royalty"].as_atom_list())
+        if "royalty" in comment
+        else None,
+        bytes32(comment["hash"].as_atom()) if "hash" in comment else None,
+    )
+
+
+def new_owner_from_singleton_solution(
+    version: int, singleton_solution: Program
+) -> Owner:
+    """
+    Reads the new owner from the solution of a singleton spend created by `create_buy_offer`.
+    """
+    inner_solution = singleton_solution.rest().rest().first()
+    if version == 1:
+        public_key, puzzle_hash = inner_solution.as_atom_list()[:2]
+        return Owner(G1Element.from_bytes(public_key), bytes32(puzzle_hash))
+    elif version == 2:
+        return Owner.from_bytes_list(inner_solution.first().as_atom_list())
+    raise ValueError(f"Unsupported version: {version}")
+
+
+@traced("driver.create_buy_offer")
 def create_buy_offer(
     p2_singleton_coin: Coin,
     p2_singleton_puzzle: Program,
@@ -163,11 +512,9 @@ def create_buy_offer(
     version=1,
     royalty: Optional[Royalty] = None,
 ) -> List[CoinSpend]:
-    singleton_inner_puzzle = create_inner_puzzle(version, current_owner, royalty)
-
     p2_singleton_solution = Program.to(
         [
-            singleton_inner_puzzle.get_tree_hash(),
+            inner_puzzle_hash(version, current_owner, royalty),
             p2_singleton_coin.name(),
             new_owner.public_key,
         ]
@@ -177,8 +524,8 @@ def create_buy_offer(
         p2_singleton_coin, p2_singleton_puzzle, p2_singleton_solution
     )
 
-    singleton_puzzle = singleton_top_layer.puzzle_for_singleton(
-        launcher_id, singleton_inner_puzzle
+    full_singleton_puzzle = singleton_puzzle(
+        launcher_id, version, current_owner, royalty
     )
 
     inner_solution = create_inner_solution(
@@ -192,7 +539,51 @@ def create_buy_offer(
     )
 
     singleton_coinsol: CoinSpend = CoinSpend(
-        singleton_coin, singleton_puzzle, singleton_solution
+        singleton_coin, full_singleton_puzzle, singleton_solution
     )
 
     return [p2_singleton_coinsol, singleton_coinsol]
+
+
+@traced("driver.create_transfer")
+def create_transfer(
+    launcher_id: bytes32,
+    lineage_proof: LineageProof,
+    singleton_coin: Coin,
+    current_owner: Owner,
+    new_owner: Owner,
+    version=1,
+    royalty: Optional[Royalty] = None,
+) -> CoinSpend:
+    """
+    Creates the spend that transfers a singleton to `new_owner` without a payment.
+
+    The spend needs two AGG_SIG_ME signatures, see `transfer_signing_messages`.
+    """
+    singleton_solution: Program = singleton_top_layer.solution_for_singleton(
+        lineage_proof,
+        singleton_coin.amount,
+        create_inner_solution(version, new_owner),
+    )
+    return CoinSpend(
+        singleton_coin,
+        singleton_puzzle(launcher_id, version, current_owner, royalty),
+        singleton_solution,
+    )
+
+
+def transfer_signing_messages(
+    singleton_coin: Coin,
+    current_owner: Owner,
+    new_owner: Owner,
+    additional_data: bytes,
+) -> List[Tuple[Owner, bytes]]:
+    """
+    The owners and messages that have to sign a transfer: the new owner signs its puzzle hash
+    and the current owner signs the public key of the new owner.
+    """
+    coin_id = singleton_coin.name()
+    return [
+        (new_owner, new_owner.puzzle_hash + coin_id + additional_data),
+        (current_owner, new_owner.public_key_bytes + coin_id + additional_data),
+    ]
@@ -0,0 +1,121 @@
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from chia.types.blockchain_format.program import Program, SerializedProgram
+from chia.types.blockchain_format.sized_bytes import bytes32
+from chia.wallet.puzzles.singleton_top_layer import SINGLETON_MOD_HASH
+from ownable_singleton.drivers.ownable_singleton_driver import (
+    OWNABLE_SINGLETON_V1,
+    OWNABLE_SINGLETON_V2,
+    PUZZLE_CACHE_SIZE,
+    Owner,
+    Royalty,
+)
+from ownable_singleton.drivers.puzzle_loader import PinnedPuzzle
+
+# Reads the owner and royalty from the curried arguments of an inner puzzle
+InnerPuzzleDecoder = Callable[[Program], Tuple[Owner, Optional[Royalty]]]
+
+
+class DecodedSingleton:
+    __slots__ = ("launcher_id", "version", "owner", "royalty", "inner_puzzle_hash")
+
+    def __init__(
+        self,
+        launcher_id: bytes32,
+        version: int,
+        owner: Owner,
+        royalty: Optional[Royalty],
+        inner_puzzle_hash: bytes32,
+    ):
+        self.launcher_id = launcher_id
+        self.version = version
+        self.owner = owner
+        self.royalty = royalty
+        self.inner_puzzle_hash = inner_puzzle_hash
+
+
+def _decode_v1(arguments: Program) -> Tuple[Owner, Optional[Royalty]]:
+    public_key, puzzle_hash = arguments.as_atom_list()[:2]
+    return Owner(public_key, bytes32(puzzle_hash)), None
+
+
+def _decode_v2(arguments: Program) -> Tuple[Owner, Optional[Royalty]]:
+    owner = Owner.from_bytes_list(arguments.first().as_atom_list())
+    royalty = arguments.rest().first()
+    return owner, Royalty.from_bytes_list(royalty.as_atom_list()) if royalty else None
+
+
+_registry: List[Tuple[PinnedPuzzle, int, InnerPuzzleDecoder]] = [
+    (OWNABLE_SINGLETON_V1, 1, _decode_v1),
+    (OWNABLE_SINGLETON_V2, 2, _decode_v2),
+]
+_decoders: Optional[Dict[bytes32, Tuple[int, InnerPuzzleDecoder]]] = None
+_decoded: "OrderedDict[bytes32, Optional[DecodedSingleton]]" = OrderedDict()
+
+
+def register_inner_puzzle(
+    puzzle: PinnedPuzzle, version: int, decode: InnerPuzzleDecoder
+):
+    """
+    Makes `decode_singleton_puzzle` recognize singletons with `puzzle` as inner puzzle.
+    """
+    global _decoders
+    _registry.append((puzzle, version, decode))
+    _decoders = None
+    _decoded.clear()
+
+
+def _decoder_for(mod_hash: bytes32) -> Optional[Tuple[int, InnerPuzzleDecoder]]:
+    global _decoders
+    # The mod hashes are resolved on first use, since they change in dev mode
+    if _decoders is None:
+        _decoders = {
+            puzzle.tree_hash: (version, decode) for puzzle, version, decode in _registry
+        }
+    return _decoders.get(mod_hash)
+
+
+def _decode(puzzle: Program) -> Optional[DecodedSingleton]:
+    mod, arguments = puzzle.uncurry()
+    if mod.get_tree_hash() != SINGLETON_MOD_HASH:
+        return None
+    try:
+        singleton_struct, inner_puzzle = arguments.as_iter()
+        inner_mod, inner_arguments = inner_puzzle.uncurry()
+        decoder = _decoder_for(inner_mod.get_tree_hash())
+        if decoder is None:
+            return None
+        version, decode = decoder
+        owner, royalty = decode(inner_arguments)
+        launcher_id = bytes32(singleton_struct.rest().first().as_atom())
+    except (ValueError, TypeError):
+        # The singleton has been curried with arguments its inner puzzle does not expect
+        return None
+    return DecodedSingleton(
+        launcher_id, version, owner, royalty, inner_puzzle.get_tree_hash()
+    )
+
+
+def decode_singleton_puzzle(
+    puzzle: Union[Program, SerializedProgram]
+) -> Optional[DecodedSingleton]:
+    """
+    Detects the version, owner and royalty of an ownable singleton from its full puzzle,
+    for example the puzzle reveal of a singleton spend. Returns None for other puzzles.
+
+    Results are cached by puzzle hash, so every coin of a singleton with the same owner is
+    only uncurried once.
+    """
+    puzzle_hash = puzzle.get_tree_hash()
+    if puzzle_hash in _decoded:
+        _decoded.move_to_end(puzzle_hash)
+        return _decoded[puzzle_hash]
+
+    if isinstance(puzzle, SerializedProgram):
+        puzzle = puzzle.to_program()
+    decoded = _decode(puzzle)
+    _decoded[puzzle_hash] = decoded
+    if len(_decoded) > PUZZLE_CACHE_SIZE:
+        _decoded.popitem(last=False)
+    return decoded
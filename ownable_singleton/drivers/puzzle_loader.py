@@ -0,0 +1,72 @@
+import os
+from pathlib import Path
+from typing import Optional
+
+import ownable_singleton.clsp as clsp_package
+from chia.types.blockchain_format.program import Program
+from chia.types.blockchain_format.sized_bytes import bytes32
+
+# Set this environment variable to compile the puzzles from their .clsp sources on first use.
+# This is only needed while working on the puzzles themselves.
+DEV_MODE_ENV = "NFT_COMPANION_DEV_PUZZLES"
+
+CLSP_PATH: Path = Path(clsp_package.__file__).parent
+
+
+class PuzzleIntegrityError(Exception):
+    pass
+
+
+def dev_mode() -> bool:
+    return os.environ.get(DEV_MODE_ENV, "") not in ("", "0")
+
+
+def _compile_puzzle(filename: str) -> Program:
+    import cdv.clibs as std_lib
+    from cdv.util.load_clvm import load_clvm
+
+    return load_clvm(
+        filename,
+        clsp_package.__name__,
+        search_paths=[Path(std_lib.__file__).parent],
+    )
+
+
+class PinnedPuzzle:
+    """
+    A puzzle that is deserialized from its shipped .clsp.hex file on first use.
+
+    The tree hash of the loaded puzzle is checked against the pinned mod hash. In dev mode the
+    puzzle is compiled from its source instead, and its tree hash is computed.
+    """
+
+    def __init__(self, filename: str, pinned_hash: str):
+        self.filename = filename
+        self.pinned_hash = bytes32(bytes.fromhex(pinned_hash))
+        self._program: Optional[Program] = None
+        self._tree_hash: Optional[bytes32] = None
+
+    @property
+    def program(self) -> Program:
+        if self._program is None:
+            if dev_mode():
+                program = _compile_puzzle(self.filename)
+                self._tree_hash = program.get_tree_hash()
+            else:
+                hex_path = CLSP_PATH / f"{self.filename}.hex"
+                program = Program.fromhex(hex_path.read_text().strip())
+                if program.get_tree_hash() != self.pinned_hash:
+                    raise PuzzleIntegrityError(
+                        f"{hex_path.name} does not match its pinned mod hash {self.pinned_hash}. "
+                        f"Set {DEV_MODE_ENV}=1 to compile the puzzle from its source."
+                    )
+            self._program = program
+        return self._program
+
+    @property
+    def tree_hash(self) -> bytes32:
+        if self._tree_hash is None:
+            self._tree_hash = (
+                self.program.get_tree_hash() if dev_mode() else self.pinned_hash
+            )
+        return self._tree_hash
@@ -0,0 +1,47 @@
+from typing import List
+
+from chia.types.blockchain_format.sized_bytes import bytes32
+from chia.util.hash import std_hash
+
+# The tree hashes of the atoms and keywords that appear in curried puzzles
+NIL_TREE_HASH: bytes32 = std_hash(b"\x01")
+ONE_TREE_HASH: bytes32 = std_hash(b"\x01\x01")
+Q_KW_TREE_HASH: bytes32 = std_hash(b"\x01\x01")
+A_KW_TREE_HASH: bytes32 = std_hash(b"\x01\x02")
+C_KW_TREE_HASH: bytes32 = std_hash(b"\x01\x04")
+
+
+def atom_tree_hash(atom: bytes) -> bytes32:
+    return std_hash(b"\x01" + atom)
+
+
+def pair_tree_hash(first: bytes32, rest: bytes32) -> bytes32:
+    return std_hash(b"\x02" + first + rest)
+
+
+def list_tree_hash(item_tree_hashes: List[bytes32]) -> bytes32:
+    tree_hash = NIL_TREE_HASH
+    for item_tree_hash in reversed(item_tree_hashes):
+        tree_hash = pair_tree_hash(item_tree_hash, tree_hash)
+    return tree_hash
+
+
+def curried_puzzle_hash(mod_hash: bytes32, *argument_tree_hashes: bytes32) -> bytes32:
+    """
+    Computes the tree hash of `mod.curry(*arguments)` from the tree hashes of the mod and the
+    arguments, like `puzzle-hash-of-curried-function` does on chain.
+
+    A curried puzzle is `(a (q . mod) (c (q . arg1) (c (q . arg2) ... 1)))`.
+    """
+    environment = ONE_TREE_HASH
+    for argument_tree_hash in reversed(argument_tree_hashes):
+        environment = list_tree_hash(
+            [
+                C_KW_TREE_HASH,
+                pair_tree_hash(Q_KW_TREE_HASH, argument_tree_hash),
+                environment,
+            ]
+        )
+    return list_tree_hash(
+        [A_KW_TREE_HASH, pair_tree_hash(Q_KW_TREE_HASH, mod_hash), environment]
+    )
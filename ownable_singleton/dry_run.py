@@ -0,0 +1,146 @@
+from typing import Iterable, Iterator, List, Optional
+
+from chia.consensus.default_constants import DEFAULT_CONSTANTS
+from chia.types.coin_spend import CoinSpend
+from chia.types.condition_costs import ConditionCost
+from chia.types.condition_opcodes import ConditionOpcode
+from chia.types.condition_with_args import ConditionWithArgs
+from chia.types.spend_bundle import SpendBundle
+from chia.util.condition_tools import conditions_for_solution
+from chia.util.errors import Err
+
+# The mempool rejects any single transaction that costs more than half a block
+MAX_BUNDLE_COST: int = DEFAULT_CONSTANTS.MAX_BLOCK_COST_CLVM // 2
+
+_CONDITION_COSTS = {
+    ConditionOpcode.AGG_SIG_ME: ConditionCost.AGG_SIG.value,
+    ConditionOpcode.AGG_SIG_UNSAFE: ConditionCost.AGG_SIG.value,
+    ConditionOpcode.CREATE_COIN: ConditionCost.CREATE_COIN.value,
+}
+
+
+class SpendResult:
+    def __init__(
+        self,
+        coin_spend: CoinSpend,
+        clvm_cost: int,
+        conditions: List[ConditionWithArgs],
+        error: Optional[Err] = None,
+    ):
+        self.coin_spend = coin_spend
+        self.clvm_cost = clvm_cost
+        self.conditions = conditions
+        self.error = error
+
+    @property
+    def condition_cost(self) -> int:
+        return sum(_CONDITION_COSTS.get(c.opcode, 0) for c in self.conditions)
+
+    @property
+    def byte_cost(self) -> int:
+        return len(bytes(self.coin_spend)) * DEFAULT_CONSTANTS.COST_PER_BYTE
+
+    @property
+    def cost(self) -> int:
+        return self.clvm_cost + self.condition_cost + self.byte_cost
+
+
+class DryRunResult:
+    def __init__(self, spend_results: List[SpendResult], max_cost: int):
+        self.spend_results = spend_results
+        self.max_cost = max_cost
+
+    @property
+    def clvm_cost(self) -> int:
+        return sum(result.clvm_cost for result in self.spend_results)
+
+    @property
+    def cost(self) -> int:
+        return sum(result.cost for result in self.spend_results)
+
+    @property
+    def errors(self) -> List[SpendResult]:
+        return [result for result in self.spend_results if result.error is not None]
+
+    @property
+    def exceeds_max_cost(self) -> bool:
+        return self.cost > self.max_cost
+
+    @property
+    def valid(self) -> bool:
+        return len(self.errors) == 0 and not self.exceeds_max_cost
+
+
+def dry_run_coin_spend(coin_spend: CoinSpend, max_cost: int) -> SpendResult:
+    error, conditions, cost = conditions_for_solution(
+        coin_spend.puzzle_reveal, coin_spend.solution, max_cost
+    )
+    return SpendResult(coin_spend, cost, conditions or [], error)
+
+
+def dry_run_spend_bundle(
+    spend_bundle: SpendBundle, max_cost: int = MAX_BUNDLE_COST
+) -> DryRunResult:
+    """
+    Runs every coin spend of a spend bundle locally and accounts for its cost.
+
+    The cost of a spend is the CLVM cost of running its puzzle, plus the cost of its AGG_SIG
+    and CREATE_COIN conditions, plus the cost of its serialized size.
+    """
+    return DryRunResult(
+        [
+            dry_run_coin_spend(coin_spend, max_cost)
+            for coin_spend in spend_bundle.coin_spends
+        ],
+        max_cost,
+    )
+
+
+class DryRunError(Exception):
+    pass
+
+
+def iter_split_spend_bundles(
+    spend_bundles: Iterable[SpendBundle],
+    max_cost: int = MAX_BUNDLE_COST,
+    max_bundles: Optional[int] = None,
+) -> Iterator[SpendBundle]:
+    """
+    Aggregates consecutive spend bundles into as few bundles as possible, without exceeding
+    `max_cost` per aggregated bundle or `max_bundles` input bundles per aggregated bundle.
+
+    The aggregated bundles are yielded as soon as they are complete, so the input can be
+    streamed.
+    """
+    chunk: List[SpendBundle] = []
+    chunk_cost = 0
+    for spend_bundle in spend_bundles:
+        result = dry_run_spend_bundle(spend_bundle, max_cost)
+        if len(result.errors) > 0:
+            raise DryRunError(
+                f"Spend bundle {spend_bundle.name()} fails to run: {result.errors[0].error.name}"
+            )
+        if result.exceeds_max_cost:
+            raise DryRunError(
+                f"Spend bundle {spend_bundle.name()} costs {result.cost}, more than {max_cost} on its own"
+            )
+        cost = result.cost
+        if len(chunk) > 0 and (
+            chunk_cost + cost > max_cost
+            or (max_bundles is not None and len(chunk) >= max_bundles)
+        ):
+            yield SpendBundle.aggregate(chunk)
+            chunk = []
+            chunk_cost = 0
+        chunk.append(spend_bundle)
+        chunk_cost += cost
+    if len(chunk) > 0:
+        yield SpendBundle.aggregate(chunk)
+
+
+def split_spend_bundles(
+    spend_bundles: List[SpendBundle],
+    max_cost: int = MAX_BUNDLE_COST,
+    max_bundles: Optional[int] = None,
+) -> List[SpendBundle]:
+    return list(iter_split_spend_bundles(spend_bundles, max_cost, max_bundles))
@@ -0,0 +1,253 @@
+import asyncio
+import gzip
+import json
+import os
+from typing import Any, Dict, Mapping, Optional
+
+import aiohttp
+
+from chia.types.spend_bundle import SpendBundle
+from ownable_singleton.tracing import span
+
+SPEND_BUNDLE_CONTENT_TYPE = "application/octet-stream"
+# Set to 1 to submit binary spend bundles and gzip-compressed bodies to the gallery
+COMPACT_SUBMISSIONS_ENV = "NFT_COMPANION_COMPACT_SUBMISSIONS"
+# Smaller bodies are sent uncompressed, since compressing them saves less than it costs
+COMPRESSION_THRESHOLD = 1024
+# The gallery answers with these status codes to bodies in a format it does not accept.
+# Other errors, like 400 or 422, reject the submission itself and are not retried.
+UNSUPPORTED_FORMAT_STATUS_CODES = (406, 415)
+
+
+def compact_submissions_enabled() -> bool:
+    return os.environ.get(COMPACT_SUBMISSIONS_ENV, "0") == "1"
+
+
+class GalleryClientError(Exception):
+    pass
+
+
+class GalleryResponse:
+    def __init__(
+        self,
+        status_code: int,
+        text: str,
+        headers: Optional[Mapping[str, str]] = None,
+        not_modified: bool = False,
+    ):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+        # Set when a conditional request has been answered from the cache
+        self.not_modified = not_modified
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+
+class RateLimiter:
+    """
+    Spaces the start of requests at least `1 / rate` seconds apart.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = asyncio.get_event_loop().time()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+class GalleryClient:
+    """
+    An asyncio client for the MintGarden gallery API.
+
+    All requests share one pooled, keep-alive HTTP session. At most `max_concurrency`
+    requests are in flight at the same time, and every request is bounded by `timeout` seconds.
+    If `rate` is set, at most `rate` requests per second are sent to the gallery host.
+
+    Conditional GET requests revalidate the last response of the same path with its ETag
+    and Last-Modified headers, so unchanged resources are answered from the cache.
+
+    Submissions are sent as plain JSON, which the gallery always accepts. If `binary` is
+    set, spend bundles are submitted in their streamable binary format instead, and if
+    `compress` is set, larger bodies are gzip-compressed. Both default to the
+    `NFT_COMPANION_COMPACT_SUBMISSIONS` environment variable. If the gallery answers such a
+    body with an unsupported format status, the submission is retried once as plain JSON,
+    and the client keeps using plain JSON for the rest of its lifetime.
+    """
+
+    def __init__(
+        self,
+        api_url: str,
+        max_concurrency: int = 8,
+        timeout: float = 30,
+        keepalive_timeout: float = 30,
+        rate: Optional[float] = None,
+        compress: Optional[bool] = None,
+        binary: Optional[bool] = None,
+    ):
+        self.api_url = api_url
+        self.max_concurrency = max_concurrency
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.keepalive_timeout = keepalive_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._rate_limiter = RateLimiter(rate) if rate else None
+        self._cache: Dict[str, GalleryResponse] = {}
+        if compress is None:
+            compress = compact_submissions_enabled()
+        if binary is None:
+            binary = compact_submissions_enabled()
+        self.compress = compress
+        self._binary_supported = binary
+        self._compressed_json_supported = compress
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self) -> "GalleryClient":
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def open(self):
+        if self._session is None:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_concurrency, keepalive_timeout=self.keepalive_timeout
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=self.timeout
+            )
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        json_data: Optional[Dict] = None,
+        headers: Optional[Dict[str, str]] = None,
+        data: Optional[bytes] = None,
+    ) -> GalleryResponse:
+        await self.open()
+        with span("http.request", method=method, path=path) as request_span:
+            async with self._semaphore:
+                if self._rate_limiter is not None:
+                    await self._rate_limiter.wait()
+                try:
+                    async with self._session.request(
+                        method,
+                        f"{self.api_url}{path}",
+                        json=json_data,
+                        data=data,
+                        headers=headers,
+                    ) as response:
+                        request_span.set(status=response.status)
+                        return GalleryResponse(
+                            response.status, await response.text(), response.headers
+                        )
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    raise GalleryClientError(
+                        f"Request to {path} failed: {e or type(e).__name__}"
+                    )
+
+    async def conditional_get(self, path: str) -> GalleryResponse:
+        cached = self._cache.get(path)
+        headers = {}
+        if cached is not None:
+            if "ETag" in cached.headers:
+                headers["If-None-Match"] = cached.headers["ETag"]
+            if "Last-Modified" in cached.headers:
+                headers["If-Modified-Since"] = cached.headers["Last-Modified"]
+
+        response = await self.request("GET", path, headers=headers)
+        if response.status_code == 304 and cached is not None:
+            return GalleryResponse(
+                cached.status_code, cached.text, cached.headers, not_modified=True
+            )
+        if response.status_code == 200 and (
+            "ETag" in response.headers or "Last-Modified" in response.headers
+        ):
+            self._cache[path] = response
+        return response
+
+    async def get_singleton(self, launcher_id: str) -> GalleryResponse:
+        return await self.request("GET", f"/singletons/{launcher_id}")
+
+    async def get_offer(self, launcher_id: str, offer_id: str) -> GalleryResponse:
+        return await self.request("GET", f"/singletons/{launcher_id}/offers/{offer_id}")
+
+    async def get_offers(self, launcher_id: str) -> GalleryResponse:
+        return await self.conditional_get(f"/singletons/{launcher_id}/offers")
+
+    async def post_body(
+        self, path: str, body: bytes, content_type: str
+    ) -> GalleryResponse:
+        headers = {"Content-Type": content_type, "Accept": "application/json"}
+        if self.compress and len(body) >= COMPRESSION_THRESHOLD:
+            with span("serialize.gzip", size=len(body)):
+                body = gzip.compress(body, compresslevel=6)
+            headers["Content-Encoding"] = "gzip"
+        return await self.request("POST", path, headers=headers, data=body)
+
+    async def submit_singleton(self, spend_bundle: SpendBundle) -> GalleryResponse:
+        path = "/singletons/submit"
+        if self._binary_supported:
+            with span("serialize.binary"):
+                body = bytes(spend_bundle)
+            response = await self.post_body(path, body, SPEND_BUNDLE_CONTENT_TYPE)
+            if response.status_code not in UNSUPPORTED_FORMAT_STATUS_CODES:
+                return response
+            self._binary_supported = False
+        with span("serialize.json"):
+            json_data = spend_bundle.to_json_dict(
+                include_legacy_keys=False, exclude_modern_keys=False
+            )
+        return await self.request("POST", path, json_data)
+
+    async def submit_offer(self, launcher_id: str, offer: Dict) -> GalleryResponse:
+        path = f"/singletons/{launcher_id}/offers/submit"
+        if self._compressed_json_supported:
+            with span("serialize.json"):
+                body = json.dumps(offer).encode("utf-8")
+            response = await self.post_body(path, body, "application/json")
+            if response.status_code not in UNSUPPORTED_FORMAT_STATUS_CODES:
+                return response
+            self._compressed_json_supported = False
+        return await self.request("POST", path, offer)
+
+    async def accept_offer(
+        self, launcher_id: str, offer_id: str, price_signature: str
+    ) -> GalleryResponse:
+        return await self.request(
+            "POST",
+            f"/singletons/{launcher_id}/offers/{offer_id}/accept",
+            {"price_signature": price_signature},
+        )
+
+    async def cancel_offer(
+        self, launcher_id: str, offer_id: str, price_signature: str
+    ) -> GalleryResponse:
+        return await self.request(
+            "DELETE",
+            f"/singletons/{launcher_id}/offers/{offer_id}",
+            {"price_signature": price_signature},
+        )
+
+    async def update_profile(
+        self, public_key: str, name: str, signature: str
+    ) -> GalleryResponse:
+        return await self.request(
+            "PATCH",
+            f"/profile/{public_key}",
+            {"signature": signature, "name": name},
+        )
@@ -0,0 +1,539 @@
+import asyncio
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Protocol, Tuple, Union
+
+import aiosqlite
+from blspy import G1Element
+
+from chia.types.blockchain_format.coin import Coin
+from chia.types.blockchain_format.program import Program
+from chia.types.blockchain_format.sized_bytes import bytes32
+from chia.types.coin_record import CoinRecord
+from chia.types.coin_spend import CoinSpend
+from chia.util.default_root import DEFAULT_ROOT_PATH
+from chia.util.ints import uint64
+from chia.wallet.lineage_proof import LineageProof
+from chia.wallet.puzzles import (
+    p2_delegated_puzzle_or_hidden_puzzle,
+    singleton_top_layer,
+)
+from ownable_singleton.drivers.ownable_singleton_driver import (
+    LauncherMetadata,
+    Owner,
+    Royalty,
+    create_buy_offer,
+    decode_launcher_solution,
+    new_owner_from_singleton_solution,
+    singleton_puzzle_hash,
+)
+from ownable_singleton.drivers.puzzle_decoder import decode_singleton_puzzle
+
+DEFAULT_INDEX_PATH = DEFAULT_ROOT_PATH / "nft_companion" / "singletons.sqlite"
+
+
+class SingletonIndexError(Exception):
+    pass
+
+
+class CoinRecordSource(Protocol):
+    """
+    The coin record lookups the index relies on.
+
+    Both the full node RPC client and the `SimClient` of the cdv simulator provide them.
+    """
+
+    async def get_coin_record_by_name(self, name: bytes32) -> Optional[CoinRecord]:
+        ...
+
+    async def get_coin_records_by_names(
+        self, names: List[bytes32], include_spent_coins: bool = True
+    ) -> List[CoinRecord]:
+        ...
+
+    async def get_coin_records_by_parent_ids(
+        self, parent_ids: List[bytes32], include_spent_coins: bool = True
+    ) -> List[CoinRecord]:
+        ...
+
+    async def get_puzzle_and_solution(
+        self, coin_id: bytes32, height: int
+    ) -> Optional[CoinSpend]:
+        ...
+
+
+class SingletonRecord:
+    def __init__(
+        self,
+        launcher_id: bytes32,
+        metadata: LauncherMetadata,
+        owner: Optional[Owner],
+        coin: Coin,
+        lineage_proof: LineageProof,
+        confirmed_height: int,
+    ):
+        self.launcher_id = launcher_id
+        self.metadata = metadata
+        # The owner is unknown if it cannot be matched with the puzzle hash of the current coin
+        self.owner = owner
+        self.coin = coin
+        self.lineage_proof = lineage_proof
+        self.confirmed_height = confirmed_height
+
+    @property
+    def version(self) -> int:
+        return self.metadata.version
+
+    @property
+    def royalty(self) -> Optional[Royalty]:
+        return self.metadata.royalty
+
+    def create_buy_offer(
+        self,
+        p2_singleton_coin: Coin,
+        p2_singleton_puzzle: Program,
+        new_owner: Owner,
+        payment_amount: uint64,
+    ) -> List[CoinSpend]:
+        if self.owner is None:
+            raise SingletonIndexError(
+                f"The owner of singleton {self.launcher_id.hex()} is unknown"
+            )
+        return create_buy_offer(
+            p2_singleton_coin,
+            p2_singleton_puzzle,
+            self.launcher_id,
+            self.lineage_proof,
+            self.coin,
+            self.owner,
+            new_owner,
+            payment_amount,
+            self.version,
+            self.royalty,
+        )
+
+
+def _matching_owner(
+    launcher_id: bytes32,
+    metadata: LauncherMetadata,
+    coin: Coin,
+    candidates: List[Owner],
+) -> Optional[Owner]:
+    for owner in candidates:
+        if (
+            singleton_puzzle_hash(
+                launcher_id, metadata.version, owner, metadata.royalty
+            )
+            == coin.puzzle_hash
+        ):
+            return owner
+    return None
+
+
+def _creator_candidates(metadata: LauncherMetadata) -> List[Owner]:
+    if metadata.creator_puzhash is not None:
+        return [Owner(metadata.creator_public_key, metadata.creator_puzhash)]
+    # Version 1 launchers omit the creator puzzle hash, but the companion always uses the
+    # standard puzzle of the creator key
+    return [
+        Owner(
+            metadata.creator_public_key,
+            p2_delegated_puzzle_or_hidden_puzzle.puzzle_for_pk(
+                metadata.creator_public_key
+            ).get_tree_hash(),
+        )
+    ]
+
+
+def _singleton_children(children: List[CoinRecord]) -> Dict[bytes32, CoinRecord]:
+    # A singleton has exactly one child with an odd amount
+    return {
+        child.coin.parent_coin_info: child
+        for child in children
+        if child.coin.amount % 2 == 1
+    }
+
+
+def _next_record(
+    record: SingletonRecord, coin_spend: CoinSpend, child: CoinRecord
+) -> SingletonRecord:
+    # The puzzle reveal tells the version and royalty the singleton has on chain, whatever
+    # its launcher claims
+    decoded = decode_singleton_puzzle(coin_spend.puzzle_reveal)
+    if (
+        decoded is None
+        or decoded.launcher_id != record.launcher_id
+        or decoded.version != record.version
+        or decoded.royalty != record.royalty
+    ):
+        raise SingletonIndexError(
+            f"Coin {coin_spend.coin.name().hex()} is not a version {record.version} "
+            f"ownable singleton of launcher {record.launcher_id.hex()}"
+        )
+    new_owner = new_owner_from_singleton_solution(
+        record.version, coin_spend.solution.to_program()
+    )
+    return SingletonRecord(
+        record.launcher_id,
+        record.metadata,
+        _matching_owner(record.launcher_id, record.metadata, child.coin, [new_owner]),
+        child.coin,
+        singleton_top_layer.lineage_proof_for_coinsol(coin_spend),
+        child.confirmed_block_index,
+    )
+
+
+async def follow_lineages(
+    source: CoinRecordSource,
+    records: List[SingletonRecord],
+    coin_records: Optional[Dict[bytes32, CoinRecord]] = None,
+) -> Tuple[List[SingletonRecord], int]:
+    """
+    Follows the lineage of each singleton from its recorded coin to its unspent coin.
+
+    The coins of all singletons are looked up together, one step of their lineage per
+    round trip, so the cost depends on the number of new spends rather than on their history.
+    Returns the advanced records and the number of spends that have been followed.
+    """
+    if len(records) == 0:
+        return [], 0
+    if coin_records is None:
+        coin_records = {
+            coin_record.coin.name(): coin_record
+            for coin_record in await source.get_coin_records_by_names(
+                [record.coin.name() for record in records], include_spent_coins=True
+            )
+        }
+
+    advanced: List[SingletonRecord] = []
+    pending: List[Tuple[SingletonRecord, CoinRecord]] = []
+    for record in records:
+        coin_record = coin_records.get(record.coin.name())
+        if coin_record is not None and coin_record.spent:
+            pending.append((record, coin_record))
+        else:
+            advanced.append(record)
+
+    spends = 0
+    while len(pending) > 0:
+        coin_spends, children = await asyncio.gather(
+            asyncio.gather(
+                *(
+                    source.get_puzzle_and_solution(
+                        coin_record.coin.name(), coin_record.spent_block_index
+                    )
+                    for _, coin_record in pending
+                )
+            ),
+            source.get_coin_records_by_parent_ids(
+                [coin_record.coin.name() for _, coin_record in pending],
+                include_spent_coins=True,
+            ),
+        )
+        singleton_children = _singleton_children(children)
+
+        next_pending: List[Tuple[SingletonRecord, CoinRecord]] = []
+        for (record, coin_record), coin_spend in zip(pending, coin_spends):
+            coin_id = coin_record.coin.name()
+            child = singleton_children.get(coin_id)
+            if coin_spend is None or child is None:
+                raise SingletonIndexError(
+                    f"The spend of coin {coin_id.hex()} of singleton {record.launcher_id.hex()} is unavailable"
+                )
+            record = _next_record(record, coin_spend, child)
+            spends += 1
+            if child.spent:
+                next_pending.append((record, child))
+            else:
+                advanced.append(record)
+        pending = next_pending
+
+    return advanced, spends
+
+
+class SingletonIndex:
+    """
+    A local SQLite index of ownable singletons and their current coins.
+
+    Singletons are read from launcher spends and followed along their lineage, so the
+    current owner and lineage proof of an NFT are known without asking the gallery.
+    """
+
+    def __init__(self, connection: aiosqlite.Connection):
+        self.db = connection
+
+    @staticmethod
+    async def create(path: Union[str, Path] = DEFAULT_INDEX_PATH) -> "SingletonIndex":
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        connection = await aiosqlite.connect(path)
+        index = SingletonIndex(connection)
+        try:
+            await index._create_tables()
+        except BaseException:
+            await connection.close()
+            raise
+        return index
+
+    async def _create_tables(self):
+        await self.db.execute(
+            "CREATE TABLE IF NOT EXISTS singletons("
+            "launcher_id text PRIMARY KEY,"
+            " version int,"
+            " uri text,"
+            " name text,"
+            " creator_public_key text,"
+            " creator_puzhash text,"
+            " royalty_puzhash text,"
+            " royalty_percentage int,"
+            " owner_public_key text,"
+            " owner_puzhash text,"
+            " coin blob,"
+            " lineage_proof blob,"
+            " confirmed_height bigint)"
+        )
+        await self.db.execute(
+            "CREATE INDEX IF NOT EXISTS singleton_owner on singletons(owner_public_key)"
+        )
+        await self.db.execute(
+            "CREATE INDEX IF NOT EXISTS singleton_creator on singletons(creator_public_key)"
+        )
+        await self.db.commit()
+
+    async def close(self):
+        await self.db.close()
+
+    async def add_launcher(
+        self, source: CoinRecordSource, launcher_id: bytes32
+    ) -> SingletonRecord:
+        """
+        Reads the launcher spend of a singleton and follows its lineage to the current coin.
+        """
+        launcher_record = await source.get_coin_record_by_name(launcher_id)
+        if launcher_record is None or not launcher_record.spent:
+            raise SingletonIndexError(
+                f"Launcher {launcher_id.hex()} has not been spent"
+            )
+        launcher_spend = await source.get_puzzle_and_solution(
+            launcher_id, launcher_record.spent_block_index
+        )
+        if launcher_spend is None:
+            raise SingletonIndexError(
+                f"The spend of launcher {launcher_id.hex()} is unavailable"
+            )
+        try:
+            metadata = decode_launcher_solution(launcher_spend.solution.to_program())
+        except (KeyError, ValueError) as e:
+            raise SingletonIndexError(
+                f"Launcher {launcher_id.hex()} is not an ownable singleton: {e}"
+            )
+
+        children = _singleton_children(
+            await source.get_coin_records_by_parent_ids(
+                [launcher_id], include_spent_coins=True
+            )
+        )
+        if launcher_id not in children:
+            raise SingletonIndexError(
+                f"Launcher {launcher_id.hex()} has no singleton child"
+            )
+        eve_record = children[launcher_id]
+        eve = SingletonRecord(
+            launcher_id,
+            metadata,
+            _matching_owner(
+                launcher_id, metadata, eve_record.coin, _creator_candidates(metadata)
+            ),
+            eve_record.coin,
+            singleton_top_layer.lineage_proof_for_coinsol(launcher_spend),
+            eve_record.confirmed_block_index,
+        )
+        [record], _ = await follow_lineages(
+            source, [eve], {eve_record.coin.name(): eve_record}
+        )
+        await self.save_many([record])
+        return record
+
+    async def sync(self, source: CoinRecordSource, batch_size: int = 500) -> int:
+        """
+        Moves every tracked singleton from its recorded coin to its current coin.
+
+        The recorded coin and lineage proof act as a checkpoint, so only spends since the
+        last sync are followed. Singletons are read in pages of `batch_size`, and the coins
+        of a page are looked up together. Returns the number of spends that have been followed.
+        """
+        spends = 0
+        async for records in self.iter_records(batch_size):
+            recorded_coins = {record.launcher_id: record.coin for record in records}
+            advanced, page_spends = await follow_lineages(source, records)
+            if page_spends > 0:
+                await self.save_many(
+                    [
+                        record
+                        for record in advanced
+                        if record.coin != recorded_coins[record.launcher_id]
+                    ]
+                )
+            spends += page_spends
+        return spends
+
+    async def refresh(
+        self, source: CoinRecordSource, launcher_ids: List[bytes32]
+    ) -> List[SingletonRecord]:
+        """
+        Brings the records of the given singletons up to date, and adds the singletons that
+        are not tracked yet.
+        """
+        records: List[SingletonRecord] = []
+        untracked: List[bytes32] = []
+        for launcher_id in launcher_ids:
+            record = await self.get(launcher_id)
+            if record is None:
+                untracked.append(launcher_id)
+            else:
+                records.append(record)
+
+        recorded_coins = {record.launcher_id: record.coin for record in records}
+        advanced, _ = await follow_lineages(source, records)
+        await self.save_many(
+            [
+                record
+                for record in advanced
+                if record.coin != recorded_coins[record.launcher_id]
+            ]
+        )
+        current = {record.launcher_id: record for record in advanced}
+        for launcher_id in untracked:
+            current[launcher_id] = await self.add_launcher(source, launcher_id)
+        return [current[launcher_id] for launcher_id in launcher_ids]
+
+    async def save_many(self, records: List[SingletonRecord]):
+        await self.db.executemany(
+            "INSERT OR REPLACE INTO singletons VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [_record_to_row(record) for record in records],
+        )
+        await self.db.commit()
+
+    async def iter_records(
+        self, batch_size: int = 500
+    ) -> AsyncIterator[List[SingletonRecord]]:
+        """
+        Yields all records in pages ordered by launcher ID.
+
+        Each page continues after the last launcher ID of the previous one, so pages stay
+        consistent while records are updated and only one page is held in memory.
+        """
+        last_launcher_id = ""
+        while True:
+            cursor = await self.db.execute(
+                "SELECT * from singletons WHERE launcher_id>? ORDER BY launcher_id LIMIT ?",
+                (last_launcher_id, batch_size),
+            )
+            rows = await cursor.fetchall()
+            await cursor.close()
+            if len(rows) == 0:
+                return
+            yield [_row_to_record(row) for row in rows]
+            last_launcher_id = rows[-1][0]
+
+    async def get(self, launcher_id: bytes32) -> Optional[SingletonRecord]:
+        cursor = await self.db.execute(
+            "SELECT * from singletons WHERE launcher_id=?", (launcher_id.hex(),)
+        )
+        row = await cursor.fetchone()
+        await cursor.close()
+        return _row_to_record(row) if row is not None else None
+
+    async def get_by_owner(self, public_key: G1Element) -> List[SingletonRecord]:
+        cursor = await self.db.execute(
+            "SELECT * from singletons WHERE owner_public_key=? ORDER BY launcher_id",
+            (bytes(public_key).hex(),),
+        )
+        rows = await cursor.fetchall()
+        await cursor.close()
+        return [_row_to_record(row) for row in rows]
+
+    async def get_by_creator(self, public_key: G1Element) -> List[SingletonRecord]:
+        cursor = await self.db.execute(
+            "SELECT * from singletons WHERE creator_public_key=? ORDER BY launcher_id",
+            (bytes(public_key).hex(),),
+        )
+        rows = await cursor.fetchall()
+        await cursor.close()
+        return [_row_to_record(row) for row in rows]
+
+    async def count(self) -> int:
+        cursor = await self.db.execute("SELECT COUNT(*) from singletons")
+        row = await cursor.fetchone()
+        await cursor.close()
+        return row[0]
+
+
+def _record_to_row(record: SingletonRecord) -> Tuple:
+    metadata = record.metadata
+    return (
+        record.launcher_id.hex(),
+        metadata.version,
+        metadata.uri,
+        metadata.name,
+        bytes(metadata.creator_public_key).hex(),
+        metadata.creator_puzhash.hex() if metadata.creator_puzhash else None,
+        metadata.royalty.creator_puzhash.hex() if metadata.royalty else None,
+        metadata.royalty.percentage if metadata.royalty else 0,
+        record.owner.public_key_bytes.hex() if record.owner else None,
+        record.owner.puzzle_hash.hex() if record.owner else None,
+        bytes(record.coin),
+        bytes(record.lineage_proof),
+        record.confirmed_height,
+    )
+
+
+def _row_to_record(row) -> SingletonRecord:
+    (
+        launcher_id,
+        version,
+        uri,
+        name,
+        creator_public_key,
+        creator_puzhash,
+        royalty_puzhash,
+        royalty_percentage,
+        owner_public_key,
+        owner_puzhash,
+        coin,
+        lineage_proof,
+        confirmed_height,
+    ) = row
+    metadata = LauncherMetadata(
+        version,
+        uri,
+        name,
+        G1Element.from_bytes(bytes.fromhex(creator_public_key)),
+        bytes32.fromhex(creator_puzhash) if creator_puzhash else None,
+        Royalty(bytes32.fromhex(royalty_puzhash), royalty_percentage)
+        if royalty_puzhash
+        else None,
+    )
+    owner = (
+        Owner(bytes.fromhex(owner_public_key), bytes32.fromhex(owner_puzhash))
+        if owner_public_key
+        else None
+    )
+    return SingletonRecord(
+        bytes32.fromhex(launcher_id),
+        metadata,
+        owner,
+        Coin.from_bytes(coin),
+        LineageProof.from_bytes(lineage_proof),
+        confirmed_height,
+    )
+
+
+@asynccontextmanager
+async def open_singleton_index(
+    path: Union[str, Path] = DEFAULT_INDEX_PATH
+) -> AsyncIterator[SingletonIndex]:
+    index = await SingletonIndex.create(path)
+    try:
+        yield index
+    finally:
+        await index.close()
@@ -0,0 +1,387 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Union
+
+import aiosqlite
+
+from chia.types.blockchain_format.sized_bytes import bytes32
+from chia.types.coin_record import CoinRecord
+from chia.types.spend_bundle import SpendBundle
+from chia.util.default_root import DEFAULT_ROOT_PATH
+from ownable_singleton.index import CoinRecordSource
+from ownable_singleton.reservations import CoinReservations
+
+DEFAULT_JOURNAL_PATH = DEFAULT_ROOT_PATH / "nft_companion" / "submissions.sqlite"
+
+# Spend bundles submitted to the gallery as new singletons, resubmitted to the gallery
+SINGLETON_SUBMISSION = "singleton"
+# Payments of offers submitted to the gallery. They are only tracked, since submitting an
+# offer again would list it twice.
+OFFER_SUBMISSION = "offer"
+# Spend bundles pushed to the full node, resubmitted to the full node
+TRANSACTION_SUBMISSION = "transaction"
+
+PENDING = "pending"
+# All coins created by the spend bundle exist
+CONFIRMED = "confirmed"
+# A coin spent by the spend bundle has been spent differently, so it can never be confirmed
+CONFLICTED = "conflicted"
+# The spend bundle has not been confirmed after the maximum number of attempts
+ABANDONED = "abandoned"
+
+# The seconds until a submission is sent again for the first time, doubled for every attempt
+DEFAULT_BACKOFF = 30
+
+
+class Submission:
+    def __init__(
+        self,
+        name: bytes32,
+        kind: str,
+        spend_bundle: SpendBundle,
+        label: str,
+        status: str = PENDING,
+        attempts: int = 1,
+        submitted_at: float = 0,
+        next_attempt_at: float = 0,
+        confirmed_height: Optional[int] = None,
+    ):
+        # The name of the spend bundle
+        self.name = name
+        self.kind = kind
+        self.spend_bundle = spend_bundle
+        self.label = label
+        self.status = status
+        self.attempts = attempts
+        self.submitted_at = submitted_at
+        self.next_attempt_at = next_attempt_at
+        self.confirmed_height = confirmed_height
+
+    @property
+    def created_coin_ids(self) -> List[bytes32]:
+        # Coins that are created and spent within the bundle never show up on their own
+        removals = {coin.name() for coin in self.spend_bundle.removals()}
+        return [
+            coin.name()
+            for coin in self.spend_bundle.additions()
+            if coin.name() not in removals
+        ]
+
+    @property
+    def spent_coin_ids(self) -> List[bytes32]:
+        additions = {coin.name() for coin in self.spend_bundle.additions()}
+        return [
+            coin.name()
+            for coin in self.spend_bundle.removals()
+            if coin.name() not in additions
+        ]
+
+
+class SubmissionJournal:
+    """
+    A local SQLite journal of submitted spend bundles, keyed by spend bundle name.
+
+    Recording the same spend bundle again keeps the existing entry, so a submission that is
+    retried is tracked once.
+    """
+
+    def __init__(self, connection: aiosqlite.Connection):
+        self.db = connection
+
+    @staticmethod
+    async def create(
+        path: Union[str, Path] = DEFAULT_JOURNAL_PATH
+    ) -> "SubmissionJournal":
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        connection = await aiosqlite.connect(path)
+        journal = SubmissionJournal(connection)
+        try:
+            await journal._create_tables()
+        except BaseException:
+            await connection.close()
+            raise
+        return journal
+
+    async def _create_tables(self):
+        await self.db.execute(
+            "CREATE TABLE IF NOT EXISTS submissions("
+            "name text PRIMARY KEY,"
+            " kind text,"
+            " spend_bundle blob,"
+            " label text,"
+            " status text,"
+            " attempts int,"
+            " submitted_at real,"
+            " next_attempt_at real,"
+            " confirmed_height bigint)"
+        )
+        await self.db.execute(
+            "CREATE INDEX IF NOT EXISTS submission_status on submissions(status)"
+        )
+        await self.db.commit()
+
+    async def close(self):
+        await self.db.close()
+
+    async def record(
+        self,
+        kind: str,
+        spend_bundle: SpendBundle,
+        label: str,
+        backoff: float = DEFAULT_BACKOFF,
+    ) -> Submission:
+        now = time.time()
+        submission = Submission(
+            spend_bundle.name(),
+            kind,
+            spend_bundle,
+            label,
+            submitted_at=now,
+            next_attempt_at=now + backoff,
+        )
+        await self.db.execute(
+            "INSERT OR IGNORE INTO submissions VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            _submission_to_row(submission),
+        )
+        await self.db.commit()
+        return await self.get(submission.name)
+
+    async def save_many(self, submissions: List[Submission]):
+        await self.db.executemany(
+            "INSERT OR REPLACE INTO submissions VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [_submission_to_row(submission) for submission in submissions],
+        )
+        await self.db.commit()
+
+    async def get(self, name: bytes32) -> Optional[Submission]:
+        cursor = await self.db.execute(
+            "SELECT * from submissions WHERE name=?", (name.hex(),)
+        )
+        row = await cursor.fetchone()
+        await cursor.close()
+        return _row_to_submission(row) if row is not None else None
+
+    async def get_by_status(self, status: str) -> List[Submission]:
+        cursor = await self.db.execute(
+            "SELECT * from submissions WHERE status=? ORDER BY submitted_at", (status,)
+        )
+        rows = await cursor.fetchall()
+        await cursor.close()
+        return [_row_to_submission(row) for row in rows]
+
+
+def _submission_to_row(submission: Submission):
+    return (
+        submission.name.hex(),
+        submission.kind,
+        bytes(submission.spend_bundle),
+        submission.label,
+        submission.status,
+        submission.attempts,
+        submission.submitted_at,
+        submission.next_attempt_at,
+        submission.confirmed_height,
+    )
+
+
+def _row_to_submission(row) -> Submission:
+    (
+        name,
+        kind,
+        spend_bundle,
+        label,
+        status,
+        attempts,
+        submitted_at,
+        next_attempt_at,
+        confirmed_height,
+    ) = row
+    return Submission(
+        bytes32.fromhex(name),
+        kind,
+        SpendBundle.from_bytes(spend_bundle),
+        label,
+        status,
+        attempts,
+        submitted_at,
+        next_attempt_at,
+        confirmed_height,
+    )
+
+
+@asynccontextmanager
+async def open_submission_journal(
+    path: Union[str, Path] = DEFAULT_JOURNAL_PATH
+) -> AsyncIterator[SubmissionJournal]:
+    journal = await SubmissionJournal.create(path)
+    try:
+        yield journal
+    finally:
+        await journal.close()
+
+
+# Sends a submission again, returns an error message if it has been rejected
+Resubmit = Callable[[Submission], Awaitable[Optional[str]]]
+
+
+class SubmissionPoller:
+    """
+    Checks the pending submissions of a journal against the coin store and resubmits the
+    ones that have not been confirmed yet.
+
+    The coins of all pending submissions are looked up together in batches of `batch_size`.
+    A submission is only sent again while all coins it spends exist and are unspent, since
+    the identical spend bundle can then only be confirmed once. Attempts back off
+    exponentially from `backoff` up to `max_backoff` seconds, and a submission is abandoned
+    after `max_attempts`. Attempts of submissions whose kind has no `resubmit` function are
+    counted without sending. While a coin a submission spends does not exist yet, it is
+    neither sent nor are its attempts counted, so it is not abandoned before it could be sent.
+
+    The coins that `reservations` holds for a submission are released once it is no longer
+    pending.
+    """
+
+    def __init__(
+        self,
+        journal: SubmissionJournal,
+        source: CoinRecordSource,
+        resubmit: Dict[str, Resubmit],
+        batch_size: int = 500,
+        concurrency: int = 8,
+        backoff: float = DEFAULT_BACKOFF,
+        max_backoff: float = 600,
+        max_attempts: int = 10,
+        reservations: Optional[CoinReservations] = None,
+    ):
+        self.journal = journal
+        self.source = source
+        self.resubmit = resubmit
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        self.reservations = reservations
+
+    async def _coin_records(self, coin_ids: List[bytes32]) -> Dict[bytes32, CoinRecord]:
+        batches = await asyncio.gather(
+            *(
+                self.source.get_coin_records_by_names(
+                    coin_ids[start : start + self.batch_size], include_spent_coins=True
+                )
+                for start in range(0, len(coin_ids), self.batch_size)
+            )
+        )
+        return {
+            coin_record.coin.name(): coin_record
+            for coin_records in batches
+            for coin_record in coin_records
+        }
+
+    def _next_attempt_at(self, attempts: int, now: float) -> float:
+        return now + min(self.max_backoff, self.backoff * 2 ** (attempts - 1))
+
+    async def _attempt(
+        self,
+        submission: Submission,
+        send: bool,
+        semaphore: asyncio.Semaphore,
+        on_error: Callable[[Submission, str], None],
+    ):
+        resubmit = self.resubmit.get(submission.kind)
+        error: Optional[str] = None
+        if send and resubmit is not None:
+            async with semaphore:
+                try:
+                    error = await resubmit(submission)
+                except Exception as e:
+                    error = str(e) or type(e).__name__
+        if send:
+            submission.attempts += 1
+        submission.next_attempt_at = self._next_attempt_at(
+            submission.attempts, time.time()
+        )
+        if error is not None:
+            on_error(submission, error)
+
+    async def poll_once(
+        self,
+        on_error: Callable[[Submission, str], None] = lambda submission, error: None,
+    ) -> List[Submission]:
+        """
+        Updates the status of every pending submission and resubmits the ones that are due.
+        Returns the submissions that are no longer pending.
+        """
+        pending = await self.journal.get_by_status(PENDING)
+        if len(pending) == 0:
+            return []
+        coin_records = await self._coin_records(
+            list(
+                {
+                    coin_id
+                    for submission in pending
+                    for coin_id in submission.created_coin_ids
+                    + submission.spent_coin_ids
+                }
+            )
+        )
+
+        now = time.time()
+        finished: List[Submission] = []
+        due: Dict[bytes32, bool] = {}
+        for submission in pending:
+            created = [
+                coin_records.get(coin_id) for coin_id in submission.created_coin_ids
+            ]
+            spent = [coin_records.get(coin_id) for coin_id in submission.spent_coin_ids]
+            if all(coin_record is not None for coin_record in created):
+                submission.status = CONFIRMED
+                submission.confirmed_height = max(
+                    (coin_record.confirmed_block_index for coin_record in created),
+                    default=None,
+                )
+            elif any(
+                coin_record is not None and coin_record.spent for coin_record in spent
+            ):
+                submission.status = CONFLICTED
+            elif submission.attempts >= self.max_attempts:
+                submission.status = ABANDONED
+            elif submission.next_attempt_at <= now:
+                due[submission.name] = all(
+                    coin_record is not None for coin_record in spent
+                )
+            if submission.status != PENDING:
+                finished.append(submission)
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        attempted = [submission for submission in pending if submission.name in due]
+        await asyncio.gather(
+            *(
+                self._attempt(submission, due[submission.name], semaphore, on_error)
+                for submission in attempted
+            )
+        )
+        await self.journal.save_many(finished + attempted)
+        if self.reservations is not None and len(finished) > 0:
+            await self.reservations.release(
+                [submission.name.hex() for submission in finished]
+            )
+        return finished
+
+    async def run(
+        self,
+        interval: float,
+        on_finished: Callable[[Submission], None],
+        on_error: Callable[[Submission, str], None] = lambda submission, error: None,
+    ):
+        """
+        Polls until no submission is pending anymore.
+        """
+        while True:
+            for submission in await self.poll_once(on_error):
+                on_finished(submission)
+            if len(await self.journal.get_by_status(PENDING)) == 0:
+                return
+            await asyncio.sleep(interval)
@@ -0,0 +1,119 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from blspy import G1Element, PrivateKey
+
+from chia.types.blockchain_format.sized_bytes import bytes32
+from chia.util.ints import uint32
+from chia.wallet.derive_keys import (
+    master_sk_to_singleton_owner_sk,
+    master_sk_to_wallet_sk,
+)
+from chia.wallet.puzzles import p2_delegated_puzzle_or_hidden_puzzle
+
+# Below this number of derivation indices, starting worker processes costs more than it saves
+PROCESS_POOL_THRESHOLD = 64
+
+SINGLETON_OWNER_KEY = "singleton"
+WALLET_KEY = "wallet"
+
+
+class DerivedKey:
+    def __init__(
+        self, kind: str, index: int, secret_key: PrivateKey, puzzle_hash: bytes32
+    ):
+        self.kind = kind
+        self.index = index
+        self.secret_key = secret_key
+        self.public_key: G1Element = secret_key.get_g1()
+        # The standard puzzle hash of the public key
+        self.puzzle_hash = puzzle_hash
+
+
+def _derive_keys(
+    master_sk_bytes: bytes, indices: List[int]
+) -> List[Tuple[str, int, bytes, bytes32]]:
+    master_sk = PrivateKey.from_bytes(master_sk_bytes)
+    keys = []
+    for index in indices:
+        for kind, derive in (
+            (SINGLETON_OWNER_KEY, master_sk_to_singleton_owner_sk),
+            (WALLET_KEY, master_sk_to_wallet_sk),
+        ):
+            secret_key = derive(master_sk, uint32(index))
+            puzzle_hash = p2_delegated_puzzle_or_hidden_puzzle.puzzle_for_pk(
+                secret_key.get_g1()
+            ).get_tree_hash()
+            keys.append((kind, index, bytes(secret_key), puzzle_hash))
+    return keys
+
+
+class KeyTable:
+    """
+    The singleton owner and wallet keys of a range of derivation indices, looked up by
+    public key or by standard puzzle hash.
+    """
+
+    def __init__(self, keys: Iterable[DerivedKey]):
+        self.by_public_key: Dict[bytes, DerivedKey] = {}
+        self.by_puzzle_hash: Dict[bytes32, DerivedKey] = {}
+        self.by_index: Dict[Tuple[str, int], DerivedKey] = {}
+        for key in keys:
+            self.by_public_key[bytes(key.public_key)] = key
+            self.by_puzzle_hash[key.puzzle_hash] = key
+            self.by_index[(key.kind, key.index)] = key
+
+    def __len__(self) -> int:
+        return len(self.by_public_key)
+
+    def find_by_public_key(
+        self, public_key: Union[G1Element, bytes, str]
+    ) -> Optional[DerivedKey]:
+        if isinstance(public_key, str):
+            public_key = bytes.fromhex(public_key)
+        return self.by_public_key.get(bytes(public_key))
+
+    def find_by_puzzle_hash(self, puzzle_hash: bytes32) -> Optional[DerivedKey]:
+        return self.by_puzzle_hash.get(puzzle_hash)
+
+    def find_by_index(self, kind: str, index: int) -> Optional[DerivedKey]:
+        return self.by_index.get((kind, index))
+
+    @staticmethod
+    def scan(
+        master_sk: PrivateKey,
+        indices: Iterable[int],
+        max_workers: Optional[int] = None,
+    ) -> "KeyTable":
+        """
+        Derives the singleton owner and wallet keys of every index.
+
+        Computing the standard puzzle hashes dominates the scan, so large ranges are split
+        across a process pool.
+        """
+        indices = list(indices)
+        master_sk_bytes = bytes(master_sk)
+        if len(indices) < PROCESS_POOL_THRESHOLD or max_workers == 1:
+            derived = _derive_keys(master_sk_bytes, indices)
+        else:
+            workers = max_workers or os.cpu_count() or 1
+            chunk_size = max(1, len(indices) // (workers * 4))
+            chunks = [
+                indices[start : start + chunk_size]
+                for start in range(0, len(indices), chunk_size)
+            ]
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                derived = [
+                    key
+                    for keys in executor.map(
+                        _derive_keys, repeat(master_sk_bytes), chunks
+                    )
+                    for key in keys
+                ]
+
+        return KeyTable(
+            DerivedKey(kind, index, PrivateKey.from_bytes(secret_key), puzzle_hash)
+            for kind, index, secret_key, puzzle_hash in derived
+        )
@@ -0,0 +1,84 @@
+import csv
+import json
+from pathlib import Path
+from typing import Iterator, Optional
+
+from chia.types.blockchain_format.sized_bytes import bytes32
+
+
+class ManifestEntry:
+    def __init__(
+        self,
+        name: str,
+        uri: str,
+        royalty_percentage: int = 0,
+        file: Optional[Path] = None,
+    ):
+        self.name = name
+        self.uri = uri
+        self.royalty_percentage = royalty_percentage
+        # A local copy of the media at the uri, which is hashed instead of downloading it
+        self.file = file
+        # The sha256 of the media, set once it has been hashed
+        self.content_hash: Optional[bytes32] = None
+
+
+class ManifestError(ValueError):
+    pass
+
+
+def _entry_from_row(row: dict, line: int, directory: Path) -> ManifestEntry:
+    if not isinstance(row, dict):
+        raise ManifestError(f"Line {line}: expected an object")
+    try:
+        name = row["name"]
+        uri = row["uri"]
+    except KeyError as e:
+        raise ManifestError(f"Line {line}: missing column {e}")
+    if not isinstance(name, str) or not isinstance(uri, str):
+        raise ManifestError(f"Line {line}: name and uri must be strings")
+    if not name or not uri:
+        raise ManifestError(f"Line {line}: name and uri must not be empty")
+
+    royalty = row.get("royalty") or 0
+    # JSON numbers like 2.5 or true must not be truncated to a whole percentage
+    if isinstance(royalty, bool) or not isinstance(royalty, (int, str)):
+        raise ManifestError(f"Line {line}: invalid royalty '{royalty}'")
+    try:
+        royalty_percentage = int(royalty)
+    except ValueError:
+        raise ManifestError(f"Line {line}: invalid royalty '{royalty}'")
+    if royalty_percentage > 99 or royalty_percentage < 0:
+        raise ManifestError(f"Line {line}: royalty has to be between 0 and 99")
+
+    # Relative paths are relative to the manifest
+    file = row.get("file")
+    if file is not None and not isinstance(file, str):
+        raise ManifestError(f"Line {line}: file must be a string")
+    return ManifestEntry(
+        name, uri, royalty_percentage, directory / file if file else None
+    )
+
+
+def read_manifest(path: Path) -> Iterator[ManifestEntry]:
+    """
+    Reads the entries of a collection manifest.
+
+    CSV manifests need a header with the columns `name`, `uri` and optionally `royalty` and
+    `file`. JSONL manifests contain one object with the same keys per line.
+    """
+    path = Path(path)
+    with open(path, "rt", newline="") as fh:
+        if path.suffix.lower() == ".csv":
+            # The header is line 1, so the first entry is on line 2
+            for line, row in enumerate(csv.DictReader(fh), start=2):
+                yield _entry_from_row(row, line, path.parent)
+        else:
+            for line, raw in enumerate(fh, start=1):
+                if not raw.strip():
+                    continue
+                try:
+                    row = json.loads(raw)
+                except json.JSONDecodeError as e:
+                    raise ManifestError(f"Line {line}: {e}")
+                yield _entry_from_row(row, line, path.parent)
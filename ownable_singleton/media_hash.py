@@ -0,0 +1,193 @@
+import asyncio
+import hashlib
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
+
+import aiohttp
+import aiosqlite
+
+from chia.types.blockchain_format.sized_bytes import bytes32
+from chia.util.default_root import DEFAULT_ROOT_PATH
+from ownable_singleton.tracing import span
+
+DEFAULT_HASH_CACHE_PATH = DEFAULT_ROOT_PATH / "nft_companion" / "media_hashes.sqlite"
+
+# The bytes hashed per update, which bounds the memory a file or download needs
+HASH_CHUNK_SIZE = 1024 * 1024
+# Below this number of files, starting worker processes costs more than it saves
+PROCESS_POOL_THRESHOLD = 4
+
+
+class MediaHashError(Exception):
+    pass
+
+
+def hash_file(path: Union[str, Path]) -> bytes32:
+    """
+    The sha256 of a file, read through a memory map in chunks of `HASH_CHUNK_SIZE`.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        # Empty files cannot be mapped
+        if size > 0:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                with memoryview(mapped) as view:
+                    for offset in range(0, size, HASH_CHUNK_SIZE):
+                        digest.update(view[offset : offset + HASH_CHUNK_SIZE])
+    return bytes32(digest.digest())
+
+
+class MediaHashCache:
+    """
+    A local SQLite cache of file hashes, keyed by path, modification time and size, so
+    unchanged files are only hashed once.
+    """
+
+    def __init__(self, connection: aiosqlite.Connection):
+        self.db = connection
+
+    @staticmethod
+    async def create(
+        path: Union[str, Path] = DEFAULT_HASH_CACHE_PATH
+    ) -> "MediaHashCache":
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        connection = await aiosqlite.connect(path)
+        cache = MediaHashCache(connection)
+        try:
+            await cache._create_tables()
+        except BaseException:
+            await connection.close()
+            raise
+        return cache
+
+    async def _create_tables(self):
+        await self.db.execute(
+            "CREATE TABLE IF NOT EXISTS media_hashes("
+            "path text PRIMARY KEY,"
+            " mtime_ns bigint,"
+            " size bigint,"
+            " hash text)"
+        )
+        await self.db.commit()
+
+    async def close(self):
+        await self.db.close()
+
+    async def get(self, path: str, mtime_ns: int, size: int) -> Optional[bytes32]:
+        cursor = await self.db.execute(
+            "SELECT hash from media_hashes WHERE path=? AND mtime_ns=? AND size=?",
+            (path, mtime_ns, size),
+        )
+        row = await cursor.fetchone()
+        await cursor.close()
+        return bytes32.fromhex(row[0]) if row is not None else None
+
+    async def save_many(self, entries: List[Tuple[str, int, int, bytes32]]):
+        await self.db.executemany(
+            "INSERT OR REPLACE INTO media_hashes VALUES(?, ?, ?, ?)",
+            [
+                (path, mtime_ns, size, content_hash.hex())
+                for path, mtime_ns, size, content_hash in entries
+            ],
+        )
+        await self.db.commit()
+
+
+@asynccontextmanager
+async def open_media_hash_cache(
+    path: Union[str, Path] = DEFAULT_HASH_CACHE_PATH
+) -> AsyncIterator[MediaHashCache]:
+    cache = await MediaHashCache.create(path)
+    try:
+        yield cache
+    finally:
+        await cache.close()
+
+
+async def hash_files(
+    paths: List[Path], cache: MediaHashCache, max_workers: Optional[int] = None
+) -> Dict[Path, bytes32]:
+    """
+    Hashes local files, skipping the files whose path, modification time and size are in
+    `cache`. Several files are hashed in parallel across a process pool.
+    """
+    hashes: Dict[Path, bytes32] = {}
+    misses: Dict[Path, Tuple[str, int, int]] = {}
+    for path in dict.fromkeys(paths):
+        try:
+            stat = path.stat()
+        except OSError as e:
+            raise MediaHashError(f"Cannot read {path}: {e.strerror}")
+        key = (str(path.resolve()), stat.st_mtime_ns, stat.st_size)
+        cached = await cache.get(*key)
+        if cached is not None:
+            hashes[path] = cached
+        else:
+            misses[path] = key
+    if len(misses) == 0:
+        return hashes
+
+    with span("media.hash_files", files=len(misses)):
+        if len(misses) < PROCESS_POOL_THRESHOLD or max_workers == 1:
+            computed = [hash_file(path) for path in misses]
+        else:
+            loop = asyncio.get_event_loop()
+            with ProcessPoolExecutor(
+                max_workers=max_workers or os.cpu_count() or 1
+            ) as executor:
+                computed = await asyncio.gather(
+                    *(
+                        loop.run_in_executor(executor, hash_file, path)
+                        for path in misses
+                    )
+                )
+    for path, content_hash in zip(misses, computed):
+        hashes[path] = content_hash
+    await cache.save_many(
+        [(*key, content_hash) for key, content_hash in zip(misses.values(), computed)]
+    )
+    return hashes
+
+
+async def hash_uri(session: aiohttp.ClientSession, uri: str) -> bytes32:
+    """
+    The sha256 of the content at an HTTP(S) URI, hashed while it is downloaded.
+    """
+    digest = hashlib.sha256()
+    with span("media.download"):
+        async with session.get(uri) as response:
+            if response.status != 200:
+                raise MediaHashError(
+                    f"Cannot download {uri}: HTTP status {response.status}"
+                )
+            async for chunk in response.content.iter_chunked(HASH_CHUNK_SIZE):
+                digest.update(chunk)
+    return bytes32(digest.digest())
+
+
+async def hash_uris(
+    uris: List[str], concurrency: int = 8, timeout: float = 300
+) -> Dict[str, bytes32]:
+    """
+    Downloads and hashes remote media, with at most `concurrency` downloads at a time.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def hash_with_limit(session: aiohttp.ClientSession, uri: str) -> bytes32:
+        async with semaphore:
+            try:
+                return await hash_uri(session, uri)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                raise MediaHashError(f"Cannot download {uri}: {e}")
+
+    uris = list(dict.fromkeys(uris))
+    async with aiohttp.ClientSession(
+        timeout=aiohttp.ClientTimeout(total=timeout)
+    ) as session:
+        hashes = await asyncio.gather(*(hash_with_limit(session, uri) for uri in uris))
+    return dict(zip(uris, hashes))
@@ -0,0 +1,83 @@
+from typing import List, Sequence, Tuple
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Above 100%, the seller share is negative and the singleton cannot be sold
+MAX_ROYALTY_PERCENTAGE = 100
+# Batches whose products of price and percentage fit into int64 are computed with NumPy
+_INT64_LIMIT = 2**63
+
+
+def make_even(amount: int) -> int:
+    return amount - 1 if amount % 2 else amount
+
+
+def quote_payout(price: int, royalty_percentage: int) -> Tuple[int, int]:
+    """
+    Computes the mojos the seller and the creator receive when a singleton is sold for
+    `price`, exactly like the v2 puzzle splits the payment.
+
+    The creator share is rounded down and both shares are made even, so up to two mojos of a
+    sale are not paid out. A percentage of 0 means the singleton has no royalty, and then the
+    seller receives the whole price.
+    """
+    _check_quote(price, royalty_percentage)
+    if royalty_percentage == 0:
+        return price, 0
+    creator_amount = price * royalty_percentage // 100
+    return make_even(price - creator_amount), make_even(creator_amount)
+
+
+def quote_payouts(
+    prices: Sequence[int], royalty_percentages: Sequence[int]
+) -> Tuple[List[int], List[int]]:
+    """
+    Computes `quote_payout` for every pair of price and royalty percentage.
+
+    With NumPy installed, batches are computed as array operations. Prices so large that the
+    intermediate products would overflow int64 are computed with Python integers instead.
+    """
+    if len(prices) != len(royalty_percentages):
+        raise ValueError("Every price needs a royalty percentage")
+    if len(prices) == 0:
+        return [], []
+    if numpy is not None:
+        price_array = numpy.asarray(prices, dtype=object)
+        percentage_array = numpy.asarray(royalty_percentages, dtype=object)
+        if (
+            price_array.min() >= 0
+            and price_array.max() * MAX_ROYALTY_PERCENTAGE < _INT64_LIMIT
+            and percentage_array.min() >= 0
+            and percentage_array.max() <= MAX_ROYALTY_PERCENTAGE
+        ):
+            return _quote_payouts_numpy(
+                price_array.astype(numpy.int64), percentage_array.astype(numpy.int64)
+            )
+
+    seller_amounts: List[int] = []
+    creator_amounts: List[int] = []
+    for price, royalty_percentage in zip(prices, royalty_percentages):
+        seller_amount, creator_amount = quote_payout(price, royalty_percentage)
+        seller_amounts.append(seller_amount)
+        creator_amounts.append(creator_amount)
+    return seller_amounts, creator_amounts
+
+
+def _quote_payouts_numpy(prices, royalty_percentages) -> Tuple[List[int], List[int]]:
+    creator_amounts = prices * royalty_percentages // 100
+    seller_amounts = prices - creator_amounts
+    seller_amounts -= seller_amounts % 2
+    creator_amounts -= creator_amounts % 2
+    without_royalty = royalty_percentages == 0
+    seller_amounts[without_royalty] = prices[without_royalty]
+    return seller_amounts.tolist(), creator_amounts.tolist()
+
+
+def _check_quote(price: int, royalty_percentage: int):
+    if price < 0:
+        raise ValueError(f"Invalid price: {price}")
+    if not 0 <= royalty_percentage <= MAX_ROYALTY_PERCENTAGE:
+        raise ValueError(f"Invalid royalty percentage: {royalty_percentage}")
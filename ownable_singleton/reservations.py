@@ -0,0 +1,216 @@
+import asyncio
+import time
+import uuid
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterable, List, Union
+
+import aiosqlite
+
+from chia.types.blockchain_format.coin import Coin
+from chia.types.blockchain_format.sized_bytes import bytes32
+from chia.util.default_root import DEFAULT_ROOT_PATH
+
+DEFAULT_RESERVATIONS_PATH = DEFAULT_ROOT_PATH / "nft_companion" / "reservations.sqlite"
+
+# The seconds a job may take from selecting coins until it submits the spend bundle
+DEFAULT_RESERVATION_TIMEOUT = 10 * 60
+# The seconds the coins of a submitted spend bundle stay reserved, unless it is confirmed
+# or conflicted before
+SUBMITTED_RESERVATION_TIMEOUT = 24 * 60 * 60
+
+# The seconds a process waits for another process to finish its reservation
+_LOCK_TIMEOUT = 30
+
+
+class CoinReservationError(Exception):
+    pass
+
+
+def new_holder() -> str:
+    """
+    A unique name for a job reserving coins.
+    """
+    return uuid.uuid4().hex
+
+
+class CoinReservations:
+    """
+    A local SQLite store of the coins that jobs have selected for their spend bundles, so
+    concurrent jobs never spend the same coin.
+
+    Every reservation belongs to a holder. A job reserves coins under its own holder name
+    and hands them over to the name of its spend bundle once it has been submitted. Reserving
+    runs in an immediate transaction, which locks the store for other processes, and in a
+    lock for the tasks of this process. Expired reservations are dropped on every change.
+    """
+
+    def __init__(self, connection: aiosqlite.Connection):
+        self.db = connection
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    async def create(
+        path: Union[str, Path] = DEFAULT_RESERVATIONS_PATH
+    ) -> "CoinReservations":
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # Transactions are started explicitly, so they can take the write lock up front
+        connection = await aiosqlite.connect(
+            path, timeout=_LOCK_TIMEOUT, isolation_level=None
+        )
+        reservations = CoinReservations(connection)
+        try:
+            await reservations._create_tables()
+        except BaseException:
+            await connection.close()
+            raise
+        return reservations
+
+    async def _create_tables(self):
+        await self.db.execute(
+            "CREATE TABLE IF NOT EXISTS reservations("
+            "coin_id text PRIMARY KEY,"
+            " holder text,"
+            " expires_at real)"
+        )
+        await self.db.execute(
+            "CREATE INDEX IF NOT EXISTS reservation_holder on reservations(holder)"
+        )
+
+    async def close(self):
+        await self.db.close()
+
+    @asynccontextmanager
+    async def _transaction(self) -> AsyncIterator[float]:
+        async with self._lock:
+            await self.db.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                await self.db.execute(
+                    "DELETE FROM reservations WHERE expires_at<=?", (now,)
+                )
+                yield now
+            except BaseException:
+                await self.db.execute("ROLLBACK")
+                raise
+            await self.db.execute("COMMIT")
+
+    async def _holders(self, coin_ids: List[bytes32]) -> Dict[bytes32, str]:
+        holders: Dict[bytes32, str] = {}
+        # SQLite limits the number of parameters of a statement
+        for start in range(0, len(coin_ids), 500):
+            chunk = coin_ids[start : start + 500]
+            cursor = await self.db.execute(
+                f"SELECT coin_id, holder from reservations WHERE coin_id in ({','.join('?' * len(chunk))})",
+                [coin_id.hex() for coin_id in chunk],
+            )
+            for coin_id, holder in await cursor.fetchall():
+                holders[bytes32.fromhex(coin_id)] = holder
+            await cursor.close()
+        return holders
+
+    async def reserve(
+        self,
+        candidates: Iterable[Coin],
+        amount: int,
+        holder: str,
+        timeout: float = DEFAULT_RESERVATION_TIMEOUT,
+    ) -> List[Coin]:
+        """
+        Reserves coins of `candidates` worth at least `amount` that no other holder has
+        reserved: the smallest coin that covers the amount, otherwise the largest coins until
+        they cover it. This leaves the large coins to concurrent jobs where possible.
+        """
+        candidates = {coin.name(): coin for coin in candidates}
+        async with self._transaction() as now:
+            holders = await self._holders(list(candidates.keys()))
+            available = sorted(
+                (
+                    coin
+                    for coin_id, coin in candidates.items()
+                    if holders.get(coin_id, holder) == holder
+                ),
+                key=lambda coin: coin.amount,
+                reverse=True,
+            )
+            covering = [coin for coin in available if coin.amount >= amount]
+            selected: List[Coin] = covering[-1:]
+            total = sum(coin.amount for coin in selected)
+            for coin in available:
+                if total >= amount:
+                    break
+                selected.append(coin)
+                total += coin.amount
+            if total < amount:
+                raise CoinReservationError(
+                    f"The unreserved coins are not worth {amount} mojos"
+                )
+            await self._insert(
+                [coin.name() for coin in selected], holder, now + timeout
+            )
+        return selected
+
+    async def reserve_exactly(
+        self,
+        coin_ids: List[bytes32],
+        holder: str,
+        timeout: float = DEFAULT_RESERVATION_TIMEOUT,
+    ):
+        """
+        Reserves exactly `coin_ids` for `holder`, for example the coins a wallet transaction
+        has actually spent, and releases any other coin of `holder`. Fails if another holder
+        has reserved one of them.
+        """
+        async with self._transaction() as now:
+            holders = await self._holders(coin_ids)
+            taken = [
+                coin_id.hex()
+                for coin_id, other_holder in holders.items()
+                if other_holder != holder
+            ]
+            if len(taken) > 0:
+                raise CoinReservationError(
+                    f"The coins {', '.join(taken)} have been reserved by another job"
+                )
+            await self.db.execute("DELETE FROM reservations WHERE holder=?", (holder,))
+            await self._insert(coin_ids, holder, now + timeout)
+
+    async def hand_over(
+        self,
+        holder: str,
+        new_holder: str,
+        timeout: float = SUBMITTED_RESERVATION_TIMEOUT,
+    ):
+        async with self._transaction() as now:
+            await self.db.execute(
+                "UPDATE reservations SET holder=?, expires_at=? WHERE holder=?",
+                (new_holder, now + timeout, holder),
+            )
+
+    async def release(self, holders: List[str]):
+        async with self._transaction():
+            await self.db.executemany(
+                "DELETE FROM reservations WHERE holder=?",
+                [(holder,) for holder in holders],
+            )
+
+    async def get_holders(self, coin_ids: List[bytes32]) -> Dict[bytes32, str]:
+        async with self._transaction():
+            return await self._holders(coin_ids)
+
+    async def _insert(self, coin_ids: List[bytes32], holder: str, expires_at: float):
+        await self.db.executemany(
+            "INSERT OR REPLACE INTO reservations VALUES(?, ?, ?)",
+            [(coin_id.hex(), holder, expires_at) for coin_id in coin_ids],
+        )
+
+
+@asynccontextmanager
+async def open_coin_reservations(
+    path: Union[str, Path] = DEFAULT_RESERVATIONS_PATH
+) -> AsyncIterator[CoinReservations]:
+    reservations = await CoinReservations.create(path)
+    try:
+        yield reservations
+    finally:
+        await reservations.close()
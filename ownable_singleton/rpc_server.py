@@ -0,0 +1,215 @@
+import asyncio
+import hmac
+import inspect
+import ipaddress
+import json
+import os
+import secrets
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type, Union
+
+from aiohttp import web
+
+DEFAULT_RPC_HOST = "127.0.0.1"
+DEFAULT_RPC_PORT = 9258
+
+# The error codes defined by the JSON-RPC 2.0 specification
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+# Failed operations, like a rejected submission or a wallet that is not running
+OPERATION_FAILED = -32000
+
+
+class JsonRpcError(Exception):
+    def __init__(self, code: int, message: str, data: Any = None):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.data = data
+
+    def to_json_dict(self) -> Dict:
+        error = {"code": self.code, "message": self.message}
+        if self.data is not None:
+            error["data"] = self.data
+        return error
+
+
+RpcMethod = Callable[..., Awaitable[Any]]
+
+
+def is_loopback_host(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def write_auth_token(path: Union[str, Path]) -> str:
+    """
+    Generates a new bearer token and writes it to `path`, readable only by the current user.
+    """
+    token = secrets.token_urlsafe(32)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    # The mode of open only applies to new files
+    os.fchmod(fd, 0o600)
+    with os.fdopen(fd, "w") as file:
+        file.write(token)
+    return token
+
+
+class JsonRpcServer:
+    """
+    Serves coroutine functions as JSON-RPC 2.0 methods over HTTP POST.
+
+    Every request is handled in its own task, so slow methods do not hold up other requests,
+    and the requests of a batch run concurrently. Exceptions of the types in
+    `operation_errors` are reported as failed operations with their message, any other
+    exception is reported as an internal error and passed to `on_error`.
+
+    Since the methods sign with the keys of the wallet, only `application/json` requests
+    without an `Origin` header are served, so web pages cannot call them from a browser.
+    If `auth_token` is set, requests have to carry it as bearer token in their
+    `Authorization` header. Without it, the server only listens on loopback addresses.
+    """
+
+    def __init__(
+        self,
+        methods: Dict[str, RpcMethod],
+        operation_errors: Tuple[Type[Exception], ...] = (),
+        on_error: Optional[Callable[[str, Exception], None]] = None,
+        auth_token: Optional[str] = None,
+    ):
+        self.methods = dict(methods)
+        self.operation_errors = operation_errors
+        self.on_error = on_error
+        self.auth_token = auth_token
+
+    async def call(self, method_name: str, params: Any) -> Any:
+        method = self.methods.get(method_name)
+        if method is None:
+            raise JsonRpcError(METHOD_NOT_FOUND, f"Method not found: {method_name}")
+        if params is None:
+            args, kwargs = [], {}
+        elif isinstance(params, list):
+            args, kwargs = params, {}
+        elif isinstance(params, dict):
+            args, kwargs = [], params
+        else:
+            raise JsonRpcError(INVALID_PARAMS, "params has to be an array or object")
+        try:
+            inspect.signature(method).bind(*args, **kwargs)
+        except TypeError as e:
+            raise JsonRpcError(INVALID_PARAMS, str(e))
+
+        try:
+            return await method(*args, **kwargs)
+        except JsonRpcError:
+            raise
+        except self.operation_errors as e:
+            raise JsonRpcError(OPERATION_FAILED, str(e))
+        except Exception as e:
+            if self.on_error is not None:
+                self.on_error(method_name, e)
+            raise JsonRpcError(INTERNAL_ERROR, f"{type(e).__name__}: {e}")
+
+    async def dispatch(self, message: Any) -> Optional[Dict]:
+        """
+        Answers one request. Notifications, requests without an ID, are answered with None.
+        """
+        if not isinstance(message, dict) or message.get("jsonrpc") != "2.0":
+            return _error_response(
+                None, JsonRpcError(INVALID_REQUEST, "Invalid request")
+            )
+        request_id = message.get("id")
+        if not isinstance(message.get("method"), str):
+            return _error_response(
+                request_id, JsonRpcError(INVALID_REQUEST, "method has to be a string")
+            )
+        try:
+            result = await self.call(message["method"], message.get("params"))
+        except JsonRpcError as e:
+            response = _error_response(request_id, e)
+        else:
+            response = {"jsonrpc": "2.0", "result": result, "id": request_id}
+        return response if "id" in message else None
+
+    def _reject(self, request: web.Request) -> Optional[web.Response]:
+        if "Origin" in request.headers:
+            return web.Response(
+                status=403, text="Cross-origin requests are not allowed"
+            )
+        if self.auth_token is not None:
+            expected = f"Bearer {self.auth_token}".encode("utf-8")
+            authorization = request.headers.get("Authorization", "").encode("utf-8")
+            if not hmac.compare_digest(authorization, expected):
+                return web.Response(
+                    status=401,
+                    text="Missing or invalid bearer token",
+                    headers={"WWW-Authenticate": "Bearer"},
+                )
+        if request.content_type != "application/json":
+            return web.Response(
+                status=415, text="The Content-Type has to be application/json"
+            )
+        return None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        rejection = self._reject(request)
+        if rejection is not None:
+            return rejection
+        try:
+            message = json.loads(await request.text())
+        except ValueError as e:
+            return web.json_response(
+                _error_response(None, JsonRpcError(PARSE_ERROR, f"Parse error: {e}"))
+            )
+
+        if isinstance(message, list):
+            if len(message) == 0:
+                return web.json_response(
+                    _error_response(None, JsonRpcError(INVALID_REQUEST, "Empty batch"))
+                )
+            responses = [
+                response
+                for response in await asyncio.gather(*map(self.dispatch, message))
+                if response is not None
+            ]
+            return (
+                web.json_response(responses) if responses else web.Response(status=204)
+            )
+
+        response = await self.dispatch(message)
+        return web.json_response(response) if response else web.Response(status=204)
+
+    def application(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/", self.handle)
+        return app
+
+    async def serve(self, host: str = DEFAULT_RPC_HOST, port: int = DEFAULT_RPC_PORT):
+        """
+        Serves requests until the task running this is cancelled.
+        """
+        if self.auth_token is None and not is_loopback_host(host):
+            raise ValueError(
+                f"Refusing to serve on {host} without an auth token, "
+                f"use a loopback address like {DEFAULT_RPC_HOST}"
+            )
+        runner = web.AppRunner(self.application())
+        await runner.setup()
+        try:
+            await web.TCPSite(runner, host, port).start()
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+
+def _error_response(request_id: Any, error: JsonRpcError) -> Dict:
+    return {"jsonrpc": "2.0", "error": error.to_json_dict(), "id": request_id}
@@ -0,0 +1,360 @@
+import mmap
+import os
+import struct
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import chain, islice
+from pathlib import Path
+from typing import (
+    BinaryIO,
+    Deque,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from blspy import AugSchemeMPL, G1Element, G2Element, PrivateKey
+
+from chia.types.blockchain_format.sized_bytes import bytes32
+from chia.types.condition_opcodes import ConditionOpcode
+from chia.types.spend_bundle import SpendBundle
+from chia.util.condition_tools import (
+    conditions_by_opcode,
+    pkm_pairs_for_conditions_dict,
+)
+from chia.util.ints import uint32
+from chia.wallet.derive_keys import (
+    master_sk_to_singleton_owner_sk,
+    master_sk_to_wallet_sk,
+)
+from chia.wallet.puzzles import p2_delegated_puzzle_or_hidden_puzzle
+from ownable_singleton.dry_run import dry_run_spend_bundle
+from ownable_singleton.keys import SINGLETON_OWNER_KEY, WALLET_KEY
+
+# An unsigned file starts with this marker, followed by one record per spend bundle:
+#   record  = u32 length, u32 spend bundle length, spend bundle, u16 request count, requests
+#   request = 48 byte public key, 32 byte hidden puzzle hash or zeros, u8 key kind,
+#             u32 key index, u32 message length, message
+# All integers are big endian. The spend bundle carries the signatures that are known
+# already, for example of a wallet transaction, and the signatures of the requests are
+# aggregated into it.
+UNSIGNED_FILE_MARKER = b"NFTUNSG1"
+# A signatures file starts with this marker, followed by the 96 byte aggregated signature of
+# the requests of each record of the unsigned file, in the same order
+SIGNATURES_FILE_MARKER = b"NFTSIGS1"
+
+# The number of requests a worker process signs per task
+SIGNING_CHUNK_SIZE = 256
+
+_U32 = struct.Struct(">I")
+_U16 = struct.Struct(">H")
+_REQUEST = struct.Struct(">48s32sBII")
+_SIGNATURE_SIZE = 96
+_NO_HIDDEN_PUZZLE_HASH = bytes(32)
+_KEY_KINDS = [SINGLETON_OWNER_KEY, WALLET_KEY]
+
+
+class SigningFileError(Exception):
+    pass
+
+
+class SigningRequest:
+    """
+    A message to sign with the key of derivation index `index` of `kind`, or with its
+    synthetic key for `hidden_puzzle_hash` if one is given.
+    """
+
+    def __init__(
+        self,
+        public_key: G1Element,
+        message: bytes,
+        kind: str,
+        index: int,
+        hidden_puzzle_hash: Optional[bytes32] = None,
+    ):
+        self.public_key = public_key
+        self.message = message
+        self.kind = kind
+        self.index = index
+        self.hidden_puzzle_hash = hidden_puzzle_hash
+
+
+class UnsignedFileWriter:
+    def __init__(self, output: BinaryIO):
+        self.output = output
+        self.count = 0
+        output.write(UNSIGNED_FILE_MARKER)
+
+    def write(self, spend_bundle: SpendBundle, requests: List[SigningRequest]):
+        spend_bundle_bytes = bytes(spend_bundle)
+        parts = [
+            _U32.pack(len(spend_bundle_bytes)),
+            spend_bundle_bytes,
+            _U16.pack(len(requests)),
+        ]
+        for request in requests:
+            parts.append(
+                _REQUEST.pack(
+                    bytes(request.public_key),
+                    request.hidden_puzzle_hash or _NO_HIDDEN_PUZZLE_HASH,
+                    _KEY_KINDS.index(request.kind),
+                    request.index,
+                    len(request.message),
+                )
+            )
+            parts.append(request.message)
+        record = b"".join(parts)
+        self.output.write(_U32.pack(len(record)))
+        self.output.write(record)
+        self.count += 1
+
+
+@contextmanager
+def _map_file(path: Union[str, Path], marker: bytes) -> Iterator[mmap.mmap]:
+    with open(path, "rb") as file:
+        # Empty files cannot be mapped
+        if os.fstat(file.fileno()).st_size < len(marker):
+            raise SigningFileError(f"{path} is not a signing file")
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if mapped[: len(marker)] != marker:
+                raise SigningFileError(f"{path} is not a signing file")
+            yield mapped
+
+
+def iter_unsigned_records(path: Union[str, Path]) -> Iterator[bytes]:
+    """
+    Yields the raw records of an unsigned file one by one from a memory map, so only the
+    current record is held in memory.
+    """
+    with _map_file(path, UNSIGNED_FILE_MARKER) as mapped:
+        offset = len(UNSIGNED_FILE_MARKER)
+        while offset < len(mapped):
+            if offset + _U32.size > len(mapped):
+                raise SigningFileError(f"{path} ends within a record")
+            (length,) = _U32.unpack_from(mapped, offset)
+            offset += _U32.size
+            if offset + length > len(mapped):
+                raise SigningFileError(f"{path} ends within a record")
+            yield mapped[offset : offset + length]
+            offset += length
+
+
+def _spend_bundle_bytes(record: bytes) -> Tuple[bytes, int]:
+    (length,) = _U32.unpack_from(record, 0)
+    return record[_U32.size : _U32.size + length], _U32.size + length
+
+
+def decode_requests(record: bytes) -> List[SigningRequest]:
+    _, offset = _spend_bundle_bytes(record)
+    (count,) = _U16.unpack_from(record, offset)
+    offset += _U16.size
+    requests: List[SigningRequest] = []
+    for _ in range(count):
+        public_key, hidden_puzzle_hash, kind, index, length = _REQUEST.unpack_from(
+            record, offset
+        )
+        offset += _REQUEST.size
+        requests.append(
+            SigningRequest(
+                G1Element.from_bytes(public_key),
+                record[offset : offset + length],
+                _KEY_KINDS[kind],
+                index,
+                bytes32(hidden_puzzle_hash)
+                if hidden_puzzle_hash != _NO_HIDDEN_PUZZLE_HASH
+                else None,
+            )
+        )
+        offset += length
+    return requests
+
+
+def decode_record(record: bytes) -> Tuple[SpendBundle, List[SigningRequest]]:
+    spend_bundle_bytes, _ = _spend_bundle_bytes(record)
+    return SpendBundle.from_bytes(spend_bundle_bytes), decode_requests(record)
+
+
+@lru_cache(maxsize=4096)
+def _secret_key(
+    master_sk_bytes: bytes,
+    kind: str,
+    index: int,
+    hidden_puzzle_hash: Optional[bytes32],
+) -> PrivateKey:
+    master_sk = PrivateKey.from_bytes(master_sk_bytes)
+    derive = (
+        master_sk_to_singleton_owner_sk
+        if kind == SINGLETON_OWNER_KEY
+        else master_sk_to_wallet_sk
+    )
+    secret_key = derive(master_sk, uint32(index))
+    if hidden_puzzle_hash is None:
+        return secret_key
+    return p2_delegated_puzzle_or_hidden_puzzle.calculate_synthetic_secret_key(
+        secret_key, hidden_puzzle_hash
+    )
+
+
+def required_signing_pairs(
+    spend_bundle: SpendBundle, additional_data: bytes
+) -> Set[Tuple[bytes, bytes]]:
+    """
+    The (public key, message) pairs of the AGG_SIG_ME conditions of the coin spends of a
+    spend bundle, with the coin ID and `additional_data` appended to each message.
+
+    AGG_SIG_UNSAFE conditions are left out, since their messages are not bound to a coin and
+    a tampered file could use them to have any message signed, like the price of an offer.
+    """
+    pairs: Set[Tuple[bytes, bytes]] = set()
+    for spend_result in dry_run_spend_bundle(spend_bundle).spend_results:
+        coin_id = spend_result.coin_spend.coin.name()
+        if spend_result.error is not None:
+            raise SigningFileError(
+                f"The spend of coin {coin_id} fails: {spend_result.error.name}"
+            )
+        agg_sig_me = conditions_by_opcode(spend_result.conditions).get(
+            ConditionOpcode.AGG_SIG_ME, []
+        )
+        for public_key, message in pkm_pairs_for_conditions_dict(
+            {ConditionOpcode.AGG_SIG_ME: agg_sig_me}, coin_id, additional_data
+        ):
+            pairs.add((bytes(public_key), message))
+    return pairs
+
+
+def sign_record(master_sk_bytes: bytes, record: bytes, additional_data: bytes) -> bytes:
+    """
+    Signs the requests of a record, after checking that each of them is required by an
+    AGG_SIG_ME condition of the spends of the record. The requests of a file are not trusted,
+    so a tampered file cannot have other messages signed with the key.
+    """
+    spend_bundle, requests = decode_record(record)
+    required = required_signing_pairs(spend_bundle, additional_data)
+    signatures: List[G2Element] = []
+    for request in requests:
+        if (bytes(request.public_key), request.message) not in required:
+            raise SigningFileError(
+                f"The spends of record {spend_bundle.name()} do not require the message "
+                f"{request.message.hex()} to be signed by {bytes(request.public_key).hex()}"
+            )
+        secret_key = _secret_key(
+            master_sk_bytes, request.kind, request.index, request.hidden_puzzle_hash
+        )
+        if secret_key.get_g1() != request.public_key:
+            raise SigningFileError(
+                f"The {request.kind} key of index {request.index} does not match "
+                f"the requested public key {bytes(request.public_key).hex()}"
+            )
+        signatures.append(AugSchemeMPL.sign(secret_key, request.message))
+    return bytes(AugSchemeMPL.aggregate(signatures) if signatures else G2Element())
+
+
+def _sign_records(
+    master_sk_bytes: bytes, records: List[bytes], additional_data: bytes
+) -> List[bytes]:
+    return [sign_record(master_sk_bytes, record, additional_data) for record in records]
+
+
+def _request_count(record: bytes) -> int:
+    _, offset = _spend_bundle_bytes(record)
+    (count,) = _U16.unpack_from(record, offset)
+    return count
+
+
+def _chunks(records: Iterable[bytes]) -> Iterator[List[bytes]]:
+    # A record of a collection holds the requests of a whole bundle of NFTs, so the tasks
+    # are sized by requests rather than records
+    chunk: List[bytes] = []
+    request_count = 0
+    for record in records:
+        chunk.append(record)
+        request_count += _request_count(record)
+        if request_count >= SIGNING_CHUNK_SIZE:
+            yield chunk
+            chunk = []
+            request_count = 0
+    if len(chunk) > 0:
+        yield chunk
+
+
+def sign_records(
+    master_sk: PrivateKey,
+    records: Iterable[bytes],
+    additional_data: bytes,
+    max_workers: Optional[int] = None,
+) -> Iterator[bytes]:
+    """
+    Yields the aggregated signature of the requests of each record, in order. The
+    AGG_SIG_ME messages of the spends are checked with `additional_data` of the network.
+
+    Records are signed in chunks across a process pool. Only a few chunks per worker are in
+    flight at a time, so the records can be streamed from a file of any size.
+    """
+    master_sk_bytes = bytes(master_sk)
+    chunks = _chunks(records)
+    head = list(islice(chunks, 2))
+    if len(head) < 2 or max_workers == 1:
+        # A single chunk is signed faster than worker processes start
+        for chunk in chain(head, chunks):
+            yield from _sign_records(master_sk_bytes, chunk, additional_data)
+        return
+
+    workers = max_workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight: Deque[Future] = deque()
+        for chunk in chain(head, chunks):
+            in_flight.append(
+                executor.submit(_sign_records, master_sk_bytes, chunk, additional_data)
+            )
+            if len(in_flight) >= workers * 2:
+                yield from in_flight.popleft().result()
+        while len(in_flight) > 0:
+            yield from in_flight.popleft().result()
+
+
+def write_signatures_file(output: BinaryIO, signatures: Iterable[bytes]) -> int:
+    output.write(SIGNATURES_FILE_MARKER)
+    count = 0
+    for signature in signatures:
+        output.write(signature)
+        count += 1
+    return count
+
+
+def iter_signatures(path: Union[str, Path]) -> Iterator[G2Element]:
+    with _map_file(path, SIGNATURES_FILE_MARKER) as mapped:
+        if (len(mapped) - len(SIGNATURES_FILE_MARKER)) % _SIGNATURE_SIZE != 0:
+            raise SigningFileError(f"{path} ends within a signature")
+        for offset in range(len(SIGNATURES_FILE_MARKER), len(mapped), _SIGNATURE_SIZE):
+            yield G2Element.from_bytes(mapped[offset : offset + _SIGNATURE_SIZE])
+
+
+def assemble_spend_bundles(
+    unsigned_path: Union[str, Path], signatures_path: Union[str, Path]
+) -> Iterator[SpendBundle]:
+    """
+    Yields the spend bundle of each record of an unsigned file, with the signature of its
+    requests from the signatures file aggregated into it.
+    """
+    signatures = iter_signatures(signatures_path)
+    for record in iter_unsigned_records(unsigned_path):
+        signature = next(signatures, None)
+        if signature is None:
+            raise SigningFileError(
+                f"{signatures_path} has fewer signatures than {unsigned_path} has records"
+            )
+        spend_bundle, _ = decode_record(record)
+        yield SpendBundle(
+            spend_bundle.coin_spends,
+            AugSchemeMPL.aggregate([spend_bundle.aggregated_signature, signature]),
+        )
+    if next(signatures, None) is not None:
+        raise SigningFileError(
+            f"{signatures_path} has more signatures than {unsigned_path} has records"
+        )
@@ -0,0 +1,100 @@
+from blspy import AugSchemeMPL, G2Element
+
+from chia.types.blockchain_format.coin import Coin
+from chia.types.blockchain_format.program import Program
+from chia.types.coin_spend import CoinSpend
+from chia.types.condition_opcodes import ConditionOpcode
+from chia.types.spend_bundle import SpendBundle
+from chia.util.ints import uint32
+from chia.wallet.derive_keys import master_sk_to_singleton_owner_sk
+from chia.wallet.puzzles import p2_delegated_puzzle_or_hidden_puzzle
+from ownable_singleton.collection import (
+    collection_chunk_indices,
+    genesis_additions,
+    unsigned_collection_chunk,
+)
+from ownable_singleton.drivers.ownable_singleton_driver import Owner
+from ownable_singleton.dry_run import dry_run_spend_bundle
+from ownable_singleton.manifest import ManifestEntry
+from ownable_singleton.verify import verify_spend_bundle
+
+MASTER_SK = AugSchemeMPL.key_gen(bytes([1] * 32))
+ADDITIONAL_DATA = bytes([3] * 32)
+# A puzzle that returns its solution as conditions, standing in for the wallet
+CONDITIONS_PUZZLE = Program.to(1)
+
+
+def genesis_spend_bundle(wallet_coin: Coin, additions) -> SpendBundle:
+    return SpendBundle(
+        [
+            CoinSpend(
+                wallet_coin,
+                CONDITIONS_PUZZLE,
+                Program.to(
+                    [
+                        [
+                            ConditionOpcode.CREATE_COIN,
+                            addition["puzzle_hash"],
+                            addition["amount"],
+                        ]
+                        for addition in additions
+                    ]
+                ),
+            )
+        ],
+        G2Element(),
+    )
+
+
+def test_collection_chunks_fit_into_one_transaction_each():
+    owner_sk = master_sk_to_singleton_owner_sk(MASTER_SK, uint32(0))
+    creator = Owner(owner_sk.get_g1(), bytes([4] * 32))
+    entries = [
+        ManifestEntry(f"NFT {index}", f"https://example.com/{index}.png", index % 3)
+        for index in range(5)
+    ]
+    chunk_indices = collection_chunk_indices(len(entries), 2)
+    assert chunk_indices == [range(0, 2), range(2, 4), range(4, 5)]
+
+    chunks = []
+    for chunk_index, indices in enumerate(chunk_indices):
+        wallet_coin = Coin(
+            bytes([chunk_index] * 32), CONDITIONS_PUZZLE.get_tree_hash(), 10**6
+        )
+        spend_bundle, requests = unsigned_collection_chunk(
+            entries[indices.start : indices.stop],
+            indices,
+            genesis_spend_bundle(
+                wallet_coin, genesis_additions(creator.public_key, indices)
+            ),
+            creator,
+            ADDITIONAL_DATA,
+        )
+        # Apart from the wallet coin, a chunk only spends the genesis coins it creates
+        additions = {coin.name() for coin in spend_bundle.additions()}
+        assert [
+            coin for coin in spend_bundle.removals() if coin.name() not in additions
+        ] == [wallet_coin]
+        assert len(requests) == len(indices)
+
+        signature = AugSchemeMPL.aggregate(
+            [
+                AugSchemeMPL.sign(
+                    p2_delegated_puzzle_or_hidden_puzzle.calculate_synthetic_secret_key(
+                        owner_sk, request.hidden_puzzle_hash
+                    ),
+                    request.message,
+                )
+                for request in requests
+            ]
+        )
+        chunks.append(SpendBundle(spend_bundle.coin_spends, signature))
+    assert all(verify_spend_bundle(chunk, ADDITIONAL_DATA) for chunk in chunks)
+
+    # With a transaction limit that only fits the largest chunk, the whole collection does
+    # not fit into a single transaction, but each of its chunks does
+    max_cost = max(dry_run_spend_bundle(chunk).cost for chunk in chunks)
+    assert dry_run_spend_bundle(
+        SpendBundle.aggregate(chunks), max_cost
+    ).exceeds_max_cost
+    assert all(dry_run_spend_bundle(chunk, max_cost).valid for chunk in chunks)
@@ -0,0 +1,147 @@
+from typing import Optional
+
+import pytest
+from blspy import G2Element
+from cdv.test import CoinWrapper
+from cdv.test import setup as setup_test
+
+from chia.types.blockchain_format.program import Program
+from chia.types.coin_spend import CoinSpend
+from chia.types.condition_opcodes import ConditionOpcode
+from chia.types.spend_bundle import SpendBundle
+from ownable_singleton.drivers.ownable_singleton_driver import SINGLETON_AMOUNT
+from ownable_singleton.journal import (
+    ABANDONED,
+    CONFIRMED,
+    PENDING,
+    SINGLETON_SUBMISSION,
+    SubmissionJournal,
+    SubmissionPoller,
+)
+from ownable_singleton.tests.test_ownable_singleton import (
+    create_singleton_spend_bundle,
+)
+
+
+class TestSubmissionJournal:
+    @pytest.fixture(scope="function")
+    async def setup(self, tmp_path):
+        network, alice, bob = await setup_test()
+        await network.farm_block()
+        journal = await SubmissionJournal.create(tmp_path / "submissions.sqlite")
+        yield network, alice, journal
+        await journal.close()
+
+    @pytest.mark.asyncio
+    async def test_resubmits_until_confirmed(self, setup):
+        network, alice, journal = setup
+        try:
+            await network.farm_block(farmer=alice)
+            contribution_coin: Optional[CoinWrapper] = await alice.choose_coin(
+                SINGLETON_AMOUNT
+            )
+            combined_spend, _, _ = await create_singleton_spend_bundle(
+                contribution_coin, alice, 2, None
+            )
+
+            # The first submission got lost, so the bundle is only in the journal
+            await journal.record(SINGLETON_SUBMISSION, combined_spend, "Marmot", 0)
+            retried = await journal.record(
+                SINGLETON_SUBMISSION, combined_spend, "Marmot again", 0
+            )
+            assert retried.label == "Marmot"
+            assert len(await journal.get_by_status(PENDING)) == 1
+
+            sent = []
+
+            async def resubmit(submission):
+                sent.append(submission.name)
+                result = await network.push_tx(submission.spend_bundle)
+                return result.get("error")
+
+            poller = SubmissionPoller(
+                journal,
+                network.sim_client,
+                {SINGLETON_SUBMISSION: resubmit},
+                backoff=0,
+            )
+            assert await poller.poll_once() == []
+            assert sent == [combined_spend.name()]
+
+            [confirmed] = await poller.poll_once()
+            assert confirmed.name == combined_spend.name()
+            assert confirmed.status == CONFIRMED
+            assert confirmed.attempts == 2
+            assert confirmed.confirmed_height is not None
+            assert await journal.get_by_status(PENDING) == []
+            # Confirmed bundles are not sent again
+            assert await poller.poll_once() == []
+            assert sent == [combined_spend.name()]
+        finally:
+            await network.close()
+
+    @pytest.mark.asyncio
+    async def test_counts_no_attempts_until_the_spent_coins_exist(self, setup):
+        network, alice, journal = setup
+        try:
+            await network.farm_block(farmer=alice)
+            contribution_coin: Optional[CoinWrapper] = await alice.choose_coin(
+                SINGLETON_AMOUNT
+            )
+            combined_spend, _, _ = await create_singleton_spend_bundle(
+                contribution_coin, alice, 2, None
+            )
+            removals = combined_spend.removals()
+            created_coin = next(
+                coin for coin in combined_spend.additions() if coin not in removals
+            )
+            # A bundle spending a coin that only exists once the singleton is created
+            dependent_spend = SpendBundle(
+                [
+                    CoinSpend(
+                        created_coin,
+                        Program.to(1),
+                        Program.to(
+                            [
+                                [
+                                    ConditionOpcode.CREATE_COIN,
+                                    bytes(32),
+                                    created_coin.amount,
+                                ]
+                            ]
+                        ),
+                    )
+                ],
+                G2Element(),
+            )
+            await journal.record(SINGLETON_SUBMISSION, dependent_spend, "Marmot", 0)
+
+            sent = []
+
+            async def resubmit(submission):
+                sent.append(submission.name)
+
+            poller = SubmissionPoller(
+                journal,
+                network.sim_client,
+                {SINGLETON_SUBMISSION: resubmit},
+                backoff=0,
+                max_attempts=2,
+            )
+            for _ in range(3):
+                assert await poller.poll_once() == []
+            assert sent == []
+            waiting = await journal.get(dependent_spend.name())
+            assert waiting.status == PENDING
+            assert waiting.attempts == 1
+
+            await network.push_tx(combined_spend)
+            await network.farm_block()
+            assert await poller.poll_once() == []
+            assert sent == [dependent_spend.name()]
+
+            [abandoned] = await poller.poll_once()
+            assert abandoned.status == ABANDONED
+            assert abandoned.attempts == 2
+        finally:
+            await network.close()
@@ -0,0 +1,53 @@
+from blspy import AugSchemeMPL
+
+from chia.util.ints import uint32
+from chia.wallet.derive_keys import (
+    master_sk_to_singleton_owner_sk,
+    master_sk_to_wallet_sk,
+)
+from chia.wallet.puzzles import p2_delegated_puzzle_or_hidden_puzzle
+from ownable_singleton.keys import (
+    PROCESS_POOL_THRESHOLD,
+    SINGLETON_OWNER_KEY,
+    WALLET_KEY,
+    KeyTable,
+)
+
+MASTER_SK = AugSchemeMPL.key_gen(bytes([7] * 32))
+
+
+def test_key_table_maps_keys_to_derivation_index():
+    key_table = KeyTable.scan(MASTER_SK, range(3))
+    assert len(key_table) == 6
+
+    singleton_sk = master_sk_to_singleton_owner_sk(MASTER_SK, uint32(2))
+    key = key_table.find_by_public_key(bytes(singleton_sk.get_g1()).hex())
+    assert key.kind == SINGLETON_OWNER_KEY
+    assert key.index == 2
+    assert key.secret_key == singleton_sk
+
+    wallet_sk = master_sk_to_wallet_sk(MASTER_SK, uint32(1))
+    wallet_puzzle_hash = p2_delegated_puzzle_or_hidden_puzzle.puzzle_for_pk(
+        wallet_sk.get_g1()
+    ).get_tree_hash()
+    key = key_table.find_by_puzzle_hash(wallet_puzzle_hash)
+    assert key.kind == WALLET_KEY
+    assert key.index == 1
+    assert key.public_key == wallet_sk.get_g1()
+
+    assert (
+        key_table.find_by_public_key(
+            master_sk_to_singleton_owner_sk(MASTER_SK, uint32(3)).get_g1()
+        )
+        is None
+    )
+
+
+def test_key_table_scan_in_process_pool_matches_serial_scan():
+    indices = range(PROCESS_POOL_THRESHOLD)
+    serial = KeyTable.scan(MASTER_SK, indices, max_workers=1)
+    parallel = KeyTable.scan(MASTER_SK, indices, max_workers=2)
+    assert serial.by_puzzle_hash.keys() == parallel.by_puzzle_hash.keys()
+    for public_key, key in serial.by_public_key.items():
+        assert parallel.by_public_key[public_key].index == key.index
+        assert parallel.by_public_key[public_key].kind == key.kind
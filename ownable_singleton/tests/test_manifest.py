@@ -0,0 +1,57 @@
+import pytest
+
+from ownable_singleton.manifest import ManifestError, read_manifest
+
+
+def test_read_csv_manifest(tmp_path):
+    manifest = tmp_path / "collection.csv"
+    manifest.write_text(
+        "name,uri,royalty\n"
+        "Curly Nonchalant Marmot,https://example.com/marmot.png,10\n"
+        "The fox,https://example.com/fox.png,\n"
+    )
+
+    entries = list(read_manifest(manifest))
+
+    assert [(e.name, e.uri, e.royalty_percentage) for e in entries] == [
+        ("Curly Nonchalant Marmot", "https://example.com/marmot.png", 10),
+        ("The fox", "https://example.com/fox.png", 0),
+    ]
+
+
+def test_read_jsonl_manifest(tmp_path):
+    manifest = tmp_path / "collection.jsonl"
+    manifest.write_text(
+        '{"name": "The fox", "uri": "https://example.com/fox.png", "royalty": 5}\n'
+        "\n"
+        '{"name": "The owl", "uri": "https://example.com/owl.png", "file": "media/owl.png"}\n'
+    )
+
+    entries = list(read_manifest(manifest))
+
+    assert [(e.name, e.royalty_percentage, e.file) for e in entries] == [
+        ("The fox", 5, None),
+        # Files are relative to the manifest
+        ("The owl", 0, tmp_path / "media" / "owl.png"),
+    ]
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        '{"name": "The fox"}',
+        '{"name": "The fox", "uri": "https://example.com/fox.png", "royalty": 100}',
+        '{"name": "", "uri": "https://example.com/fox.png"}',
+        '{"name": "The fox", "uri": "https://example.com/fox.png", "royalty": 2.5}',
+        '{"name": "The fox", "uri": "https://example.com/fox.png", "royalty": true}',
+        '["The fox", "https://example.com/fox.png"]',
+        '"The fox"',
+        "not json",
+    ],
+)
+def test_invalid_manifest(tmp_path, line):
+    manifest = tmp_path / "collection.jsonl"
+    manifest.write_text(line + "\n")
+
+    with pytest.raises(ManifestError):
+        list(read_manifest(manifest))
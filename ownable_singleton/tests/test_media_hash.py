@@ -0,0 +1,44 @@
+import asyncio
+import hashlib
+
+from ownable_singleton import media_hash
+from ownable_singleton.media_hash import hash_file, hash_files, open_media_hash_cache
+
+
+def test_hashes_files_in_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(media_hash, "HASH_CHUNK_SIZE", 7)
+    content = bytes(range(256)) * 3
+    media = tmp_path / "marmot.png"
+    media.write_bytes(content)
+    empty = tmp_path / "empty.png"
+    empty.write_bytes(b"")
+
+    assert hash_file(media) == hashlib.sha256(content).digest()
+    assert hash_file(empty) == hashlib.sha256(b"").digest()
+
+
+def test_skips_unchanged_files(tmp_path):
+    files = []
+    for index in range(6):
+        media = tmp_path / f"{index}.png"
+        media.write_bytes(bytes([index]) * 1000)
+        files.append(media)
+
+    async def run():
+        async with open_media_hash_cache(tmp_path / "hashes.sqlite") as cache:
+            first = await hash_files(files, cache, max_workers=2)
+            # A cached hash is trusted while the modification time and size are unchanged
+            stat = files[0].stat()
+            await cache.save_many(
+                [(str(files[0].resolve()), stat.st_mtime_ns, stat.st_size, bytes(32))]
+            )
+            files[1].write_bytes(b"changed")
+            second = await hash_files(files, cache, max_workers=1)
+            return first, second
+
+    expected = {media: hashlib.sha256(media.read_bytes()).digest() for media in files}
+    first, second = asyncio.run(run())
+    assert first == expected
+    assert second[files[0]] == bytes(32)
+    assert second[files[1]] == hashlib.sha256(b"changed").digest()
+    assert second[files[2]] == expected[files[2]]
@@ -8,6 +8,7 @@ from clvm.casts import int_to_bytes
 
 from chia.consensus.default_constants import DEFAULT_CONSTANTS
 from chia.types.blockchain_format.coin import Coin
+from chia.types.blockchain_format.program import Program, SerializedProgram
 from chia.types.condition_opcodes import ConditionOpcode
 from chia.types.spend_bundle import SpendBundle
 from chia.util.ints import uint64, uint32
@@ -17,13 +18,28 @@ from chia.wallet.puzzles import (
     p2_delegated_puzzle_or_hidden_puzzle,
 )
 from ownable_singleton.drivers.ownable_singleton_driver import (
+    OWNABLE_SINGLETON_MOD_V1,
+    OWNABLE_SINGLETON_MOD_V2,
+    OWNABLE_SINGLETON_V1,
+    OWNABLE_SINGLETON_V2,
+    P2_SINGLETON_OR_CANCEL,
     create_unsigned_ownable_singleton,
     create_inner_puzzle,
     create_buy_offer,
+    create_offer_cancel,
+    create_transfer,
+    inner_puzzle_hash,
     pay_to_singleton_puzzle,
+    pay_to_singleton_puzzle_hash,
+    singleton_puzzle,
+    singleton_puzzle_hash,
+    transfer_signing_messages,
     Owner,
     Royalty,
 )
+from ownable_singleton.drivers.puzzle_decoder import decode_singleton_puzzle
+from ownable_singleton.dry_run import dry_run_spend_bundle
+from ownable_singleton.verify import verify_spend_bundle, verify_spend_bundles
 
 SINGLETON_AMOUNT: uint64 = 1023
 
@@ -222,6 +238,125 @@ testdata = [
 ]
 
 
+@pytest.mark.parametrize(
+    "puzzle", [OWNABLE_SINGLETON_V1, OWNABLE_SINGLETON_V2, P2_SINGLETON_OR_CANCEL]
+)
+def test_shipped_puzzles_match_pinned_hashes(puzzle):
+    assert puzzle.program.get_tree_hash() == puzzle.pinned_hash
+
+
+def test_offer_cancel_pays_back_to_cancel_puzzle_hash():
+    launcher_id = bytes([4] * 32)
+    cancel_puzhash = bytes([5] * 32)
+    p2_singleton_coin = Coin(
+        bytes([6] * 32), pay_to_singleton_puzzle_hash(launcher_id, cancel_puzhash), 1000
+    )
+
+    dry_run = dry_run_spend_bundle(
+        SpendBundle(
+            [create_offer_cancel(p2_singleton_coin, launcher_id, cancel_puzhash)],
+            G2Element(),
+        )
+    )
+
+    assert dry_run.valid
+    [create_coin] = [
+        condition
+        for condition in dry_run.spend_results[0].conditions
+        if condition.opcode == ConditionOpcode.CREATE_COIN
+    ]
+    assert create_coin.vars == [cancel_puzhash, int_to_bytes(1000)]
+
+
+@pytest.mark.parametrize("version,royalty_percentage", testdata)
+def test_cached_puzzles_match_curried_puzzles(version, royalty_percentage):
+    sk = AugSchemeMPL.key_gen(bytes([1] * 32))
+    owner = Owner(sk.get_g1(), bytes([2] * 32))
+    royalty = (
+        Royalty(bytes([3] * 32), royalty_percentage) if royalty_percentage else None
+    )
+    launcher_id = bytes([4] * 32)
+
+    if version == 1:
+        expected_inner_puzzle = OWNABLE_SINGLETON_MOD_V1.curry(
+            owner.public_key,
+            owner.puzzle_hash,
+            OWNABLE_SINGLETON_MOD_V1.get_tree_hash(),
+        )
+    else:
+        expected_inner_puzzle = OWNABLE_SINGLETON_MOD_V2.curry(
+            [owner.public_key, owner.puzzle_hash],
+            [royalty.creator_puzhash, royalty.percentage] if royalty else [],
+            OWNABLE_SINGLETON_MOD_V2.get_tree_hash(),
+        )
+
+    inner_puzzle = create_inner_puzzle(version, owner, royalty)
+    assert inner_puzzle == expected_inner_puzzle
+    # A second lookup with equal arguments is served from the cache
+    assert create_inner_puzzle(version, owner, royalty) is inner_puzzle
+    assert (
+        inner_puzzle_hash(version, owner, royalty)
+        == expected_inner_puzzle.get_tree_hash()
+    )
+    assert (
+        singleton_puzzle_hash(launcher_id, version, owner, royalty)
+        == singleton_top_layer.puzzle_for_singleton(
+            launcher_id, expected_inner_puzzle
+        ).get_tree_hash()
+    )
+
+
+def test_owner_and_royalty_are_hashable_values():
+    sk = AugSchemeMPL.key_gen(bytes([1] * 32))
+    owner = Owner(sk.get_g1(), bytes([2] * 32))
+    royalty = Royalty(bytes([3] * 32), 10)
+
+    assert owner == Owner(bytes(sk.get_g1()), bytes([2] * 32))
+    assert len({owner, Owner.from_bytes(bytes(owner))}) == 1
+    assert Owner.from_bytes(bytes(owner)).public_key == sk.get_g1()
+    assert Royalty.from_bytes(bytes(royalty)) == royalty
+    assert royalty != Royalty(bytes([3] * 32), 11)
+    with pytest.raises(AttributeError):
+        owner.puzzle_hash = bytes([4] * 32)
+
+    assert (
+        owner.tree_hash()
+        == Program.to([owner.public_key, owner.puzzle_hash]).get_tree_hash()
+    )
+    assert (
+        royalty.tree_hash()
+        == Program.to([royalty.creator_puzhash, royalty.percentage]).get_tree_hash()
+    )
+
+
+@pytest.mark.parametrize("version,royalty_percentage", testdata)
+def test_decodes_singleton_puzzles(version, royalty_percentage):
+    sk = AugSchemeMPL.key_gen(bytes([1] * 32))
+    owner = Owner(sk.get_g1(), bytes([2] * 32))
+    royalty = (
+        Royalty(bytes([3] * 32), royalty_percentage) if royalty_percentage else None
+    )
+    launcher_id = bytes([4] * 32)
+    puzzle = singleton_puzzle(launcher_id, version, owner, royalty)
+
+    decoded = decode_singleton_puzzle(puzzle)
+    assert decoded.launcher_id == launcher_id
+    assert decoded.version == version
+    assert decoded.owner == owner
+    assert decoded.royalty == royalty
+    assert decoded.inner_puzzle_hash == inner_puzzle_hash(version, owner, royalty)
+    # Puzzle reveals are decoded once per puzzle hash
+    assert decode_singleton_puzzle(SerializedProgram.from_program(puzzle)) is decoded
+
+    assert decode_singleton_puzzle(Program.to(1)) is None
+    assert (
+        decode_singleton_puzzle(
+            singleton_top_layer.puzzle_for_singleton(launcher_id, Program.to(1))
+        )
+        is None
+    )
+
+
 class TestOwnableSingleton:
     @pytest.fixture(scope="function")
     async def setup(self):
@@ -253,6 +388,17 @@ class TestOwnableSingleton:
                 contribution_coin, alice, version, royalty
             )
 
+            dry_run = dry_run_spend_bundle(combined_spend)
+            assert dry_run.valid
+            assert dry_run.clvm_cost > 0
+            assert verify_spend_bundle(
+                combined_spend, DEFAULT_CONSTANTS.AGG_SIG_ME_ADDITIONAL_DATA, dry_run
+            )
+            assert not verify_spend_bundle(
+                SpendBundle(combined_spend.coin_spends, G2Element()),
+                DEFAULT_CONSTANTS.AGG_SIG_ME_ADDITIONAL_DATA,
+            )
+
             result = await network.push_tx(combined_spend)
 
             assert "error" not in result
@@ -340,6 +486,10 @@ class TestOwnableSingleton:
             accepted_buy_offer = await accept_buy_offer(
                 singleton_coin, buy_offer, alice, payment_amount
             )
+            assert verify_spend_bundles(
+                [buy_offer, accepted_buy_offer],
+                DEFAULT_CONSTANTS.AGG_SIG_ME_ADDITIONAL_DATA,
+            ) == [False, True]
 
             result = await network.push_tx(accepted_buy_offer)
 
@@ -368,3 +518,78 @@ class TestOwnableSingleton:
 
         finally:
             await network.close()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("version,royalty_percentage", testdata)
+    async def test_singleton_transfer(self, setup, version, royalty_percentage):
+        network, alice, bob = setup
+        try:
+            await network.farm_block(farmer=alice)
+
+            contribution_coin: Optional[CoinWrapper] = await alice.choose_coin(
+                SINGLETON_AMOUNT
+            )
+            royalty = (
+                Royalty(alice.puzzle_hash, royalty_percentage)
+                if royalty_percentage
+                else None
+            )
+            (
+                combined_spend,
+                genesis_coin,
+                launcher_coinsol,
+            ) = await create_singleton_spend_bundle(
+                contribution_coin, alice, version, royalty
+            )
+            result = await network.push_tx(combined_spend)
+            assert "error" not in result
+
+            launcher_id = singleton_top_layer.generate_launcher_coin(
+                genesis_coin, SINGLETON_AMOUNT
+            ).name()
+            alice_owner = wallet_to_owner(alice)
+            singleton_coin: Coin = next(
+                coin
+                for coin in result["additions"]
+                if coin.puzzle_hash
+                == singleton_puzzle_hash(launcher_id, version, alice_owner, royalty)
+            )
+
+            bob_owner = wallet_to_owner(bob)
+            coin_spend = create_transfer(
+                launcher_id,
+                singleton_top_layer.lineage_proof_for_coinsol(launcher_coinsol),
+                singleton_coin,
+                alice_owner,
+                bob_owner,
+                version,
+                royalty,
+            )
+            secret_keys = {
+                alice_owner: master_sk_to_singleton_owner_sk(alice.sk_, uint32(0)),
+                bob_owner: master_sk_to_singleton_owner_sk(bob.sk_, uint32(0)),
+            }
+            signature = AugSchemeMPL.aggregate(
+                [
+                    AugSchemeMPL.sign(secret_keys[owner], message)
+                    for owner, message in transfer_signing_messages(
+                        singleton_coin,
+                        alice_owner,
+                        bob_owner,
+                        DEFAULT_CONSTANTS.AGG_SIG_ME_ADDITIONAL_DATA,
+                    )
+                ]
+            )
+            transfer = SpendBundle([coin_spend], signature)
+            assert verify_spend_bundle(
+                transfer, DEFAULT_CONSTANTS.AGG_SIG_ME_ADDITIONAL_DATA
+            )
+
+            result = await network.push_tx(transfer)
+            assert "error" not in result
+
+            await get_singleton_puzzle_owned_by_user(
+                result, launcher_id, bob, version, royalty
+            )
+        finally:
+            await network.close()
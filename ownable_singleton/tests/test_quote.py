@@ -0,0 +1,85 @@
+from typing import Dict
+
+import pytest
+from blspy import AugSchemeMPL
+
+from chia.types.blockchain_format.program import Program
+from chia.types.condition_opcodes import ConditionOpcode
+from ownable_singleton import quote
+from ownable_singleton.drivers.ownable_singleton_driver import (
+    SINGLETON_AMOUNT,
+    Owner,
+    Royalty,
+    create_inner_puzzle,
+    create_inner_solution,
+)
+from ownable_singleton.quote import quote_payout, quote_payouts
+
+SELLER = Owner(AugSchemeMPL.key_gen(bytes([1] * 32)).get_g1(), bytes([2] * 32))
+BUYER = Owner(AugSchemeMPL.key_gen(bytes([3] * 32)).get_g1(), bytes([4] * 32))
+CREATOR_PUZHASH = bytes([5] * 32)
+
+PRICES = [0, 1, 2, 99, 100, 101, 1001, 123456789, 10**12 + 7, 2**40 + 3]
+ROYALTY_PERCENTAGES = [0, 1, 3, 10, 33, 50, 99, 100]
+
+
+def puzzle_payouts(price: int, royalty_percentage: int) -> Dict[bytes, int]:
+    royalty = (
+        Royalty(CREATOR_PUZHASH, royalty_percentage) if royalty_percentage else None
+    )
+    inner_puzzle = create_inner_puzzle(2, SELLER, royalty)
+    # The v2 puzzle only reads the singleton amount from its truths
+    truths = Program.to(
+        ((bytes(32), bytes(32)), ((bytes(32), SINGLETON_AMOUNT), (0, 0)))
+    )
+    inner_solution = create_inner_solution(2, BUYER, price, bytes([6] * 32))
+    conditions = inner_puzzle.run(Program.to((truths, inner_solution)))
+    return {
+        condition.rest().first().as_atom(): condition.rest().rest().first().as_int()
+        for condition in conditions.as_iter()
+        if condition.first().as_atom() == ConditionOpcode.CREATE_COIN
+    }
+
+
+@pytest.mark.parametrize("royalty_percentage", ROYALTY_PERCENTAGES)
+def test_quote_matches_puzzle(royalty_percentage):
+    seller_amounts, creator_amounts = quote_payouts(
+        PRICES, [royalty_percentage] * len(PRICES)
+    )
+    for price, seller_amount, creator_amount in zip(
+        PRICES, seller_amounts, creator_amounts
+    ):
+        payouts = puzzle_payouts(price, royalty_percentage)
+        assert payouts[SELLER.puzzle_hash] == seller_amount
+        assert payouts.get(CREATOR_PUZHASH, 0) == creator_amount
+        assert quote_payout(price, royalty_percentage) == (
+            seller_amount,
+            creator_amount,
+        )
+
+
+def test_quote_without_numpy(monkeypatch):
+    prices = PRICES * len(ROYALTY_PERCENTAGES)
+    royalty_percentages = [
+        royalty_percentage for royalty_percentage in ROYALTY_PERCENTAGES for _ in PRICES
+    ]
+    expected = quote_payouts(prices, royalty_percentages)
+    monkeypatch.setattr(quote, "numpy", None)
+    assert quote_payouts(prices, royalty_percentages) == expected
+
+
+def test_quote_beyond_int64():
+    price = 2**62
+    assert quote_payouts([price], [10]) == (
+        [quote_payout(price, 10)[0]],
+        [quote_payout(price, 10)[1]],
+    )
+
+
+def test_quote_rejects_invalid_input():
+    with pytest.raises(ValueError):
+        quote_payout(-1, 10)
+    with pytest.raises(ValueError):
+        quote_payout(100, 101)
+    with pytest.raises(ValueError):
+        quote_payouts([100, 200], [10])
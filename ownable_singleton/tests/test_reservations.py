@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from chia.types.blockchain_format.coin import Coin
+from ownable_singleton.reservations import (
+    CoinReservationError,
+    CoinReservations,
+    open_coin_reservations,
+)
+
+
+def coins(*amounts: int):
+    return [
+        Coin(bytes([index] * 32), bytes([0xAA] * 32), amount)
+        for index, amount in enumerate(amounts)
+    ]
+
+
+def test_concurrent_jobs_reserve_different_coins(tmp_path):
+    candidates = coins(100, 300, 500, 2000)
+    path = tmp_path / "reservations.sqlite"
+
+    async def run():
+        async with open_coin_reservations(path) as first, open_coin_reservations(
+            path
+        ) as second:
+            selections = await asyncio.gather(
+                first.reserve(candidates, 250, "job-1"),
+                second.reserve(candidates, 250, "job-2"),
+                first.reserve(candidates, 250, "job-3"),
+            )
+            with pytest.raises(CoinReservationError):
+                await second.reserve(candidates, 250, "job-4")
+            return selections
+
+    selections = asyncio.run(run())
+    selected = [coin for selection in selections for coin in selection]
+    assert len(set(selected)) == len(selected)
+    # The smallest coin that covers the amount is reserved first
+    assert sorted(coin.amount for coin in selected) == [300, 500, 2000]
+
+
+def test_reservations_are_handed_over_and_released(tmp_path):
+    candidates = coins(100, 300)
+    coin_ids = [coin.name() for coin in candidates]
+
+    async def run():
+        reservations = await CoinReservations.create(tmp_path / "reservations.sqlite")
+        try:
+            await reservations.reserve(candidates, 300, "job")
+            # The wallet spent other coins than the ones passed to it
+            await reservations.reserve_exactly([coin_ids[0]], "job")
+            with pytest.raises(CoinReservationError):
+                await reservations.reserve_exactly([coin_ids[0]], "other job")
+            assert await reservations.get_holders(coin_ids) == {coin_ids[0]: "job"}
+
+            await reservations.hand_over("job", "bundle")
+            # Releasing the job after the submission keeps the coins of the bundle
+            await reservations.release(["job"])
+            assert await reservations.get_holders(coin_ids) == {coin_ids[0]: "bundle"}
+            await reservations.release(["bundle"])
+            assert await reservations.get_holders(coin_ids) == {}
+
+            await reservations.reserve(candidates, 100, "job", timeout=0)
+            # Expired reservations are dropped
+            assert await reservations.reserve(candidates, 100, "other job") == [
+                candidates[0]
+            ]
+        finally:
+            await reservations.close()
+
+    asyncio.run(run())
@@ -0,0 +1,168 @@
+import asyncio
+import stat
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from ownable_singleton.rpc_server import (
+    INTERNAL_ERROR,
+    INVALID_PARAMS,
+    METHOD_NOT_FOUND,
+    OPERATION_FAILED,
+    PARSE_ERROR,
+    JsonRpcServer,
+    write_auth_token,
+)
+
+
+class WalletOffline(Exception):
+    pass
+
+
+def create_server(errors, auth_token=None):
+    started = asyncio.Event()
+
+    async def wait_for_other():
+        started.set()
+        return "waited"
+
+    async def profile():
+        await started.wait()
+        return {"name": "Acevail"}
+
+    async def offer(launcher_id: str, price: float, fee: int = 0):
+        if price <= 0:
+            raise WalletOffline("The wallet is not running")
+        return {"launcher_id": launcher_id, "price": price, "fee": fee}
+
+    async def crash():
+        raise KeyError("owner")
+
+    return JsonRpcServer(
+        {
+            "profile": profile,
+            "wait_for_other": wait_for_other,
+            "offer": offer,
+            "crash": crash,
+        },
+        operation_errors=(WalletOffline,),
+        on_error=lambda method, e: errors.append(method),
+        auth_token=auth_token,
+    )
+
+
+def request(method, params=None, request_id=1):
+    message = {"jsonrpc": "2.0", "method": method, "id": request_id}
+    if params is not None:
+        message["params"] = params
+    return message
+
+
+def test_dispatches_requests():
+    errors = []
+    server = create_server(errors)
+
+    async def run():
+        responses = await asyncio.gather(
+            server.dispatch(request("offer", {"launcher_id": "ab", "price": 1.5})),
+            server.dispatch(request("offer", ["ab", 2, 10], 2)),
+            server.dispatch(request("offer", {"launcher": "ab"}, 3)),
+            server.dispatch(request("offer", {"launcher_id": "ab", "price": 0}, 4)),
+            server.dispatch(request("transfer", None, 5)),
+            server.dispatch(request("crash", None, 6)),
+            server.dispatch({"jsonrpc": "2.0", "method": "profile"}),
+            server.dispatch(request("wait_for_other", None, 7)),
+        )
+        return responses
+
+    responses = asyncio.run(run())
+    assert responses[0] == {
+        "jsonrpc": "2.0",
+        "result": {"launcher_id": "ab", "price": 1.5, "fee": 0},
+        "id": 1,
+    }
+    assert responses[1]["result"] == {"launcher_id": "ab", "price": 2, "fee": 10}
+    assert responses[2]["error"]["code"] == INVALID_PARAMS
+    assert responses[3]["error"] == {
+        "code": OPERATION_FAILED,
+        "message": "The wallet is not running",
+    }
+    assert responses[4]["error"]["code"] == METHOD_NOT_FOUND
+    assert responses[5]["error"]["code"] == INTERNAL_ERROR
+    # Notifications are not answered
+    assert responses[6] is None
+    assert responses[7]["result"] == "waited"
+    assert errors == ["crash"]
+
+
+def test_serves_batches_over_http():
+    server = create_server([])
+
+    async def run():
+        async with TestClient(TestServer(server.application())) as client:
+            batch = await client.post(
+                "/",
+                json=[
+                    request("profile", None, 1),
+                    request("wait_for_other", None, 2),
+                    {"jsonrpc": "2.0", "method": "offer", "params": ["ab", 1]},
+                ],
+            )
+            invalid = await client.post(
+                "/", data=b"{", headers={"Content-Type": "application/json"}
+            )
+            notification = await client.post(
+                "/", json={"jsonrpc": "2.0", "method": "offer", "params": ["ab", 1]}
+            )
+            return (
+                await batch.json(),
+                await invalid.json(),
+                notification.status,
+            )
+
+    batch, invalid, notification_status = asyncio.run(run())
+    # Requests of a batch run concurrently, the profile waits for the second request
+    assert [response["id"] for response in batch] == [1, 2]
+    assert batch[0]["result"] == {"name": "Acevail"}
+    assert invalid["error"]["code"] == PARSE_ERROR
+    assert notification_status == 204
+
+
+def test_rejects_unauthorized_and_browser_requests(tmp_path):
+    token_path = tmp_path / "rpc_token"
+    token = write_auth_token(token_path)
+    assert token_path.read_text() == token
+    assert stat.S_IMODE(token_path.stat().st_mode) == 0o600
+    server = create_server([], auth_token=token)
+    authorization = {"Authorization": f"Bearer {token}"}
+
+    async def run():
+        async with TestClient(TestServer(server.application())) as client:
+            statuses = []
+            for headers, kwargs in [
+                ({}, {"json": request("offer", ["ab", 1])}),
+                (
+                    {"Authorization": "Bearer wrong"},
+                    {"json": request("offer", ["ab", 1])},
+                ),
+                # A simple request a web page may send without a CORS preflight
+                (
+                    {**authorization, "Content-Type": "text/plain"},
+                    {"data": b'{"jsonrpc": "2.0", "method": "offer", "id": 1}'},
+                ),
+                (
+                    {**authorization, "Origin": "https://example.com"},
+                    {"json": request("offer", ["ab", 1])},
+                ),
+                (authorization, {"json": request("offer", ["ab", 1])}),
+            ]:
+                response = await client.post("/", headers=headers, **kwargs)
+                statuses.append(response.status)
+            return statuses
+
+    assert asyncio.run(run()) == [401, 401, 415, 403, 200]
+
+
+def test_refuses_remote_hosts_without_token():
+    with pytest.raises(ValueError):
+        asyncio.run(create_server([]).serve("0.0.0.0", 0))
@@ -0,0 +1,159 @@
+import pytest
+from blspy import AugSchemeMPL, G2Element
+
+from chia.types.blockchain_format.coin import Coin
+from chia.types.blockchain_format.program import Program
+from chia.types.coin_spend import CoinSpend
+from chia.types.condition_opcodes import ConditionOpcode
+from chia.types.spend_bundle import SpendBundle
+from chia.util.ints import uint32
+from chia.wallet.derive_keys import (
+    master_sk_to_singleton_owner_sk,
+    master_sk_to_wallet_sk,
+)
+from chia.wallet.puzzles import p2_delegated_puzzle_or_hidden_puzzle
+from ownable_singleton import signing_file
+from ownable_singleton.keys import SINGLETON_OWNER_KEY, WALLET_KEY
+from ownable_singleton.signing_file import (
+    SigningFileError,
+    SigningRequest,
+    UnsignedFileWriter,
+    assemble_spend_bundles,
+    iter_unsigned_records,
+    sign_records,
+    write_signatures_file,
+)
+
+MASTER_SK = AugSchemeMPL.key_gen(bytes([1] * 32))
+HIDDEN_PUZZLE_HASH = bytes([2] * 32)
+ADDITIONAL_DATA = bytes([3] * 32)
+# A puzzle that returns its solution as conditions
+CONDITIONS_PUZZLE = Program.to(1)
+
+
+def signed_record(index):
+    """
+    A coin spend that requires an owner and a wallet signature, with the requests for them.
+    """
+    owner_sk = master_sk_to_singleton_owner_sk(MASTER_SK, uint32(0))
+    synthetic_public_key = (
+        p2_delegated_puzzle_or_hidden_puzzle.calculate_synthetic_public_key(
+            owner_sk.get_g1(), HIDDEN_PUZZLE_HASH
+        )
+    )
+    wallet_sk = master_sk_to_wallet_sk(MASTER_SK, uint32(3))
+    coin = Coin(bytes([index] * 32), CONDITIONS_PUZZLE.get_tree_hash(), 1)
+    owner_message = bytes([index]) * 32
+    wallet_message = bytes([index])
+    coin_spend = CoinSpend(
+        coin,
+        CONDITIONS_PUZZLE,
+        Program.to(
+            [
+                [
+                    ConditionOpcode.AGG_SIG_ME,
+                    bytes(synthetic_public_key),
+                    owner_message,
+                ],
+                [ConditionOpcode.AGG_SIG_ME, bytes(wallet_sk.get_g1()), wallet_message],
+            ]
+        ),
+    )
+    requests = [
+        SigningRequest(
+            synthetic_public_key,
+            owner_message + coin.name() + ADDITIONAL_DATA,
+            SINGLETON_OWNER_KEY,
+            0,
+            HIDDEN_PUZZLE_HASH,
+        ),
+        SigningRequest(
+            wallet_sk.get_g1(),
+            wallet_message + coin.name() + ADDITIONAL_DATA,
+            WALLET_KEY,
+            3,
+        ),
+    ]
+    return coin_spend, requests
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_signs_and_assembles_records(tmp_path, monkeypatch, max_workers):
+    # Small chunks make the records spread across the worker processes
+    monkeypatch.setattr(signing_file, "SIGNING_CHUNK_SIZE", 2)
+    unsigned_path = tmp_path / "collection.unsigned"
+    signatures_path = tmp_path / "collection.signatures"
+    records = [signed_record(index) for index in range(7)]
+    # The first bundle carries the signature of a transaction signed by the wallet
+    wallet_signature = AugSchemeMPL.sign(MASTER_SK, b"wallet transaction")
+    with open(unsigned_path, "wb") as output:
+        writer = UnsignedFileWriter(output)
+        for index, (coin_spend, record_requests) in enumerate(records):
+            signature = wallet_signature if index == 0 else G2Element()
+            writer.write(SpendBundle([coin_spend], signature), record_requests)
+    assert writer.count == 7
+
+    with open(signatures_path, "wb") as output:
+        assert (
+            write_signatures_file(
+                output,
+                sign_records(
+                    MASTER_SK,
+                    iter_unsigned_records(unsigned_path),
+                    ADDITIONAL_DATA,
+                    max_workers,
+                ),
+            )
+            == 7
+        )
+
+    spend_bundles = list(assemble_spend_bundles(unsigned_path, signatures_path))
+    assert len(spend_bundles) == 7
+    for index, (spend_bundle, (_, record_requests)) in enumerate(
+        zip(spend_bundles, records)
+    ):
+        public_keys = [request.public_key for request in record_requests]
+        messages = [request.message for request in record_requests]
+        if index == 0:
+            public_keys.append(MASTER_SK.get_g1())
+            messages.append(b"wallet transaction")
+        assert AugSchemeMPL.aggregate_verify(
+            public_keys, messages, spend_bundle.aggregated_signature
+        )
+
+
+def test_rejects_foreign_keys_unrequired_messages_and_truncated_files(tmp_path):
+    unsigned_path = tmp_path / "collection.unsigned"
+    coin_spend, [owner_request, wallet_request] = signed_record(0)
+    wallet_request.index = 4
+    with open(unsigned_path, "wb") as output:
+        UnsignedFileWriter(output).write(
+            SpendBundle([coin_spend], G2Element()), [wallet_request]
+        )
+
+    with pytest.raises(SigningFileError):
+        list(
+            sign_records(
+                MASTER_SK, iter_unsigned_records(unsigned_path), ADDITIONAL_DATA
+            )
+        )
+
+    # A tampered file must not get the key to sign a message the spends do not require
+    owner_request.message = b"offer price" + bytes(32)
+    with open(unsigned_path, "wb") as output:
+        UnsignedFileWriter(output).write(
+            SpendBundle([coin_spend], G2Element()), [owner_request]
+        )
+    with pytest.raises(SigningFileError):
+        list(
+            sign_records(
+                MASTER_SK, iter_unsigned_records(unsigned_path), ADDITIONAL_DATA
+            )
+        )
+
+    unsigned_path.write_bytes(unsigned_path.read_bytes()[:-1])
+    with pytest.raises(SigningFileError):
+        list(iter_unsigned_records(unsigned_path))
+    unsigned_path.write_bytes(b"")
+    with pytest.raises(SigningFileError):
+        list(iter_unsigned_records(unsigned_path))
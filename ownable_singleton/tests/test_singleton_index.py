@@ -0,0 +1,134 @@
+from typing import Optional
+
+import pytest
+from cdv.test import CoinWrapper
+from cdv.test import setup as setup_test
+
+from chia.types.blockchain_format.coin import Coin
+from chia.wallet.puzzles import singleton_top_layer
+from ownable_singleton.drivers.ownable_singleton_driver import (
+    SINGLETON_AMOUNT,
+    Royalty,
+    singleton_puzzle_hash,
+)
+from ownable_singleton.index import SingletonIndex
+from ownable_singleton.tests.test_ownable_singleton import (
+    accept_buy_offer,
+    create_buy_offer_for_user,
+    create_singleton_spend_bundle,
+    testdata,
+    wallet_to_owner,
+)
+
+
+class TestSingletonIndex:
+    @pytest.fixture(scope="function")
+    async def setup(self, tmp_path):
+        network, alice, bob = await setup_test()
+        await network.farm_block()
+        index = await SingletonIndex.create(tmp_path / "singletons.sqlite")
+        yield network, alice, bob, index
+        await index.close()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("version,royalty_percentage", testdata)
+    async def test_follows_lineage(self, setup, version, royalty_percentage):
+        network, alice, bob, index = setup
+        try:
+            await network.farm_block(farmer=alice)
+            await network.farm_block(farmer=bob)
+
+            contribution_coin: Optional[CoinWrapper] = await alice.choose_coin(
+                SINGLETON_AMOUNT
+            )
+            royalty = (
+                Royalty(alice.puzzle_hash, royalty_percentage)
+                if royalty_percentage
+                else None
+            )
+            (
+                combined_spend,
+                genesis_coin,
+                launcher_coinsol,
+            ) = await create_singleton_spend_bundle(
+                contribution_coin, alice, version, royalty
+            )
+            result = await network.push_tx(combined_spend)
+            assert "error" not in result
+
+            launcher_id = singleton_top_layer.generate_launcher_coin(
+                genesis_coin, SINGLETON_AMOUNT
+            ).name()
+            alice_owner = wallet_to_owner(alice)
+            singleton_coin: Coin = next(
+                coin
+                for coin in result["additions"]
+                if coin.puzzle_hash
+                == singleton_puzzle_hash(launcher_id, version, alice_owner, royalty)
+            )
+
+            record = await index.add_launcher(network.sim_client, launcher_id)
+            assert record.version == version
+            assert record.metadata.name == "Curly Nonchalant Marmot"
+            assert record.owner.public_key == alice_owner.public_key
+            assert record.coin == singleton_coin
+            assert (
+                record.lineage_proof
+                == singleton_top_layer.lineage_proof_for_coinsol(launcher_coinsol)
+            )
+            if royalty:
+                assert record.royalty.creator_puzhash == royalty.creator_puzhash
+                assert record.royalty.percentage == royalty.percentage
+            else:
+                assert record.royalty is None
+
+            payment_amount = 10000
+            payment_coin: Optional[CoinWrapper] = await bob.choose_coin(payment_amount)
+            buy_offer = await create_buy_offer_for_user(
+                alice,
+                bob,
+                launcher_coinsol,
+                launcher_id,
+                payment_amount,
+                payment_coin,
+                singleton_coin,
+                version,
+                royalty,
+            )
+            # The indexed state builds the same singleton spend as the launcher spend
+            assert (
+                record.create_buy_offer(
+                    buy_offer.coin_spends[-2].coin,
+                    buy_offer.coin_spends[-2].puzzle_reveal.to_program(),
+                    wallet_to_owner(bob),
+                    payment_amount,
+                )
+                == buy_offer.coin_spends[-2:]
+            )
+            result = await network.push_tx(
+                await accept_buy_offer(singleton_coin, buy_offer, alice, payment_amount)
+            )
+            assert "error" not in result
+
+            assert await index.sync(network.sim_client) == 1
+            # The recorded coin is current, so nothing is followed again
+            assert await index.sync(network.sim_client) == 0
+
+            record = await index.get(launcher_id)
+            bob_owner = wallet_to_owner(bob)
+            assert record.owner.public_key == bob_owner.public_key
+            assert record.owner.puzzle_hash == bob_owner.puzzle_hash
+            assert record.coin.parent_coin_info == singleton_coin.name()
+
+            # Reading the whole lineage again ends at the same coin
+            walked = await index.add_launcher(network.sim_client, launcher_id)
+            assert walked.coin == record.coin
+            assert walked.lineage_proof == record.lineage_proof
+            assert await index.count() == 1
+            assert [
+                owned.launcher_id
+                for owned in await index.get_by_owner(bob_owner.public_key)
+            ] == [launcher_id]
+            assert await index.get_by_owner(alice_owner.public_key) == []
+        finally:
+            await network.close()
@@ -0,0 +1,59 @@
+import asyncio
+import json
+
+import pytest
+
+from ownable_singleton.tracing import (
+    disable_tracing,
+    enable_tracing,
+    get_tracer,
+    span,
+    traced,
+)
+
+
+@pytest.fixture
+def trace_path(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    yield path
+    disable_tracing()
+
+
+def read_spans(path):
+    with open(path, "rt") as fh:
+        return {span["name"]: span for span in map(json.loads, fh)}
+
+
+def test_spans_do_nothing_without_tracer():
+    assert get_tracer() is None
+    with span("phase", size=1) as phase:
+        phase.set(status=200)
+
+
+def test_spans_are_nested_across_coroutines(trace_path):
+    tracer = enable_tracing(str(trace_path))
+
+    @traced("request")
+    async def request():
+        await asyncio.sleep(0)
+
+    async def command():
+        with span("submit", path="/singletons/submit") as submit:
+            await asyncio.gather(request(), request())
+            submit.set(status=200)
+
+    asyncio.run(command())
+    with pytest.raises(ValueError):
+        with span("sign"):
+            raise ValueError("invalid key")
+    disable_tracing()
+
+    spans = read_spans(trace_path)
+    assert spans["submit"]["parent"] is None
+    assert spans["submit"]["path"] == "/singletons/submit"
+    assert spans["submit"]["status"] == 200
+    assert spans["request"]["parent"] == spans["submit"]["id"]
+    assert spans["sign"]["error"] == "ValueError"
+
+    counts = {name: count for name, count, _, _ in tracer.summary()}
+    assert counts == {"request": 2, "submit": 1, "sign": 1}
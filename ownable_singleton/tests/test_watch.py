@@ -0,0 +1,114 @@
+import json
+from typing import Dict, List
+
+import pytest
+
+from ownable_singleton.gallery_client import GalleryClientError, GalleryResponse
+from ownable_singleton.watch import (
+    OfferWatcher,
+    WatchRule,
+    WatchRulesError,
+    read_watch_rules,
+)
+
+
+def test_read_watch_rules(tmp_path):
+    rules_file = tmp_path / "rules.json"
+    rules_file.write_text(
+        json.dumps(
+            {
+                "Marmots": {"min_price": 1.5, "launcher_ids": ["aa", "bb"]},
+                "Foxes": {"launcher_ids": ["cc"]},
+            }
+        )
+    )
+
+    rules = read_watch_rules(rules_file)
+
+    assert rules["aa"] is rules["bb"]
+    assert rules["aa"].collection == "Marmots"
+    assert rules["aa"].accepts(1500000000000)
+    assert not rules["aa"].accepts(1499999999999)
+    assert not rules["cc"].accepts(10**15)
+
+
+@pytest.mark.parametrize(
+    "collections",
+    [
+        [],
+        {"Marmots": {"min_price": "cheap", "launcher_ids": ["aa"]}},
+        {"Marmots": {"min_price": -1, "launcher_ids": ["aa"]}},
+        {"Marmots": {"launcher_ids": ["aa"]}, "Foxes": {"launcher_ids": ["aa"]}},
+    ],
+)
+def test_read_invalid_watch_rules(tmp_path, collections):
+    rules_file = tmp_path / "rules.json"
+    rules_file.write_text(json.dumps(collections))
+
+    with pytest.raises(WatchRulesError):
+        read_watch_rules(rules_file)
+
+
+class RecordedGallery:
+    def __init__(self, offers: Dict[str, List[List[Dict]]]):
+        self.offers = offers
+
+    async def get_offers(self, launcher_id: str) -> GalleryResponse:
+        pages = self.offers[launcher_id]
+        if len(pages) == 0:
+            return GalleryResponse(200, "[]", not_modified=True)
+        return GalleryResponse(200, json.dumps(pages.pop(0)))
+
+
+@pytest.mark.asyncio
+async def test_offer_watcher_reports_new_offers_once():
+    gallery = RecordedGallery(
+        {
+            "aa": [
+                [{"id": 1, "price": 10}],
+                [{"id": 1, "price": 10}, {"id": 2, "price": 30}],
+            ],
+            "bb": [[{"id": 3, "price": 20}]],
+        }
+    )
+    rule = WatchRule("Marmots", min_price=25)
+    handled = []
+
+    async def on_offers(launcher_id, offers, offer_rule):
+        handled.append((launcher_id, [offer["id"] for offer in offers]))
+        return any(offer_rule.accepts(offer["price"]) for offer in offers)
+
+    watcher = OfferWatcher(
+        gallery, {"aa": rule, "bb": rule}, on_offers, lambda *_: None, concurrency=2
+    )
+    await watcher.run(interval=0, rounds=3)
+
+    assert sorted(handled) == [("aa", [1]), ("aa", [2]), ("bb", [3])]
+    # The accepted NFT is no longer watched
+    assert list(watcher.rules.keys()) == ["bb"]
+
+
+@pytest.mark.asyncio
+async def test_offer_watcher_retries_offers_that_failed():
+    # After the first page, the offers are answered from the cache
+    gallery = RecordedGallery({"aa": [[{"id": 1, "price": 30}]]})
+    handled = []
+    errors = []
+
+    async def on_offers(launcher_id, offers, offer_rule):
+        handled.append([offer["id"] for offer in offers])
+        if len(handled) == 1:
+            raise GalleryClientError("Request to /accept failed: TimeoutError")
+        return True
+
+    watcher = OfferWatcher(
+        gallery,
+        {"aa": WatchRule("Marmots", min_price=25)},
+        on_offers,
+        lambda launcher_id, message: errors.append((launcher_id, message)),
+    )
+    await watcher.run(interval=0, rounds=3)
+
+    assert handled == [[1], [1]]
+    assert errors == [("aa", "Request to /accept failed: TimeoutError")]
+    assert watcher.rules == {}
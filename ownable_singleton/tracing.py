@@ -0,0 +1,191 @@
+import functools
+import inspect
+import itertools
+import json
+import os
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, TextIO, Tuple, TypeVar
+
+# Set this environment variable to a file, and the timed spans of a command are appended to it
+TRACE_ENV = "NFT_COMPANION_TRACE"
+
+T = TypeVar("T")
+
+
+class Tracer:
+    """
+    Collects the finished spans of one command and writes each as a JSON line to `output`.
+
+    A span records the name of a phase, when it started, how long it took, the span it is
+    nested in and any attributes given to `span`.
+    """
+
+    def __init__(self, output: Optional[TextIO] = None):
+        self.output = output
+        self.durations: Dict[str, List[float]] = {}
+        self._ids = itertools.count(1)
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    def record(
+        self,
+        span_id: int,
+        parent_id: Optional[int],
+        name: str,
+        start: float,
+        duration: float,
+        attributes: Dict[str, Any],
+    ):
+        self.durations.setdefault(name, []).append(duration)
+        if self.output is not None:
+            self.output.write(
+                json.dumps(
+                    {
+                        "id": span_id,
+                        "parent": parent_id,
+                        "name": name,
+                        "start": start,
+                        "duration": duration,
+                        **attributes,
+                    },
+                    default=str,
+                )
+                + "\n"
+            )
+
+    def summary(self) -> List[Tuple[str, int, float, float]]:
+        """
+        The number of spans, the total and the maximum duration of every phase, slowest first.
+        """
+        return sorted(
+            (
+                (name, len(durations), sum(durations), max(durations))
+                for name, durations in self.durations.items()
+            ),
+            key=lambda row: row[2],
+            reverse=True,
+        )
+
+    def close(self):
+        if self.output is not None:
+            self.output.close()
+            self.output = None
+
+
+_tracer: Optional[Tracer] = None
+_current_span: ContextVar[Optional[int]] = ContextVar("current_span", default=None)
+
+
+def enable_tracing(path: Optional[str] = None) -> Tracer:
+    global _tracer
+    disable_tracing()
+    _tracer = Tracer(open(path, "at") if path is not None else None)
+    return _tracer
+
+
+def enable_tracing_from_env() -> Optional[Tracer]:
+    path = os.environ.get(TRACE_ENV)
+    return enable_tracing(path) if path else None
+
+
+def disable_tracing():
+    global _tracer
+    if _tracer is not None:
+        _tracer.close()
+        _tracer = None
+
+
+def get_tracer() -> Optional[Tracer]:
+    return _tracer
+
+
+class _Span:
+    __slots__ = (
+        "tracer",
+        "name",
+        "attributes",
+        "id",
+        "parent_id",
+        "token",
+        "start",
+        "started",
+    )
+
+    def __init__(self, tracer: Tracer, name: str, attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def __enter__(self) -> "_Span":
+        self.id = self.tracer.next_id()
+        self.parent_id = _current_span.get()
+        self.token = _current_span.set(self.id)
+        self.start = time.time()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        duration = time.perf_counter() - self.started
+        _current_span.reset(self.token)
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        self.tracer.record(
+            self.id, self.parent_id, self.name, self.start, duration, self.attributes
+        )
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def set(self, **attributes):
+        pass
+
+    def __enter__(self) -> "_NoSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name: str, **attributes):
+    """
+    Times the block it wraps as a span named `name`. Spans opened inside the block, also in
+    awaited coroutines, are nested in it. Without an enabled tracer, this does nothing.
+    """
+    if _tracer is None:
+        return _NO_SPAN
+    return _Span(_tracer, name, attributes)
+
+
+def traced(name: str) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """
+    Times every call of the decorated function or coroutine function as a span.
+    """
+
+    def decorator(function):
+        if inspect.iscoroutinefunction(function):
+
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await function(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,100 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import List, Optional, Tuple
+
+from blspy import AugSchemeMPL, G1Element, G2Element
+
+from chia.types.spend_bundle import SpendBundle
+from chia.util.condition_tools import (
+    conditions_by_opcode,
+    pkm_pairs_for_conditions_dict,
+)
+from ownable_singleton.dry_run import DryRunResult, dry_run_spend_bundle
+
+# Below this number of spend bundles, starting worker processes costs more than it saves
+PROCESS_POOL_THRESHOLD = 16
+
+
+class SignatureVerificationError(Exception):
+    pass
+
+
+def signing_pairs(
+    dry_run: DryRunResult, additional_data: bytes
+) -> Tuple[List[G1Element], List[bytes]]:
+    """
+    Collects the (public key, message) pair of every AGG_SIG_ME and AGG_SIG_UNSAFE condition
+    of a dry-run spend bundle. AGG_SIG_ME messages include the coin ID and `additional_data`.
+    """
+    public_keys: List[G1Element] = []
+    messages: List[bytes] = []
+    for spend_result in dry_run.spend_results:
+        if spend_result.error is not None:
+            raise SignatureVerificationError(
+                f"The spend of coin {spend_result.coin_spend.coin.name()} fails: {spend_result.error.name}"
+            )
+        for public_key, message in pkm_pairs_for_conditions_dict(
+            conditions_by_opcode(spend_result.conditions),
+            spend_result.coin_spend.coin.name(),
+            additional_data,
+        ):
+            public_keys.append(public_key)
+            messages.append(message)
+    return public_keys, messages
+
+
+def verify_spend_bundle(
+    spend_bundle: SpendBundle,
+    additional_data: bytes,
+    dry_run: Optional[DryRunResult] = None,
+) -> bool:
+    if dry_run is None:
+        dry_run = dry_run_spend_bundle(spend_bundle)
+    try:
+        public_keys, messages = signing_pairs(dry_run, additional_data)
+    except SignatureVerificationError:
+        return False
+
+    if len(public_keys) == 0:
+        return spend_bundle.aggregated_signature == G2Element()
+    return AugSchemeMPL.aggregate_verify(
+        public_keys, messages, spend_bundle.aggregated_signature
+    )
+
+
+def _verify_serialized_spend_bundle(
+    serialized_spend_bundle: bytes, additional_data: bytes
+) -> bool:
+    return verify_spend_bundle(
+        SpendBundle.from_bytes(serialized_spend_bundle), additional_data
+    )
+
+
+def verify_spend_bundles(
+    spend_bundles: List[SpendBundle],
+    additional_data: bytes,
+    max_workers: Optional[int] = None,
+) -> List[bool]:
+    """
+    Verifies the aggregated signature of each spend bundle.
+
+    The pairings of a single aggregated signature cannot be split, so large batches are
+    verified before aggregating them, with the bundles sharded across a process pool.
+    """
+    if len(spend_bundles) < PROCESS_POOL_THRESHOLD or max_workers == 1:
+        return [
+            verify_spend_bundle(spend_bundle, additional_data)
+            for spend_bundle in spend_bundles
+        ]
+
+    workers = max_workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(
+            executor.map(
+                _verify_serialized_spend_bundle,
+                [bytes(spend_bundle) for spend_bundle in spend_bundles],
+                repeat(additional_data),
+                chunksize=max(1, len(spend_bundles) // (workers * 4)),
+            )
+        )
@@ -0,0 +1,182 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import aiohttp
+from blspy import PrivateKey, G1Element
+
+from chia.cmds.wallet_funcs import get_wallet
+from chia.rpc.full_node_rpc_client import FullNodeRpcClient
+from chia.rpc.wallet_rpc_client import WalletRpcClient
+from chia.types.blockchain_format.sized_bytes import bytes32
+from chia.util.config import load_config
+from chia.util.default_root import DEFAULT_ROOT_PATH
+from chia.util.ints import uint16, uint32
+from chia.wallet.derive_keys import (
+    master_sk_to_singleton_owner_sk,
+    master_sk_to_wallet_sk,
+)
+from chia.wallet.puzzles import p2_delegated_puzzle_or_hidden_puzzle
+from ownable_singleton.keys import DerivedKey, KeyTable, SINGLETON_OWNER_KEY
+from ownable_singleton.tracing import span, traced
+
+# Set this environment variable to the number of derivation indices scanned for owned singletons
+KEY_COUNT_ENV = "NFT_COMPANION_KEY_COUNT"
+DEFAULT_KEY_COUNT = 10
+
+
+class WalletSessionError(Exception):
+    pass
+
+
+# Loading the client requires the standard chia root directory configuration that all of the chia commands rely on
+@traced("wallet.connect")
+async def get_client() -> WalletRpcClient:
+    config = load_config(DEFAULT_ROOT_PATH, "config.yaml")
+    self_hostname = config["self_hostname"]
+    wallet_rpc_port = config["wallet"]["rpc_port"]
+
+    try:
+        return await WalletRpcClient.create(
+            self_hostname, uint16(wallet_rpc_port), DEFAULT_ROOT_PATH, config
+        )
+    except Exception as e:
+        if isinstance(e, aiohttp.ClientConnectorError):
+            raise WalletSessionError(
+                f"Connection error. Check if wallet is running at {wallet_rpc_port}"
+            )
+        raise WalletSessionError(f"Exception from 'wallets' {e}")
+
+
+@traced("full_node.connect")
+async def get_full_node_client() -> FullNodeRpcClient:
+    config = load_config(DEFAULT_ROOT_PATH, "config.yaml")
+    self_hostname = config["self_hostname"]
+    full_node_rpc_port = config["full_node"]["rpc_port"]
+
+    try:
+        return await FullNodeRpcClient.create(
+            self_hostname, uint16(full_node_rpc_port), DEFAULT_ROOT_PATH, config
+        )
+    except Exception as e:
+        if isinstance(e, aiohttp.ClientConnectorError):
+            raise WalletSessionError(
+                f"Connection error. Check if full node is running at {full_node_rpc_port}"
+            )
+        raise WalletSessionError(f"Exception from 'full_node' {e}")
+
+
+def key_count() -> int:
+    try:
+        return max(1, int(os.environ.get(KEY_COUNT_ENV, DEFAULT_KEY_COUNT)))
+    except ValueError:
+        raise WalletSessionError(f"{KEY_COUNT_ENV} has to be a number")
+
+
+class WalletSession:
+    """
+    An open wallet RPC connection together with the keys derived from the selected wallet key.
+
+    The keys are derived once when the session is created, so every operation running
+    through the session reuses the connection and the derivation.
+    """
+
+    def __init__(
+        self, wallet_client: WalletRpcClient, fingerprint: int, master_sk: PrivateKey
+    ):
+        self.wallet_client = wallet_client
+        self.fingerprint = fingerprint
+        self.master_sk = master_sk
+
+        with span("keys.derive"):
+            self.singleton_sk: PrivateKey = master_sk_to_singleton_owner_sk(
+                master_sk, uint32(0)
+            )
+            self.singleton_puzzle_hash: bytes32 = (
+                p2_delegated_puzzle_or_hidden_puzzle.puzzle_for_pk(
+                    self.singleton_sk.get_g1()
+                ).get_tree_hash()
+            )
+            self.wallet_sk: PrivateKey = master_sk_to_wallet_sk(master_sk, uint32(0))
+            self.wallet_puzzle_hash: bytes32 = (
+                p2_delegated_puzzle_or_hidden_puzzle.puzzle_for_pk(
+                    self.wallet_sk.get_g1()
+                ).get_tree_hash()
+            )
+        self._key_table: Optional[KeyTable] = None
+
+    @property
+    def singleton_public_key(self) -> G1Element:
+        return self.singleton_sk.get_g1()
+
+    @property
+    def key_table(self) -> KeyTable:
+        """
+        The keys of the first `NFT_COMPANION_KEY_COUNT` derivation indices, scanned on first use.
+        """
+        if self._key_table is None:
+            with span("keys.scan", count=key_count()):
+                self._key_table = KeyTable.scan(self.master_sk, range(key_count()))
+        return self._key_table
+
+    def singleton_owner_key(self, public_key_hex: str) -> Optional[DerivedKey]:
+        key = self.key_table.find_by_public_key(public_key_hex)
+        return key if key is not None and key.kind == SINGLETON_OWNER_KEY else None
+
+    @staticmethod
+    @traced("wallet.session")
+    async def create(fingerprint: Optional[int]) -> "WalletSession":
+        wallet_client = await get_client()
+        try:
+            with span("wallet.get_wallet"):
+                wallet = await get_wallet(wallet_client, fingerprint)
+            if wallet is None:
+                raise WalletSessionError("No wallet key has been selected")
+            _, fingerprint = wallet
+
+            with span("wallet.get_private_key"):
+                private_key = await wallet_client.get_private_key(fingerprint)
+            master_sk = PrivateKey.from_bytes(bytes.fromhex(private_key["sk"]))
+            return WalletSession(wallet_client, fingerprint, master_sk)
+        except BaseException:
+            wallet_client.close()
+            await wallet_client.await_closed()
+            raise
+
+    async def close(self):
+        self.wallet_client.close()
+        await self.wallet_client.await_closed()
+
+
+@asynccontextmanager
+async def open_wallet_session(
+    fingerprint: Optional[int],
+) -> AsyncIterator[WalletSession]:
+    session = await WalletSession.create(fingerprint)
+    try:
+        yield session
+    finally:
+        await session.close()
+
+
+@asynccontextmanager
+async def start_wallet_session(
+    fingerprint: Optional[int],
+) -> AsyncIterator["asyncio.Future[WalletSession]"]:
+    """
+    Starts connecting to the wallet in the background and yields the pending session,
+    so the connection and key derivation can overlap with other requests.
+    """
+    pending_session = asyncio.ensure_future(WalletSession.create(fingerprint))
+    try:
+        yield pending_session
+    finally:
+        if not pending_session.done():
+            pending_session.cancel()
+        try:
+            session = await pending_session
+        except (asyncio.CancelledError, Exception):
+            pass
+        else:
+            await session.close()
@@ -0,0 +1,153 @@
+import asyncio
+import json
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from chia.cmds.units import units
+from ownable_singleton.gallery_client import GalleryClient, GalleryClientError
+
+
+class WatchRule:
+    def __init__(self, collection: str, min_price: Optional[int] = None):
+        self.collection = collection
+        # The minimum price in mojo of offers that are accepted automatically
+        self.min_price = min_price
+
+    def accepts(self, price: int) -> bool:
+        return self.min_price is not None and price >= self.min_price
+
+
+class WatchRulesError(ValueError):
+    pass
+
+
+def _min_price(value, collection: str) -> Optional[int]:
+    if value is None:
+        return None
+    try:
+        min_price = float(value)
+    except (TypeError, ValueError):
+        raise WatchRulesError(f"Collection '{collection}': invalid min_price '{value}'")
+    if min_price <= 0:
+        raise WatchRulesError(
+            f"Collection '{collection}': min_price has to be positive"
+        )
+    return int(min_price * units["chia"])
+
+
+def read_watch_rules(path: Path) -> Dict[str, WatchRule]:
+    """
+    Reads the rule of each watched NFT from a JSON file.
+
+    The file maps collection names to an object with the `launcher_ids` of the collection and
+    the `min_price` (in XCH) of offers that are accepted automatically, for example
+    `{"Marmots": {"min_price": 1.5, "launcher_ids": ["356e..."]}}`.
+    """
+    try:
+        with open(path, "rt") as fh:
+            collections = json.load(fh)
+    except json.JSONDecodeError as e:
+        raise WatchRulesError(f"Invalid rules file: {e}")
+    if not isinstance(collections, dict):
+        raise WatchRulesError("The rules file has to contain an object of collections")
+
+    rules: Dict[str, WatchRule] = {}
+    for collection, settings in collections.items():
+        if not isinstance(settings, dict):
+            raise WatchRulesError(f"Collection '{collection}' has to be an object")
+        rule = WatchRule(collection, _min_price(settings.get("min_price"), collection))
+        for launcher_id in settings.get("launcher_ids", []):
+            if launcher_id in rules:
+                raise WatchRulesError(
+                    f"NFT '{launcher_id}' is part of more than one collection"
+                )
+            rules[launcher_id] = rule
+    return rules
+
+
+OfferHandler = Callable[[str, List[Dict], WatchRule], Awaitable[bool]]
+
+
+class OfferWatcher:
+    """
+    Polls the offers of many NFTs and hands offers it has not seen before to `on_offers`.
+
+    Each round polls all watched NFTs with a pool of `concurrency` tasks. Offers are fetched
+    with conditional requests, so NFTs without new offers are answered from the cache.
+    An NFT is no longer watched once `on_offers` returns True for it.
+
+    Offers only count as seen once `on_offers` has handled them. If it fails with a
+    `GalleryClientError`, the error is passed to `on_error` and the same offers are handed
+    to it again in the next round.
+    """
+
+    def __init__(
+        self,
+        gallery: GalleryClient,
+        rules: Dict[str, WatchRule],
+        on_offers: OfferHandler,
+        on_error: Callable[[str, str], None],
+        concurrency: int = 16,
+    ):
+        self.gallery = gallery
+        self.rules = dict(rules)
+        self.on_offers = on_offers
+        self.on_error = on_error
+        self.concurrency = concurrency
+        self._seen_offers: Dict[str, Set] = {}
+        # The new offers whose handling failed, by NFT
+        self._unhandled_offers: Dict[str, List[Dict]] = {}
+
+    async def _poll(self, launcher_id: str):
+        try:
+            response = await self.gallery.get_offers(launcher_id)
+        except GalleryClientError as e:
+            self.on_error(launcher_id, str(e))
+            return
+        seen = self._seen_offers.setdefault(launcher_id, set())
+        if response.not_modified:
+            new_offers = self._unhandled_offers.get(launcher_id, [])
+        elif response.status_code != 200:
+            self.on_error(launcher_id, response.text)
+            return
+        else:
+            new_offers = [offer for offer in response.json() if offer["id"] not in seen]
+        if len(new_offers) == 0:
+            return
+
+        try:
+            done = await self.on_offers(
+                launcher_id, new_offers, self.rules[launcher_id]
+            )
+        except GalleryClientError as e:
+            self._unhandled_offers[launcher_id] = new_offers
+            self.on_error(launcher_id, str(e))
+            return
+        self._unhandled_offers.pop(launcher_id, None)
+        seen.update(offer["id"] for offer in new_offers)
+        if done:
+            del self.rules[launcher_id]
+
+    async def poll_round(self):
+        queue: "asyncio.Queue[str]" = asyncio.Queue()
+        for launcher_id in list(self.rules.keys()):
+            queue.put_nowait(launcher_id)
+
+        async def worker():
+            while not queue.empty():
+                await self._poll(queue.get_nowait())
+
+        await asyncio.gather(
+            *(worker() for _ in range(min(self.concurrency, queue.qsize())))
+        )
+
+    async def run(self, interval: float, rounds: Optional[int] = None):
+        completed = 0
+        while len(self.rules) > 0:
+            started = asyncio.get_event_loop().time()
+            await self.poll_round()
+            completed += 1
+            if rounds is not None and completed >= rounds:
+                return
+            elapsed = asyncio.get_event_loop().time() - started
+            await asyncio.sleep(max(0.0, interval - elapsed))
@@ -7,13 +7,17 @@ with open("README.md", "rt") as fh:
 
 dependencies = [
     "chia-blockchain@git+https://github.com/Chia-Network/chia-blockchain.git@protocol_and_cats_rebased#23d571d9bb6b5003b49dee7ee31c1799358c5349",
-    "requests"
+    "aiohttp",
 ]
 
 dev_dependencies = [
     "black",
 ]
 
+quote_dependencies = [
+    "numpy",
+]
+
 setup(
     name="singleton-utils",
     version="0.0.1",
@@ -22,6 +26,7 @@ setup(
     install_requires=dependencies,
     extras_require=dict(
         dev=dev_dependencies,
+        quote=quote_dependencies,
     ),
     project_urls={
         "Bug Reports": "https://github.com/xch-gallery/singleton-utils",